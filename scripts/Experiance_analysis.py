@@ -1,116 +1,115 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-import matplotlib.pyplot as plt
-import seaborn as sns
+from clustering import fit_kmeans
+from parallel_groupby import parallel_groupby
+from plot_rendering import chart, histogram_data, show_or_save
+from sketches import ExtremeValues, FrequentItems
+
+EXPERIENCE_COLUMNS = [
+    'TCP DL Retrans. Vol (Bytes)',
+    'TCP UL Retrans. Vol (Bytes)',
+    'Avg RTT DL (ms)',
+    'Avg RTT UL (ms)',
+    'Avg Bearer TP DL (kbps)',
+    'Avg Bearer TP UL (kbps)'
+]
+
+# Per-group mode without a Python call per group
+def group_mode(df, key, column):
+    """
+    Returns the most frequent value of `column` for each `key`, indexed by key.
+    Ties are broken by the smallest value, the same as Series.mode()[0].
+    """
+    pairs = df.groupby([key, column], observed=True).size().rename('count').reset_index()
+    pairs = pairs.sort_values([key, 'count', column], ascending=[True, False, True], kind='mergesort')
+    return pairs.drop_duplicates(subset=key).set_index(key)[column]
 
 # Task 3.1: Aggregate customer experience metrics
-def aggregate_customer_experience(df):
-    # Handle missing values and outliers by replacing with mean/mode
-    df['TCP DL Retrans. Vol (Bytes)'] = df['TCP DL Retrans. Vol (Bytes)'].fillna(df['TCP DL Retrans. Vol (Bytes)'].mean())
-    df['TCP UL Retrans. Vol (Bytes)'] = df['TCP UL Retrans. Vol (Bytes)'].fillna(df['TCP UL Retrans. Vol (Bytes)'].mean())
-    df['Avg RTT DL (ms)'] = df['Avg RTT DL (ms)'].fillna(df['Avg RTT DL (ms)'].mean())
-    df['Avg RTT UL (ms)'] = df['Avg RTT UL (ms)'].fillna(df['Avg RTT UL (ms)'].mean())
-    df['Avg Bearer TP DL (kbps)'] = df['Avg Bearer TP DL (kbps)'].fillna(df['Avg Bearer TP DL (kbps)'].mean())
-    df['Avg Bearer TP UL (kbps)'] = df['Avg Bearer TP UL (kbps)'].fillna(df['Avg Bearer TP UL (kbps)'].mean())
-    df['Handset Type'] = df['Handset Type'].fillna(df['Handset Type'].mode()[0])
+def _experience_by_customer(filled):
+    aggregated = filled.groupby('MSISDN/Number')[EXPERIENCE_COLUMNS].mean()
+    aggregated['Handset Type'] = group_mode(filled, 'MSISDN/Number', 'Handset Type')
+    return aggregated
+
+# Large frames can be hash-partitioned by MSISDN across max_workers processes (None runs inline)
+def aggregate_customer_experience(df, max_workers=None):
+    # Handle missing values by replacing with mean/mode, without writing into the caller's frame
+    fill_values = df[EXPERIENCE_COLUMNS].mean().to_dict()
+    fill_values['Handset Type'] = df['Handset Type'].mode()[0]
+    filled = df[['MSISDN/Number', 'Handset Type'] + EXPERIENCE_COLUMNS].fillna(fill_values)
 
     # Aggregate metrics per customer
-    aggregated = df.groupby('MSISDN/Number').agg({
-        'TCP DL Retrans. Vol (Bytes)': 'mean',
-        'TCP UL Retrans. Vol (Bytes)': 'mean',
-        'Avg RTT DL (ms)': 'mean',
-        'Avg RTT UL (ms)': 'mean',
-        'Handset Type': lambda x: x.mode()[0],
-        'Avg Bearer TP DL (kbps)': 'mean',
-        'Avg Bearer TP UL (kbps)': 'mean'
-    }).reset_index()
-    return aggregated
+    aggregated = parallel_groupby(filled, 'MSISDN/Number', _experience_by_customer, max_workers=max_workers)
+
+    column_order = EXPERIENCE_COLUMNS[:4] + ['Handset Type'] + EXPERIENCE_COLUMNS[4:]
+    return aggregated[column_order].reset_index()
 
 # Task 3.2: Top, bottom, and most frequent values
-def compute_top_bottom_frequent(df, column, n=10):
-    top_values = df[column].nlargest(n)
-    bottom_values = df[column].nsmallest(n)
-    frequent_values = df[column].value_counts().head(n)
+# df can also be an iterator of chunks; capacity bounds the frequent-value counters (None keeps them exact)
+def compute_top_bottom_frequent(df, column, n=10, capacity=None):
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    extremes = ExtremeValues(n)
+    frequent = FrequentItems(capacity=capacity)
+    for chunk in chunks:
+        extremes.update(chunk[column])
+        frequent.update(chunk[column])
+
+    top_values = extremes.top()
+    bottom_values = extremes.bottom()
+    frequent_values = frequent.top(n)
     return top_values, bottom_values, frequent_values
 
 # Task 3.3: Distribution of throughput and TCP retransmission per handset type
-def analyze_distribution(df):
-    throughput_dist = df.groupby('Handset Type')[['Avg Bearer TP DL (kbps)', 'Avg Bearer TP UL (kbps)']].mean().sort_values(by='Avg Bearer TP DL (kbps)')
-    tcp_retransmission_dist = df.groupby('Handset Type')[['TCP DL Retrans. Vol (Bytes)', 'TCP UL Retrans. Vol (Bytes)']].mean().sort_values(by='TCP DL Retrans. Vol (Bytes)')
-
-    # Plotting throughput distribution with horizontal bar plots for better readability
-    plt.figure(figsize=(12, 6))
-    throughput_dist[['Avg Bearer TP DL (kbps)', 'Avg Bearer TP UL (kbps)']].plot(kind='barh', stacked=True, width=0.8, figsize=(12, 6), colormap="Blues")
-    plt.title('Throughput Distribution per Handset Type')
-    plt.xlabel('Throughput (kbps)')
-    plt.ylabel('Handset Type')
-    plt.tight_layout()
-    plt.show()
-
-    # Plotting TCP retransmission distribution with horizontal bar plots for better readability
-    plt.figure(figsize=(12, 6))
-    tcp_retransmission_dist[['TCP DL Retrans. Vol (Bytes)', 'TCP UL Retrans. Vol (Bytes)']].plot(kind='barh', stacked=True, width=0.8, figsize=(12, 6), colormap="Reds")
-    plt.title('TCP Retransmission Distribution per Handset Type')
-    plt.xlabel('Retransmission Volume (Bytes)')
-    plt.ylabel('Handset Type')
-    plt.tight_layout()
-    plt.show()
+def distribution_charts(df):
+    throughput_dist = df.groupby('Handset Type', observed=True)[['Avg Bearer TP DL (kbps)', 'Avg Bearer TP UL (kbps)']].mean().sort_values(by='Avg Bearer TP DL (kbps)')
+    tcp_retransmission_dist = df.groupby('Handset Type', observed=True)[['TCP DL Retrans. Vol (Bytes)', 'TCP UL Retrans. Vol (Bytes)']].mean().sort_values(by='TCP DL Retrans. Vol (Bytes)')
+
+    # Horizontal stacked bar charts for better readability
+    charts = [
+        chart('throughput_per_handset', 'frame_bar', throughput_dist, 'Throughput Distribution per Handset Type',
+              'Throughput (kbps)', 'Handset Type', plot_kind='barh', stacked=True, colormap="Blues"),
+        chart('tcp_retransmission_per_handset', 'frame_bar', tcp_retransmission_dist, 'TCP Retransmission Distribution per Handset Type',
+              'Retransmission Volume (Bytes)', 'Handset Type', plot_kind='barh', stacked=True, colormap="Reds"),
+    ]
+    return throughput_dist, tcp_retransmission_dist, charts
+
+def analyze_distribution(df, output_dir=None):
+    throughput_dist, tcp_retransmission_dist, charts = distribution_charts(df)
+    for spec in charts:
+        show_or_save(spec, output_dir)
 
     return throughput_dist, tcp_retransmission_dist
 
 # Task 3.4: K-means clustering for user segmentation
-def perform_kmeans_clustering(df, n_clusters=3):
+# backend='minibatch' switches to MiniBatchKMeans; centroids_path warm-starts and persists centroids
+def perform_kmeans_clustering(df, n_clusters=3, backend='full', centroids_path=None):
     # Select relevant features for clustering
     features = df[['TCP DL Retrans. Vol (Bytes)', 'TCP UL Retrans. Vol (Bytes)', 'Avg RTT DL (ms)', 'Avg RTT UL (ms)', 'Avg Bearer TP DL (kbps)', 'Avg Bearer TP UL (kbps)']]
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df['Cluster'] = kmeans.fit_predict(features)
+    kmeans = fit_kmeans(features, n_clusters=n_clusters, backend=backend, centroids_path=centroids_path)
+    df['Cluster'] = kmeans.labels_
 
     # Cluster descriptions
     cluster_summary = df.groupby('Cluster').mean()
     return kmeans, df, cluster_summary
 
 # Visualization helper function
-def plot_distributions(data, column, title):
-    plt.figure(figsize=(10, 6))
-    sns.histplot(data[column], kde=True, bins=30)
-    plt.title(title)
-    plt.xlabel(column)
-    plt.ylabel('Frequency')
-    plt.show()
+def distribution_chart(data, column, title):
+    return chart(f"distribution_{column}", 'hist', histogram_data(data[column], bins=30), title,
+                 column, 'Frequency', figsize=(10, 6))
+
+def plot_distributions(data, column, title, output_dir=None):
+    return show_or_save(distribution_chart(data, column, title), output_dir)
 
 # Task 3.5: Visualizing top, bottom, and frequent values
-def plot_top_bottom_frequent_values(df, column, n=10):
-    # Top values
-    top_values, bottom_values, frequent_values = compute_top_bottom_frequent(df, column, n)
-
-    # Plotting top values
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_values.index, y=top_values.values, palette="viridis")
-    plt.title(f"Top {n} {column}")
-    plt.xlabel(column)
-    plt.ylabel('Value')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
-
-    # Plotting bottom values
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=bottom_values.index, y=bottom_values.values, palette="plasma")
-    plt.title(f"Bottom {n} {column}")
-    plt.xlabel(column)
-    plt.ylabel('Value')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
-
-    # Plotting frequent values
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=frequent_values.index, y=frequent_values.values, palette="coolwarm")
-    plt.title(f"Most Frequent {column}")
-    plt.xlabel(column)
-    plt.ylabel('Frequency')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
+def top_bottom_frequent_charts(df, column, n=10, capacity=None):
+    top_values, bottom_values, frequent_values = compute_top_bottom_frequent(df, column, n, capacity)
+    style = dict(rotation=45)
+    return [
+        chart(f"top_{n}_{column}", 'bar', top_values, f"Top {n} {column}", column, 'Value', palette="viridis", **style),
+        chart(f"bottom_{n}_{column}", 'bar', bottom_values, f"Bottom {n} {column}", column, 'Value', palette="plasma", **style),
+        chart(f"most_frequent_{column}", 'bar', frequent_values, f"Most Frequent {column}", column, 'Frequency', palette="coolwarm", **style),
+    ]
 
+def plot_top_bottom_frequent_values(df, column, n=10, output_dir=None, capacity=None):
+    # Top, bottom and most frequent values
+    for spec in top_bottom_frequent_charts(df, column, n, capacity):
+        show_or_save(spec, output_dir)
@@ -1,144 +1,288 @@
 import os
+import json
+import hashlib
+import joblib
 import numpy as np
-from sklearn.cluster import KMeans
 from sklearn.linear_model import LinearRegression
-from sklearn.impute import SimpleImputer
 import pandas as pd
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Fetch database connection parameters from environment variables
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-def satisfaction_analysis(df):
-    # Separate numeric and non-numeric columns
-    numeric_columns = df.select_dtypes(include=['number']).columns
-    non_numeric_columns = df.select_dtypes(exclude=['number']).columns
-
-    # Handle missing values in numeric columns using SimpleImputer
-    imputer = SimpleImputer(strategy='mean')
-    df[numeric_columns] = imputer.fit_transform(df[numeric_columns])
-
-    # For non-numeric columns, fill missing values with a placeholder
-    df[non_numeric_columns] = df[non_numeric_columns].fillna('missing')
-
-    # Step 1: Engagement Score (Cluster for less engaged users)
-    engagement_features = ['Total UL (Bytes)', 'Total DL (Bytes)', 'Dur. (ms)']
-    kmeans_engagement = KMeans(n_clusters=2, random_state=42).fit(df[engagement_features])
-    df['engagement_cluster'] = kmeans_engagement.labels_
-
-    # Identify the less engaged cluster (smaller centroid sum)
-    cluster_centroids = kmeans_engagement.cluster_centers_
-    less_engaged_cluster = np.argmin(np.sum(cluster_centroids, axis=1))
-
-    # Calculate engagement scores (Euclidean distance to less engaged cluster)
-    df['engagement_score'] = np.linalg.norm(
-        df[engagement_features] - cluster_centroids[less_engaged_cluster], axis=1
-    )
+from clustering import fit_kmeans
+from export_data import export_dataframe_copy
+from plot_rendering import chart, histogram_data, sample_rows, show_or_save
+from imputation import ChunkedImputer
+from User_Engagement_Analysis import aggregate_subscriber_sums
+from distance_kernel import distance_to_point
+from scoring_features import ENGAGEMENT_FEATURES, EXPERIENCE_FEATURES, SUBSCRIBER_KEYS
 
-    # Step 2: Experience Score (Cluster for worst experience)
-    experience_features = ['Youtube DL (Bytes)', 'Netflix DL (Bytes)', 'Gaming DL (Bytes)']
-    kmeans_experience = KMeans(n_clusters=2, random_state=42).fit(df[experience_features])
-    df['experience_cluster'] = kmeans_experience.labels_
+SCORE_COLUMNS = ['engagement_cluster', 'engagement_score', 'experience_cluster', 'experience_score',
+                 'satisfaction_score', 'satisfaction_cluster']
 
-    # Identify the worst experience cluster
-    experience_centroids = kmeans_experience.cluster_centers_
-    worst_experience_cluster = np.argmin(np.sum(experience_centroids, axis=1))
+# Table the per-subscriber scores (level='subscriber') are exported to
+SUBSCRIBER_TABLE = 'subscriber_satisfaction'
+
+# Stages of satisfaction_analysis, in run order ('reduce' only runs at the subscriber level)
+STAGES = ['impute', 'reduce', 'engagement_score', 'experience_score', 'satisfaction', 'regression',
+          'clustering', 'export']
+
+# Bumped whenever a stage changes what it computes, so older cache files are not reused
+_CACHE_VERSION = 2
+
+
+def satisfaction_charts(df, top_10_satisfied, cluster_aggregates, max_points=100000, id_column='Bearer Id'):
+    """
+    Builds the chart specs of the satisfaction analysis from its results.
+    Scatter plots are drawn from a bounded sample of max_points rows; the top 10 are
+    labelled by id_column ('Bearer Id' for sessions, the subscriber key per subscriber).
+    """
+    points = sample_rows(df, max_points)
+    top_10 = top_10_satisfied.set_index(id_column)['satisfaction_score']
+    return [
+        chart('engagement_clusters', 'scatter',
+              {'x': points['Total UL (Bytes)'], 'y': points['Total DL (Bytes)'], 'c': points['engagement_cluster']},
+              'Engagement Clusters', 'Total UL (Bytes)', 'Total DL (Bytes)', cmap='viridis', colorbar_label='Cluster'),
+        chart('experience_clusters', 'scatter',
+              {'x': points['Youtube DL (Bytes)'], 'y': points['Netflix DL (Bytes)'], 'c': points['experience_cluster']},
+              'Experience Clusters', 'Youtube DL (Bytes)', 'Netflix DL (Bytes)', cmap='plasma', colorbar_label='Cluster'),
+        chart('satisfaction_score_distribution', 'hist', histogram_data(df['satisfaction_score'], bins=30),
+              'Satisfaction Score Distribution', 'Satisfaction Score', 'Frequency', figsize=(10, 6), color='blue'),
+        chart('top_10_satisfied', 'bar', top_10, 'Top 10 Satisfied Customers', id_column, 'Satisfaction Score',
+              figsize=(10, 6), palette='Blues_d', rotation=45),
+        chart('satisfaction_cluster_aggregates', 'frame_bar', cluster_aggregates,
+              'Cluster Aggregates for Satisfaction Score and Experience Score', 'Cluster', 'Score',
+              colormap='coolwarm', rotation=0),
+    ]
+
+
+def frame_fingerprint(df):
+    """
+    Short hash of the values, index, column names and dtypes of a DataFrame.
+    """
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr([(column, str(dtype)) for column, dtype in df.dtypes.items()]).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _run_stage(stage, previous_key, params, compute, cache_dir):
+    """
+    Runs one pipeline stage, or loads its output from cache_dir.
+
+    The cache key chains the key of the previous stage with the stage name and
+    parameters, so a changed input or stage invalidates that stage and every later one.
+    :return: Tuple (stage output, cache key).
+    """
+    key = hashlib.sha256(
+        json.dumps([_CACHE_VERSION, previous_key, stage, params], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{stage}-{key}.joblib") if cache_dir else None
+    if path and os.path.exists(path):
+        return joblib.load(path), key
+
+    output = compute()
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write-then-rename so an interrupted run never leaves a truncated cache file
+        joblib.dump(output, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return output, key
 
-    # Calculate experience scores (Euclidean distance to worst experience cluster)
-    df['experience_score'] = np.linalg.norm(
-        df[experience_features] - experience_centroids[worst_experience_cluster], axis=1
-    )
 
-    # Step 3: Satisfaction Score
-    df['satisfaction_score'] = (df['engagement_score'] + df['experience_score']) / 2
+def _impute_stage(df, imputer):
+    # Numeric columns with their mean, text/categorical columns with a placeholder
+    # (identifier columns such as Bearer Id are never imputed)
+    if imputer is None:
+        imputer = ChunkedImputer(numeric_strategy='mean', categorical_strategy='constant',
+                                 fill_value='missing').fit(df)
+    return imputer
 
-    # Step 4: Top 10 Satisfied Customers
-    top_10_satisfied = df.nlargest(10, 'satisfaction_score')
 
-    # Step 5: Regression Model
-    regression_features = engagement_features + experience_features
+def subscriber_features(df, key='IMSI', max_workers=None):
+    """
+    Reduces xDR sessions to one row per subscriber: the sums of the engagement and
+    experience features (total UL / DL bytes, duration, YouTube / Netflix / Gaming DL
+    bytes) and the number of sessions, with the same aggregation as
+    aggregate_engagement_metrics (aggregate_subscriber_sums). Large frames can be
+    hash-partitioned by key across max_workers processes.
+
+    :param df: DataFrame of (imputed) xDR rows.
+    :param key: 'IMSI' or 'MSISDN/Number'.
+    :param max_workers: Worker processes (None runs inline).
+    :return: DataFrame with the key as a column and the feature columns, one row per subscriber.
+    """
+    if key not in SUBSCRIBER_KEYS:
+        raise ValueError(f"key must be one of {SUBSCRIBER_KEYS}.")
+    features = ENGAGEMENT_FEATURES + EXPERIENCE_FEATURES
+    return aggregate_subscriber_sums(df, key, features, max_workers).reset_index()
+
+
+def broadcast_scores(df, subscriber_scores, key='IMSI', columns=None):
+    """
+    Copies per-subscriber scores back onto the sessions of each subscriber.
+
+    :param df: DataFrame of xDR rows.
+    :param subscriber_scores: Scored subscriber frame ('scores' of satisfaction_analysis(level='subscriber')).
+    :param key: Subscriber key the scores were computed on.
+    :param columns: Score columns to copy (defaults to every score column present).
+    :return: New DataFrame: the rows of df with the score columns added (NaN for unknown subscribers).
+    """
+    if columns is None:
+        columns = [column for column in SCORE_COLUMNS if column in subscriber_scores.columns]
+    return df.join(subscriber_scores.set_index(key)[columns], on=key)
+
+
+def _distance_stage(df, features, kmeans_backend):
+    """
+    Clusters the rows in two and scores them by their distance to the low cluster
+    (the centroid with the smallest sum: least engaged / worst experience).
+    """
+    kmeans = fit_kmeans(df[features], n_clusters=2, backend=kmeans_backend)
+    centroids = kmeans.cluster_centers_
+    reference = int(np.argmin(np.sum(centroids, axis=1)))
+    return {
+        'cluster': kmeans.labels_,
+        # Blocked kernel instead of np.linalg.norm(df[features] - centroid, axis=1): no full-frame temporaries
+        'score': distance_to_point(df[features], centroids[reference], dtype='float64'),
+        'centroids': centroids,
+        'reference': reference,
+    }
+
+
+def _regression_stage(df):
     model = LinearRegression()
-    model.fit(df[regression_features], df['satisfaction_score'])
+    model.fit(df[ENGAGEMENT_FEATURES + EXPERIENCE_FEATURES], df['satisfaction_score'])
+    return model
 
-    # Step 6: K-Means Clustering on Engagement & Experience Scores
-    kmeans_satisfaction = KMeans(n_clusters=2, random_state=42).fit(
-        df[['engagement_score', 'experience_score']]
-    )
-    df['satisfaction_cluster'] = kmeans_satisfaction.labels_
 
-    # Step 7: Cluster Aggregates
-    cluster_aggregates = df.groupby('satisfaction_cluster')[
+def _clustering_stage(df, kmeans_backend):
+    kmeans_satisfaction = fit_kmeans(
+        df[['engagement_score', 'experience_score']], n_clusters=2, backend=kmeans_backend
+    )
+    cluster_aggregates = df.groupby(kmeans_satisfaction.labels_)[
         ['satisfaction_score', 'experience_score']
-    ].mean()
-
-    # Visualization of Engagement and Experience Clusters
-    plt.figure(figsize=(12, 6))
-    plt.scatter(df['Total UL (Bytes)'], df['Total DL (Bytes)'], c=df['engagement_cluster'], cmap='viridis')
-    plt.title('Engagement Clusters')
-    plt.xlabel('Total UL (Bytes)')
-    plt.ylabel('Total DL (Bytes)')
-    plt.colorbar(label='Cluster')
-    plt.show()
-
-    # Visualization of Experience Clusters
-    plt.figure(figsize=(12, 6))
-    plt.scatter(df['Youtube DL (Bytes)'], df['Netflix DL (Bytes)'], c=df['experience_cluster'], cmap='plasma')
-    plt.title('Experience Clusters')
-    plt.xlabel('Youtube DL (Bytes)')
-    plt.ylabel('Netflix DL (Bytes)')
-    plt.colorbar(label='Cluster')
-    plt.show()
-
-    # Visualization of Satisfaction Scores Distribution
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['satisfaction_score'], kde=True, bins=30, color='blue')
-    plt.title('Satisfaction Score Distribution')
-    plt.xlabel('Satisfaction Score')
-    plt.ylabel('Frequency')
-    plt.show()
-
-    # Visualization of Top 10 Satisfied Customers
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=top_10_satisfied['Bearer Id'], y=top_10_satisfied['satisfaction_score'], palette="Blues_d")
-    plt.title('Top 10 Satisfied Customers')
-    plt.xlabel('Bearer Id')
-    plt.ylabel('Satisfaction Score')
-    plt.xticks(rotation=45)
-    plt.show()
-
-    # Visualization of Cluster Aggregates
-    plt.figure(figsize=(10, 6))
-    cluster_aggregates.plot(kind='bar', figsize=(12, 6), colormap="coolwarm")
-    plt.title('Cluster Aggregates for Satisfaction Score and Experience Score')
-    plt.xlabel('Cluster')
-    plt.ylabel('Score')
-    plt.xticks(rotation=0)
-    plt.tight_layout()
-    plt.show()
-
-    # Step 8: Export Results
+    ].mean().rename_axis('satisfaction_cluster')
+    return {
+        'cluster': kmeans_satisfaction.labels_,
+        'centroids': kmeans_satisfaction.cluster_centers_,
+        'cluster_aggregates': cluster_aggregates,
+    }
+
+
+def _export_stage(df, export_mode, export_format, id_column='Bearer Id', table='satisfaction_analysis'):
+    # Bulk COPY through an in-memory buffer; export_mode is 'replace', 'append' or 'upsert' on id_column
     try:
-        engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
-        df[['Bearer Id', 'engagement_score', 'experience_score', 'satisfaction_score']].to_sql(
-            'satisfaction_analysis', engine, if_exists='replace', index=False
+        export_dataframe_copy(
+            df[[id_column, 'engagement_score', 'experience_score', 'satisfaction_score']],
+            table, mode=export_mode, key=id_column, copy_format=export_format
         )
-        print("Data successfully exported to PostgreSQL table 'satisfaction_analysis'.")
+        print(f"Data successfully exported to PostgreSQL table '{table}'.")
     except Exception as e:
         print(f"An error occurred during export: {e}")
 
-    return {
+
+def satisfaction_analysis(df, export_mode='replace', export_format='csv', kmeans_backend='full',
+                          output_dir=None, render_plots=True, imputer=None, cache_dir=None,
+                          compute_only=False, level='session', subscriber_key='IMSI', broadcast=False,
+                          max_workers=None):
+    """
+    Scores engagement, experience and satisfaction with the stages of STAGES:
+    impute, reduce, engagement_score, experience_score, satisfaction, regression,
+    clustering and export. The caller's frame is not modified.
+
+    level='session' scores every xDR row (ranked by Bearer Id). level='subscriber' first
+    reduces the imputed rows to one row per subscriber_key (subscriber_features), so the
+    fits and scores work on as many rows as there are subscribers; the scores are exported
+    to SUBSCRIBER_TABLE, and broadcast=True also copies them back onto every session.
+
+    With cache_dir, the output of every computed stage is saved there, keyed by a
+    fingerprint of the input frame chained with the parameters of each stage, so a
+    rerun only recomputes the stages after the first changed one (and a chart tweak
+    recomputes none).
+
+    :param df: DataFrame of xDR rows.
+    :param export_mode: 'replace', 'append' or 'upsert' (on Bearer Id).
+    :param export_format: 'csv' or 'binary' COPY.
+    :param kmeans_backend: 'full' or 'minibatch'.
+    :param output_dir: Save the charts there instead of showing them.
+    :param render_plots: False only builds the chart specs.
+    :param imputer: Fitted imputer (e.g. ChunkedImputer.load), so the statistics are not
+                    recomputed over the full history.
+    :param cache_dir: Optional directory for the stage cache.
+    :param compute_only: Skip the charts and the export; only compute the results.
+    :param level: 'session' or 'subscriber'.
+    :param subscriber_key: 'IMSI' or 'MSISDN/Number' (subscriber level).
+    :param broadcast: Add session_scores, the sessions with their subscriber's scores (subscriber level).
+    :param max_workers: Processes for the per-subscriber reduction (None runs inline).
+    :return: Dictionary with top_10_satisfied, regression_model, cluster_aggregates, charts,
+             scores (the scored frame), stages (the output of every computed stage) and,
+             with broadcast=True, session_scores.
+    """
+    if level not in ('session', 'subscriber'):
+        raise ValueError("level must be 'session' or 'subscriber'.")
+    id_column = 'Bearer Id' if level == 'session' else subscriber_key
+    outputs = {}
+    key = frame_fingerprint(df)
+
+    imputer_params = None if imputer is None else imputer.statistics_
+    outputs['impute'], key = _run_stage('impute', key, imputer_params,
+                                        lambda: _impute_stage(df, imputer), cache_dir)
+    scored = outputs['impute'].transform(df)
+
+    # One row per subscriber: every later stage fits and scores the subscribers
+    if level == 'subscriber':
+        outputs['reduce'], key = _run_stage('reduce', key, subscriber_key,
+                                            lambda: subscriber_features(scored, subscriber_key, max_workers), cache_dir)
+        scored = outputs['reduce']
+
+    # Engagement Score: distance to the less engaged cluster
+    outputs['engagement_score'], key = _run_stage(
+        'engagement_score', key, kmeans_backend,
+        lambda: _distance_stage(scored, ENGAGEMENT_FEATURES, kmeans_backend), cache_dir)
+
+    # Experience Score: distance to the worst experience cluster
+    outputs['experience_score'], key = _run_stage(
+        'experience_score', key, kmeans_backend,
+        lambda: _distance_stage(scored, EXPERIENCE_FEATURES, kmeans_backend), cache_dir)
+
+    engagement, experience = outputs['engagement_score'], outputs['experience_score']
+    scored = scored.assign(
+        engagement_cluster=engagement['cluster'], engagement_score=engagement['score'],
+        experience_cluster=experience['cluster'], experience_score=experience['score'],
+    )
+
+    # Satisfaction Score
+    outputs['satisfaction'], key = _run_stage(
+        'satisfaction', key, None,
+        lambda: ((scored['engagement_score'] + scored['experience_score']) / 2).to_numpy(), cache_dir)
+    scored = scored.assign(satisfaction_score=outputs['satisfaction'])
+    top_10_satisfied = scored.nlargest(10, 'satisfaction_score')
+
+    # Regression Model
+    outputs['regression'], key = _run_stage('regression', key, None,
+                                            lambda: _regression_stage(scored), cache_dir)
+
+    # K-Means Clustering on Engagement & Experience Scores, and the cluster aggregates
+    outputs['clustering'], key = _run_stage('clustering', key, kmeans_backend,
+                                            lambda: _clustering_stage(scored, kmeans_backend), cache_dir)
+    scored = scored.assign(satisfaction_cluster=outputs['clustering']['cluster'])
+    cluster_aggregates = outputs['clustering']['cluster_aggregates']
+
+    # Visualizations (drawn headless when output_dir is given)
+    charts = [] if compute_only else satisfaction_charts(scored, top_10_satisfied, cluster_aggregates,
+                                                         id_column=id_column)
+    if render_plots:
+        for spec in charts:
+            show_or_save(spec, output_dir)
+
+    if not compute_only:
+        table = 'satisfaction_analysis' if level == 'session' else SUBSCRIBER_TABLE
+        _export_stage(scored, export_mode, export_format, id_column, table)
+
+    results = {
         'top_10_satisfied': top_10_satisfied,
-        'regression_model': model,
-        'cluster_aggregates': cluster_aggregates
+        'regression_model': outputs['regression'],
+        'cluster_aggregates': cluster_aggregates,
+        'charts': charts,
+        'scores': scored,
+        'stages': outputs,
     }
-
+    if broadcast and level == 'subscriber':
+        results['session_scores'] = broadcast_scores(df, scored, subscriber_key)
+    return results
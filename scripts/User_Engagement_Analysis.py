@@ -1,75 +1,118 @@
+from functools import partial
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.cluster import KMeans
+from clustering import fit_kmeans, select_k
 from sklearn.preprocessing import StandardScaler
+from load_data import load_data_using_sqlalchemy
+from sql_queries import build_engagement_metrics_query
+from plot_rendering import chart, show_or_save
+from parallel_groupby import parallel_groupby
+
+# Per-subscriber sums shared by the engagement metrics and the subscriber level of the
+# satisfaction analysis (Satisfaction_Analysis.subscriber_features)
+def subscriber_sums(df, key, features):
+    """
+    float64 sums of `features` and the number of sessions (non-null Bearer Id, as
+    COUNT("Bearer Id") in SQL) of the rows of df, one row per key, in a single groupby.
+    """
+    # Sum in float64 whatever dtype the counters were loaded with
+    frame = df[[key, 'Bearer Id']].join(df[features].astype('float64'))
+    return frame.groupby(key).agg(
+        **{feature: (feature, 'sum') for feature in features},
+        Session_Frequency=('Bearer Id', 'count'),
+    )
+
+def aggregate_subscriber_sums(df, key, features, max_workers=None):
+    """
+    subscriber_sums over a whole frame; large frames are hash-partitioned by key across
+    max_workers processes (parallel_groupby; None runs inline).
+    """
+    return parallel_groupby(df, key, partial(subscriber_sums, key=key, features=features), max_workers=max_workers)
 
 # Task 1: Aggregate engagement metrics
-def aggregate_engagement_metrics(df):
+def _engagement_by_imsi(df):
     """
-    Aggregates session metrics: session frequency, duration, and total traffic for each user.
+    Engagement metrics of the rows of df, one row per IMSI, in a single groupby.
     """
-    metrics = df.groupby('IMSI').agg({
-        'Dur. (ms)': 'sum',
-        'Total UL (Bytes)': 'sum',
-        'Total DL (Bytes)': 'sum'
-    }).rename(columns={
-        'Dur. (ms)': 'Total_Duration',
-        'Total UL (Bytes)': 'Total_UL',
-        'Total DL (Bytes)': 'Total_DL'
+    metrics = subscriber_sums(df, 'IMSI', ['Dur. (ms)', 'Total UL (Bytes)', 'Total DL (Bytes)']).rename(columns={
+        'Dur. (ms)': 'Total_Duration', 'Total UL (Bytes)': 'Total_UL', 'Total DL (Bytes)': 'Total_DL',
     })
     metrics['Total_Traffic'] = metrics['Total_UL'] + metrics['Total_DL']
-    metrics['Session_Frequency'] = df.groupby('IMSI')['Bearer Id'].count()
-    return metrics
+    return metrics[['Total_Duration', 'Total_UL', 'Total_DL', 'Total_Traffic', 'Session_Frequency']]
+
+def aggregate_engagement_metrics(df, max_workers=None):
+    """
+    Aggregates session metrics: session frequency, duration, and total traffic for each user.
+
+    df can be:
+    - a DataFrame, aggregated in pandas; large frames are hash-partitioned by IMSI
+      across max_workers processes (parallel_groupby; None runs inline);
+    - an iterator of DataFrame chunks (e.g. from load_data.stream_data_from_postgres);
+    - a table name or SELECT query (str), in which case the GROUP BY is pushed down
+      to the database and only the per-user result is fetched.
+    """
+    if isinstance(df, str):
+        metrics = load_data_using_sqlalchemy(build_engagement_metrics_query(source=df))
+        return None if metrics is None else metrics.set_index('IMSI')
+
+    if not isinstance(df, pd.DataFrame):
+        # Every metric is a count or a sum, so per-chunk partials simply add up
+        partials = [aggregate_engagement_metrics(chunk, max_workers) for chunk in df]
+        return pd.concat(partials).groupby(level='IMSI').sum()
+
+    return parallel_groupby(df, 'IMSI', _engagement_by_imsi, max_workers=max_workers)
 
 # Task 2: Perform user clustering
-def perform_user_clustering(engagement_metrics):
+def perform_user_clustering(engagement_metrics, n_clusters=3, backend='full', centroids_path=None):
     """
     Applies k-means clustering to segment users into engagement groups.
+
+    n_clusters='auto' picks k with the elbow method (clustering.select_k).
+    backend='minibatch' switches to MiniBatchKMeans; centroids_path warm-starts
+    the fit from (and saves) centroids of a previous run.
     """
     data = engagement_metrics[['Session_Frequency', 'Total_Duration', 'Total_Traffic']]
     scaler = StandardScaler()
     scaled_data = scaler.fit_transform(data)
 
-    # Optimal number of clusters (for now, we use 3 clusters)
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    engagement_metrics['Cluster'] = kmeans.fit_predict(scaled_data)
+    # Number of clusters: 3 by default, or chosen with the elbow method
+    if n_clusters == 'auto':
+        n_clusters, k_metrics = select_k(scaled_data)
+        print(f"Elbow method selected k={n_clusters}:")
+        print(k_metrics.to_string(index=False))
+
+    kmeans = fit_kmeans(scaled_data, n_clusters=n_clusters, backend=backend, centroids_path=centroids_path)
+    engagement_metrics['Cluster'] = kmeans.labels_
 
     return engagement_metrics
 
 # Task 3: Visualize top engaged users
-def plot_top_engaged_users(engagement_metrics):
+def top_engaged_users_chart(engagement_metrics):
+    top_users = engagement_metrics['Total_Traffic'].nlargest(10)
+    return chart('top_engaged_users', 'bar', top_users, "Top 10 Engaged Users by Total Traffic",
+                 "User IMSI", "Total Traffic (Bytes)", palette="coolwarm", rotation=45)
+
+def plot_top_engaged_users(engagement_metrics, output_dir=None):
     """
     Plots the top 10 engaged users based on total traffic.
     """
-    top_users = engagement_metrics.sort_values(by='Total_Traffic', ascending=False).head(10)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_users.index, y=top_users['Total_Traffic'], palette="coolwarm")
-    plt.title("Top 10 Engaged Users by Total Traffic")
-    plt.xlabel("User IMSI")
-    plt.ylabel("Total Traffic (Bytes)")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
+    return show_or_save(top_engaged_users_chart(engagement_metrics), output_dir)
 
 # Task 4: Visualize most used applications
-def plot_most_used_applications(df):
-    """
-    Plots the total data volume (DL + UL) for each application.
-    """
+def most_used_applications_chart(df):
     app_data = df[['Social Media DL (Bytes)', 'Social Media UL (Bytes)',
                    'Youtube DL (Bytes)', 'Youtube UL (Bytes)',
                    'Gaming DL (Bytes)', 'Gaming UL (Bytes)',
                    'Email DL (Bytes)', 'Email UL (Bytes)']]
 
-    app_data = app_data.sum()
-    app_data = app_data[::2] + app_data[1::2]  # Combine DL and UL for each application
-    app_data.index = ['Social Media', 'YouTube', 'Gaming', 'Email']
-
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=app_data.index, y=app_data.values, palette="viridis")
-    plt.title("Most Used Applications by Total Data Volume")
-    plt.xlabel("Application")
-    plt.ylabel("Total Data Volume (Bytes)")
-    plt.tight_layout()
-    plt.show()
+    app_data = app_data.sum().to_numpy(dtype='float64')
+    # Combine DL and UL for each application
+    app_data = pd.Series(app_data[::2] + app_data[1::2], index=['Social Media', 'YouTube', 'Gaming', 'Email'])
+
+    return chart('most_used_applications', 'bar', app_data, "Most Used Applications by Total Data Volume",
+                 "Application", "Total Data Volume (Bytes)", palette="viridis")
+
+def plot_most_used_applications(df, output_dir=None):
+    """
+    Plots the total data volume (DL + UL) for each application.
+    """
+    return show_or_save(most_used_applications_chart(df), output_dir)
@@ -0,0 +1,271 @@
+# scripts/benchmarks.py
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from user_overview_analysis import APP_COLUMNS, aggregate_user_behavior
+from clustering import fit_kmeans, chunked_inertia
+from User_Engagement_Analysis import aggregate_engagement_metrics
+from distance_kernel import distance_to_point
+from xdr_schema import XDR_SCHEMA, apply_xdr_schema
+
+
+def make_synthetic_xdr(n_rows, n_users=None, seed=42):
+    """
+    Builds a synthetic xDR frame with the columns used by the aggregation functions.
+
+    :param n_rows: Number of xDR rows (sessions).
+    :param n_users: Number of distinct subscribers; defaults to n_rows / 10.
+    :param seed: Random seed.
+    :return: DataFrame of synthetic xDR rows.
+    """
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(n_rows // 10, 1)
+
+    df = pd.DataFrame({
+        "Bearer Id": rng.integers(1, 2**53, n_rows).astype("float64"),
+        "IMSI": (208200000000000 + rng.integers(0, n_users, n_rows)).astype("float64"),
+        "MSISDN/Number": (33600000000 + rng.integers(0, n_users, n_rows)).astype("float64"),
+        "Dur. (ms)": rng.integers(1000, 2000000, n_rows).astype("float64"),
+    })
+    for dl_col, ul_col in APP_COLUMNS.values():
+        df[dl_col] = rng.integers(0, 50000000, n_rows).astype("float64")
+        df[ul_col] = rng.integers(0, 5000000, n_rows).astype("float64")
+    df["Total DL (Bytes)"] = df[[dl for dl, _ in APP_COLUMNS.values()]].sum(axis=1)
+    df["Total UL (Bytes)"] = df[[ul for _, ul in APP_COLUMNS.values()]].sum(axis=1)
+    return df
+
+
+def make_raw_xdr(n_rows, seed=42):
+    """
+    Builds a synthetic extract of every public.xdr_data column with the dtypes a plain
+    read_sql_query infers: float64 numbers and strings for timestamps and names.
+
+    :param n_rows: Number of xDR rows.
+    :param seed: Random seed.
+    :return: DataFrame with the columns of XDR_SCHEMA.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column, dtype in XDR_SCHEMA.items():
+        if column == "Bearer Id":
+            # Bearer Ids are above the int64 range
+            columns[column] = (2**63 + rng.integers(0, 2**62, n_rows).astype("uint64")).astype("float64")
+        elif dtype.startswith("datetime64"):
+            columns[column] = [f"4/{day}/2019 {hour}:{minute:02d}" for day, hour, minute in
+                               zip(rng.integers(1, 30, n_rows), rng.integers(0, 24, n_rows), rng.integers(0, 60, n_rows))]
+        elif dtype == "Int64":
+            columns[column] = rng.integers(2 * 10**14, 3 * 10**14, n_rows).astype("float64")
+        elif dtype == "category":
+            columns[column] = [f"{column[:8]} {value}" for value in rng.integers(0, 2000, n_rows)]
+        else:
+            columns[column] = rng.integers(0, 9 * 10**8, n_rows).astype("float64")
+    return pd.DataFrame(columns)
+
+
+def _time_call(func, *args, repeat=3, **kwargs):
+    """
+    Returns the best wall-clock time over `repeat` calls and the last result.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _peak_memory(func, *args, **kwargs):
+    """
+    Returns the peak memory allocated during one call (traced with tracemalloc), in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _legacy_aggregate_user_behavior(df):
+    """
+    The previous implementation: one groupby for the base metrics plus one per application.
+    """
+    user_agg = df.groupby("IMSI").agg(
+        total_xDR_sessions=("Bearer Id", "count"),
+        total_session_duration=("Dur. (ms)", "sum"),
+    ).reset_index()
+    for app, cols in APP_COLUMNS.items():
+        total_data = df.groupby("IMSI")[cols].sum().sum(axis=1).reset_index(drop=True)
+        user_agg[f"total_{app}_data"] = total_data
+    return user_agg
+
+
+def benchmark_aggregate_user_behavior(n_rows=10000000, repeat=3):
+    """
+    Compares the single-pass aggregate_user_behavior with the previous per-application groupbys.
+
+    :param n_rows: Number of synthetic xDR rows.
+    :param repeat: Number of timed runs per implementation (best is reported).
+    :return: Dictionary with both timings and the speedup.
+    """
+    df = make_synthetic_xdr(n_rows)
+
+    legacy_time, expected = _time_call(_legacy_aggregate_user_behavior, df, repeat=repeat)
+    new_time, result = _time_call(aggregate_user_behavior, df, repeat=repeat)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False)
+
+    print(f"aggregate_user_behavior on {n_rows:,} rows:")
+    print(f"  per-application groupbys: {legacy_time:.2f}s")
+    print(f"  single pass:              {new_time:.2f}s")
+    print(f"  speedup:                  {legacy_time / new_time:.1f}x")
+    return {"legacy_seconds": legacy_time, "seconds": new_time, "speedup": legacy_time / new_time}
+
+
+def benchmark_kmeans(n_rows=2000000, n_clusters=3, chunk_size=200000):
+    """
+    Compares fit time and inertia of full-batch KMeans against MiniBatchKMeans,
+    both in memory and streamed chunk by chunk through partial_fit.
+
+    :param n_rows: Number of synthetic users to cluster.
+    :param n_clusters: Number of clusters.
+    :param chunk_size: Rows per streamed chunk.
+    :return: DataFrame with one row per backend.
+    """
+    rng = np.random.default_rng(42)
+    centers = rng.normal(0, 5, size=(n_clusters, 3))
+    X = centers[rng.integers(0, n_clusters, n_rows)] + rng.normal(0, 1, size=(n_rows, 3))
+
+    def chunks():
+        return (X[start:start + chunk_size] for start in range(0, n_rows, chunk_size))
+
+    runs = {
+        "full (KMeans)": lambda: fit_kmeans(X, n_clusters, backend="full"),
+        "minibatch in memory": lambda: fit_kmeans(X, n_clusters, backend="minibatch"),
+        "minibatch streamed": lambda: fit_kmeans(chunks, n_clusters, backend="minibatch"),
+    }
+    rows = []
+    for name, run in runs.items():
+        seconds, model = _time_call(run, repeat=1)
+        rows.append({"backend": name, "fit_seconds": seconds, "inertia": chunked_inertia(model, chunks())})
+
+    results = pd.DataFrame(rows).set_index("backend")
+    results["inertia_vs_full"] = results["inertia"] / results.loc["full (KMeans)", "inertia"]
+    print(f"k-means on {n_rows:,} rows, k={n_clusters}:")
+    print(results.to_string())
+    return results
+
+
+def benchmark_parallel_groupby(n_rows=10000000, max_workers=None, repeat=1):
+    """
+    Times aggregate_engagement_metrics inline and hash-partitioned across worker processes.
+
+    :param n_rows: Number of synthetic xDR rows.
+    :param max_workers: Worker processes for the parallel run (defaults to the number of CPUs).
+    :param repeat: Number of timed runs per configuration (best is reported).
+    :return: Dictionary with both timings and the speedup.
+    """
+    df = make_synthetic_xdr(n_rows)
+    workers = max_workers or os.cpu_count() or 1
+
+    inline_time, expected = _time_call(aggregate_engagement_metrics, df, max_workers=1, repeat=repeat)
+    parallel_time, result = _time_call(aggregate_engagement_metrics, df, max_workers=workers, repeat=repeat)
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"aggregate_engagement_metrics on {n_rows:,} rows:")
+    print(f"  inline:              {inline_time:.2f}s")
+    print(f"  {workers:>2} worker processes: {parallel_time:.2f}s")
+    print(f"  speedup:             {inline_time / parallel_time:.1f}x")
+    return {"inline_seconds": inline_time, "seconds": parallel_time, "speedup": inline_time / parallel_time}
+
+
+def benchmark_distance_kernel(n_rows=50000000, dtype="float32", n_threads=None, repeat=1):
+    """
+    Compares the blocked distance_to_point kernel with np.linalg.norm(df[features] - centroid, axis=1),
+    the expression previously used for the engagement / experience scores.
+
+    :param n_rows: Number of rows.
+    :param dtype: dtype of the three feature columns ('float32' as in the xDR schema, or 'float64').
+    :param n_threads: Threads for the kernel (defaults to the number of CPUs).
+    :param repeat: Number of timed runs per implementation (best is reported).
+    :return: DataFrame with the time and peak memory of each implementation.
+    """
+    rng = np.random.default_rng(42)
+    features = ["Total UL (Bytes)", "Total DL (Bytes)", "Dur. (ms)"]
+    df = pd.DataFrame({column: rng.gamma(2.0, 1e7, n_rows).astype(dtype) for column in features})
+    centroid = np.array([4e7, 1.5e7, 2.5e7])
+    out = np.empty(n_rows, dtype=dtype)
+
+    runs = {
+        "np.linalg.norm on the frame": lambda: np.linalg.norm(df[features] - centroid, axis=1),
+        f"distance_to_point ({dtype} out)": lambda: distance_to_point(df[features], centroid, out=out, n_threads=n_threads),
+        "distance_to_point (float64)": lambda: distance_to_point(df[features], centroid, dtype="float64", n_threads=n_threads),
+    }
+    rows = []
+    for name, run in runs.items():
+        seconds, result = _time_call(run, repeat=repeat)
+        rows.append({"implementation": name, "seconds": seconds,
+                     "peak_mb": _peak_memory(run) / 1e6, "max_rel_error": None, "_result": result})
+
+    reference = rows[0].pop("_result")
+    for row in rows[1:]:
+        row["max_rel_error"] = float(np.max(np.abs(row.pop("_result") - reference) / np.maximum(reference, 1)))
+    results = pd.DataFrame(rows).set_index("implementation")
+    results["speedup"] = results.loc["np.linalg.norm on the frame", "seconds"] / results["seconds"]
+
+    print(f"Distances to a centroid on {n_rows:,} rows x {len(features)} {dtype} columns "
+          f"(frame: {df.memory_usage().sum() / 1e6:.0f} MB):")
+    print(results.to_string())
+    return results
+
+
+def benchmark_xdr_schema(n_rows=1000000, target=3.0):
+    """
+    Measures memory_usage(deep=True) of an xDR extract before and after apply_xdr_schema,
+    with strings held as the str dtype and as Python objects (pandas < 3).
+
+    :param n_rows: Number of synthetic xDR rows.
+    :param target: Reduction factor to report against.
+    :return: DataFrame with the bytes per row of each layout and its reduction.
+    """
+    raw = make_raw_xdr(n_rows)
+    string_columns = list(raw.select_dtypes(exclude="number").columns)
+    layouts = {
+        "inferred (object strings)": raw.astype({column: object for column in string_columns}),
+        "inferred (str strings)": raw,
+    }
+    seconds, typed = _time_call(apply_xdr_schema, raw, repeat=1)
+    layouts["XDR_SCHEMA"] = typed
+
+    results = pd.DataFrame({
+        "bytes_per_row": {name: frame.memory_usage(deep=True).sum() / n_rows for name, frame in layouts.items()}
+    })
+    results["reduction"] = results["bytes_per_row"] / results.loc["XDR_SCHEMA", "bytes_per_row"]
+
+    print(f"xDR extract of {n_rows:,} rows x {raw.shape[1]} columns (apply_xdr_schema: {seconds:.2f}s):")
+    print(results.to_string())
+    print(f"  target {target:.1f}x reached: {bool((results['reduction'] >= target).any())}")
+    return results
+
+
+BENCHMARKS = {
+    "aggregate_user_behavior": benchmark_aggregate_user_behavior,
+    "kmeans": benchmark_kmeans,
+    "parallel_groupby": benchmark_parallel_groupby,
+    "distance_kernel": benchmark_distance_kernel,
+    "xdr_schema": benchmark_xdr_schema,
+}
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks.py [benchmark_name] [n_rows]
+    names = sys.argv[1:2] or list(BENCHMARKS)
+    for name in names:
+        if len(sys.argv) > 2:
+            BENCHMARKS[name](int(sys.argv[2]))
+        else:
+            BENCHMARKS[name]()
@@ -0,0 +1,300 @@
+# scripts/clustering.py
+
+import os
+import json
+import time
+import hashlib
+from itertools import islice, takewhile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+# Results of select_k already computed in this process, keyed by fingerprint
+_SELECT_K_CACHE = {}
+
+# Sample arrays shared with select_k worker processes (set once per worker)
+_worker_samples = {}
+
+# k values select_k fits at once while it can still stop early: enough to keep a few
+# cores busy, few enough that little work is thrown away once the elbow is found
+SELECT_K_WINDOW = 4
+
+
+def as_array(chunk):
+    """
+    Converts a DataFrame / array chunk into a float64 NumPy array (missing values as NaN).
+    """
+    if isinstance(chunk, pd.DataFrame):
+        return chunk.to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(chunk, dtype="float64")
+
+
+def _model_input(model, chunk):
+    """
+    Keeps DataFrame chunks as-is for models fitted with feature names, arrays otherwise.
+    """
+    if isinstance(chunk, pd.DataFrame) and hasattr(model, "feature_names_in_"):
+        return chunk
+    return as_array(chunk)
+
+
+def save_centroids(path, model):
+    """
+    Saves the fitted cluster centres of a (MiniBatch)KMeans model to a .npy file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.save(path, model.cluster_centers_)
+
+
+def load_centroids(path):
+    """
+    Loads cluster centres saved with save_centroids, or returns None if the file does not exist.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    return np.load(path)
+
+
+def fit_kmeans(data, n_clusters=3, backend="full", batch_size=10000, n_epochs=3,
+               random_state=42, init_centroids=None, centroids_path=None):
+    """
+    Fits k-means with either the full-batch or the mini-batch backend.
+
+    data can be:
+    - a DataFrame or array held in memory;
+    - a callable returning a fresh iterator of chunks (e.g.
+      lambda: stream_data_from_postgres(query)), streamed n_epochs times through
+      MiniBatchKMeans.partial_fit so the full matrix is never held in RAM;
+    - a plain iterator of chunks, streamed once.
+
+    If centroids_path is given, existing centroids are used to warm-start the fit and
+    the new centroids are written back to it afterwards.
+
+    :param data: Training data (see above).
+    :param n_clusters: Number of clusters.
+    :param backend: 'full' (KMeans) or 'minibatch' (MiniBatchKMeans).
+    :param batch_size: Mini-batch size for the 'minibatch' backend.
+    :param n_epochs: Passes over streamed chunks (only used for callables).
+    :param random_state: Random seed.
+    :param init_centroids: Optional initial centroids (n_clusters x n_features).
+    :param centroids_path: Optional .npy file used to warm-start and persist centroids.
+    :return: Fitted KMeans or MiniBatchKMeans model.
+    """
+    if backend not in ("full", "minibatch"):
+        raise ValueError("backend must be 'full' or 'minibatch'.")
+
+    if init_centroids is None:
+        init_centroids = load_centroids(centroids_path)
+    if init_centroids is not None and len(init_centroids) != n_clusters:
+        print(f"Ignoring saved centroids: expected {n_clusters} clusters, got {len(init_centroids)}.")
+        init_centroids = None
+
+    init = "k-means++" if init_centroids is None else np.asarray(init_centroids, dtype="float64")
+    n_init = "auto" if init_centroids is None else 1
+    in_memory = isinstance(data, (pd.DataFrame, np.ndarray))
+
+    if backend == "full":
+        if not in_memory:
+            raise ValueError("The 'full' backend needs the data in memory; use backend='minibatch' for chunks.")
+        model = KMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=random_state)
+        model.fit(data)
+
+    else:
+        model = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=n_init,
+                                batch_size=batch_size, random_state=random_state)
+        if in_memory:
+            model.fit(data)
+        else:
+            epochs = n_epochs if callable(data) else 1
+            for _ in range(epochs):
+                chunks = data() if callable(data) else data
+                for chunk in chunks:
+                    # Split large chunks so each update sees at most batch_size rows
+                    values = as_array(chunk)
+                    for start in range(0, len(values), batch_size):
+                        model.partial_fit(values[start:start + batch_size])
+
+    if centroids_path is not None:
+        save_centroids(centroids_path, model)
+
+    return model
+
+
+def predict_in_chunks(model, chunks):
+    """
+    Assigns clusters chunk by chunk.
+
+    :param model: Fitted (MiniBatch)KMeans model.
+    :param chunks: Iterable of DataFrame / array chunks.
+    :return: NumPy array with one cluster label per row.
+    """
+    labels = [model.predict(_model_input(model, chunk)) for chunk in chunks]
+    return np.concatenate(labels) if labels else np.empty(0, dtype=np.int32)
+
+
+def chunked_inertia(model, chunks):
+    """
+    Sum of squared distances of every row to its closest centre, computed chunk by chunk.
+    Comparable across backends (unlike MiniBatchKMeans.inertia_ after partial_fit).
+    """
+    return float(sum(-model.score(_model_input(model, chunk)) for chunk in chunks))
+
+
+def _init_select_k_worker(fit_sample, silhouette_sample):
+    # Ship the samples once per worker instead of once per k
+    _worker_samples["fit"] = fit_sample
+    _worker_samples["silhouette"] = silhouette_sample
+
+
+def _fit_for_k(k, random_state):
+    """
+    Fits k-means for one k on the shared sample and returns its metrics.
+    """
+    fit_sample = _worker_samples["fit"]
+    silhouette_sample = _worker_samples["silhouette"]
+
+    start = time.perf_counter()
+    model = KMeans(n_clusters=k, random_state=random_state).fit(fit_sample)
+    fit_seconds = time.perf_counter() - start
+
+    labels = model.predict(silhouette_sample)
+    silhouette = silhouette_score(silhouette_sample, labels) if len(set(labels)) > 1 else np.nan
+    return {"k": k, "inertia": model.inertia_, "silhouette": silhouette, "fit_seconds": fit_seconds}
+
+
+def _elbow_from_improvements(metrics, tolerance):
+    """
+    Returns the smallest k after which one more cluster lowers inertia by less than
+    `tolerance` (relative), or None if no such k has been fitted yet.
+    """
+    inertia = metrics.set_index("k")["inertia"]
+    ks = list(inertia.index)
+    for previous, current in zip(ks, ks[1:]):
+        if current != previous + 1:
+            break
+        if (inertia[previous] - inertia[current]) / inertia[previous] < tolerance:
+            return previous
+    return None
+
+
+def _elbow_by_distance(metrics):
+    """
+    Kneedle-style elbow: the k whose normalised inertia lies furthest below the
+    straight line joining the first and last points of the curve.
+    """
+    ks = metrics["k"].to_numpy(dtype="float64")
+    inertia = metrics["inertia"].to_numpy(dtype="float64")
+    if len(ks) < 3:
+        return int(ks[np.argmin(inertia)])
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    y = (inertia - inertia[-1]) / (inertia[0] - inertia[-1])
+    return int(ks[np.argmax((1 - x) - y)])
+
+
+def select_k(data, k_range=range(2, 11), sample_size=50000, silhouette_size=10000,
+             n_jobs=None, tolerance=0.1, early_stop=True, random_state=42, cache_dir=None):
+    """
+    Chooses the number of clusters with the elbow method.
+
+    The k values are fitted in parallel on a random subsample, silhouette scores are
+    computed on a smaller bounded sample, and the sweep stops as soon as the elbow is
+    found: the first k after which one more cluster reduces inertia by less than
+    `tolerance`. With early_stop, at most SELECT_K_WINDOW k values (smallest first) are
+    fitted at a time, so stopping saves the larger k even when there are more cores than
+    candidates; without it, up to n_jobs k values run at once. If the sweep ends without such a
+    k, the elbow is picked geometrically from the full inertia curve.
+
+    Results are cached in memory and, when cache_dir is given, as JSON on disk, keyed by a
+    fingerprint of the sample and the parameters.
+
+    :param data: DataFrame or array of (already scaled) features.
+    :param k_range: Candidate numbers of clusters, in increasing order.
+    :param sample_size: Rows used to fit each candidate.
+    :param silhouette_size: Rows used to compute the silhouette score.
+    :param n_jobs: Worker processes (defaults to the number of CPUs; 1 runs inline).
+    :param tolerance: Relative inertia improvement below which the curve is considered flat.
+    :param early_stop: Stop fitting larger k once the elbow is found.
+    :param random_state: Random seed for sampling and k-means.
+    :param cache_dir: Optional directory for the on-disk cache.
+    :return: Tuple (chosen k, DataFrame of k / inertia / silhouette / fit_seconds).
+    """
+    X = as_array(data)
+    rng = np.random.default_rng(random_state)
+    fit_sample = X[rng.choice(len(X), sample_size, replace=False)] if len(X) > sample_size else X
+    silhouette_sample = (
+        fit_sample[rng.choice(len(fit_sample), silhouette_size, replace=False)]
+        if len(fit_sample) > silhouette_size else fit_sample
+    )
+
+    k_values = sorted(k_range)
+    fingerprint = hashlib.sha256(fit_sample.tobytes()).hexdigest()[:16]
+    cache_key = (f"{fingerprint}-{k_values[0]}-{k_values[-1]}-{len(k_values)}-{silhouette_size}-"
+                 f"{tolerance}-{early_stop}-{random_state}")
+    cache_path = os.path.join(cache_dir, f"select_k-{cache_key}.json") if cache_dir else None
+
+    if cache_key in _SELECT_K_CACHE:
+        best_k, metrics = _SELECT_K_CACHE[cache_key]
+        return best_k, metrics.copy()
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        metrics = pd.DataFrame(cached["metrics"])
+        _SELECT_K_CACHE[cache_key] = (cached["k"], metrics)
+        return cached["k"], metrics.copy()
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    window = min(n_jobs, SELECT_K_WINDOW) if early_stop else n_jobs
+    results = []
+    best_k = None
+
+    def fitted(result):
+        # Records one k; True once the sweep can stop. Only the k values fitted without a
+        # gap from the smallest one count, as larger k may finish first.
+        nonlocal best_k
+        results.append(result)
+        done = {r["k"]: r for r in results}
+        prefix = [done[k] for k in takewhile(done.__contains__, k_values)]
+        best_k = _elbow_from_improvements(pd.DataFrame(prefix), tolerance) if prefix else None
+        return early_stop and best_k is not None
+
+    if window == 1:
+        _init_select_k_worker(fit_sample, silhouette_sample)
+        try:
+            for k in k_values:
+                if fitted(_fit_for_k(k, random_state)):
+                    break
+        finally:
+            _worker_samples.clear()
+    else:
+        # Sliding window: the next k is submitted as soon as one finishes
+        pool = ProcessPoolExecutor(max_workers=window, initializer=_init_select_k_worker,
+                                   initargs=(fit_sample, silhouette_sample))
+        try:
+            pending_k = iter(k_values)
+            running = {pool.submit(_fit_for_k, k, random_state) for k in islice(pending_k, window)}
+            stop = False
+            while running and not stop:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stop = fitted(future.result()) or stop
+                if not stop:
+                    running |= {pool.submit(_fit_for_k, k, random_state) for k in islice(pending_k, len(done))}
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    metrics = pd.DataFrame(results).sort_values("k").reset_index(drop=True)
+    if best_k is None:
+        best_k = _elbow_by_distance(metrics)
+    best_k = int(best_k)
+
+    _SELECT_K_CACHE[cache_key] = (best_k, metrics)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump({"k": best_k, "metrics": metrics.to_dict(orient="list")}, f, indent=2)
+
+    return best_k, metrics.copy()
@@ -0,0 +1,158 @@
+# scripts/correlation.py
+
+import numpy as np
+import pandas as pd
+from summary_stats import QuantileDigest
+
+# Correlation matrices accumulated chunk by chunk from sums and cross-products:
+#
+#   corr = correlation_matrix(lambda: stream_data_from_postgres(query), columns=app_columns)
+#
+# Partial accumulators built by parallel workers are combined with merge().
+
+
+class CorrelationAccumulator:
+    """
+    Pearson correlation from running sums, in float64.
+
+    Like DataFrame.corr(), every pair of columns uses the rows where both are present.
+    For each chunk the pairwise counts, sums, sums of squares and cross-products are
+    obtained with four matrix products over the chunk. Values are shifted by a
+    per-column reference (the first chunk's mean) before accumulating, which keeps
+    the sums of squares well conditioned for large byte counts.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((k, k))
+        self.sums = np.zeros((k, k))
+        self.squares = np.zeros((k, k))
+        self.products = np.zeros((k, k))
+
+    def update(self, values):
+        """
+        Adds a chunk: a DataFrame holding the columns, or a float array in column order.
+        """
+        if isinstance(values, pd.DataFrame):
+            values = values[self.columns].to_numpy(dtype="float64", na_value=np.nan)
+        values = np.asarray(values, dtype="float64")
+        present = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                shift = np.where(present, values, 0).sum(axis=0) / present.sum(axis=0)
+            self.shift = np.nan_to_num(shift)
+
+        mask = present.astype("float64")
+        X = np.where(present, values - self.shift, 0.0)
+        # [i, j] entries only count rows where both column i and column j are present
+        self.n += mask.T @ mask
+        self.sums += X.T @ mask
+        self.squares += (X * X).T @ mask
+        self.products += X.T @ X
+        return self
+
+    def merge(self, other):
+        """
+        Merges the accumulator of another worker / partition (same columns) into this one.
+        """
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        # Re-express the other sums around this accumulator's reference point:
+        # x - a = (x - b) + d with d = b - a, per column (rows i, columns j)
+        d_i = (other.shift - self.shift)[:, None]
+        d_j = d_i.T
+        n = other.n
+        self.products += other.products + other.sums * d_j + d_i * other.sums.T + d_i * d_j * n
+        self.squares += other.squares + 2 * d_i * other.sums + d_i ** 2 * n
+        self.sums += other.sums + d_i * n
+        self.n += n
+        return self
+
+    def pearson(self):
+        """
+        Returns the Pearson correlation matrix as a DataFrame.
+        """
+        n, sx, sxx, sxy = self.n, self.sums, self.squares, self.products
+        sy, syy = sx.T, sxx.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = n * sxy - sx * sy
+            variance_x = n * sxx - sx ** 2
+            variance_y = n * syy - sy ** 2
+            corr = covariance / np.sqrt(variance_x * variance_y)
+        corr = np.where((n > 1) & (variance_x > 0) & (variance_y > 0), np.clip(corr, -1, 1), np.nan)
+        np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def _chunk_source(data, chunk_size):
+    """
+    Returns a callable producing a fresh chunk iterator, or None if data can only be read once.
+    """
+    if isinstance(data, pd.DataFrame):
+        return lambda: (data.iloc[start:start + chunk_size] for start in range(0, len(data), chunk_size))
+    if callable(data):
+        return data
+    return None
+
+
+def correlation_matrix(data, columns=None, method="pearson", chunk_size=1000000):
+    """
+    Correlation matrix computed chunk by chunk, without holding all rows at once.
+
+    data can be a DataFrame (processed chunk_size rows at a time), a callable returning a
+    fresh iterator of chunks (e.g. lambda: stream_data_from_postgres(query)) or a plain
+    iterator of chunks (Pearson only).
+
+    Spearman makes two passes: the first builds a QuantileDigest per column, the second
+    replaces values by their approximate ranks and correlates those. Ranks are exact
+    while a column has at most 10k values. Unlike DataFrame.corr(), ranks are computed
+    over all present values of a column rather than per pair of columns, which only
+    differs when values are missing.
+
+    :param data: DataFrame, callable returning chunks, or iterator of chunks.
+    :param columns: Columns to correlate; defaults to the numeric columns of the first chunk.
+    :param method: 'pearson' or 'spearman'.
+    :param chunk_size: Rows per slice when data is a DataFrame.
+    :return: Correlation matrix as a DataFrame.
+    """
+    if method not in ("pearson", "spearman"):
+        raise ValueError("method must be 'pearson' or 'spearman'.")
+    source = _chunk_source(data, chunk_size)
+    if method == "spearman" and source is None:
+        raise ValueError("Spearman needs two passes: pass a DataFrame or a callable returning chunks.")
+
+    chunks = iter(source() if source is not None else data)
+    first = next(chunks, None)
+    if first is None:
+        return pd.DataFrame(index=columns or [], columns=columns or [], dtype="float64")
+    if columns is None:
+        columns = list(first.select_dtypes(include=["number"]).columns)
+
+    def values_of(chunk):
+        return chunk[columns].to_numpy(dtype="float64", na_value=np.nan)
+
+    def all_chunks():
+        # The first chunk was already read to find the columns
+        yield first
+        yield from chunks
+
+    accumulator = CorrelationAccumulator(columns)
+    if method == "pearson":
+        for chunk in all_chunks():
+            accumulator.update(values_of(chunk))
+        return accumulator.pearson()
+
+    digests = [QuantileDigest() for _ in columns]
+    for chunk in all_chunks():
+        values = values_of(chunk)
+        for j, digest in enumerate(digests):
+            digest.update(values[~np.isnan(values[:, j]), j])
+    for chunk in source():
+        values = values_of(chunk)
+        ranks = np.column_stack([digest.cdf_rank(values[:, j]) for j, digest in enumerate(digests)])
+        accumulator.update(ranks)
+    return accumulator.pearson()
@@ -1,155 +1,233 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import pandas as pd
+from xdr_schema import apply_xdr_schema
+from plot_rendering import chart, show_or_save
+from sketches import FrequentItems
+
+# Shared styling of the top-10 handset charts
+_TOP_10_STYLE = dict(rotation=45, ha='right', title_fontsize=16, label_fontsize=12)
+
+# Columns that should be numeric for aggregation (rows missing any of them are dropped when cleaning)
+NUMERIC_COLUMNS = [
+    'Dur. (ms)', 'Activity Duration DL (ms)', 'Activity Duration UL (ms)', 
+    'Avg RTT DL (ms)', 'Avg RTT UL (ms)', 'Avg Bearer TP DL (kbps)', 
+    'Avg Bearer TP UL (kbps)', 'TCP DL Retrans. Vol (Bytes)', 
+    'TCP UL Retrans. Vol (Bytes)', 'HTTP DL (Bytes)', 'HTTP UL (Bytes)', 
+    'Social Media DL (Bytes)', 'Social Media UL (Bytes)', 'Google DL (Bytes)', 
+    'Google UL (Bytes)', 'Email DL (Bytes)', 'Email UL (Bytes)', 
+    'Youtube DL (Bytes)', 'Youtube UL (Bytes)', 'Netflix DL (Bytes)', 
+    'Netflix UL (Bytes)', 'Gaming DL (Bytes)', 'Gaming UL (Bytes)', 
+    'Other DL (Bytes)', 'Other UL (Bytes)', 'Total UL (Bytes)', 'Total DL (Bytes)'
+]
+
+# Dimensions and measures of the handset cube
+CUBE_KEYS = ['Handset Manufacturer', 'Handset Type', 'complete']
+CUBE_MEASURES = [
+    'Dur. (ms)', 'Activity Duration DL (ms)', 'Activity Duration UL (ms)',
+    'Total DL (Bytes)', 'Total UL (Bytes)', 'Total Volume (Bytes)'
+]
 
-def plot_xdr_sessions(df):
+def clean_and_aggregate(df):
     """
-    Plots the number of xDR sessions (proxy: Activity Duration DL) for each application.
+    Ensures that the relevant columns are numeric and handles missing data.
     """
-    data = df.groupby('Handset Type')['Activity Duration DL (ms)'].sum().sort_values(ascending=False)
-    top_10_data = data.head(10)  # Ensure top 10 selection
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_10_data.index, y=top_10_data.values, palette="viridis")
-    plt.title("Number of xDR Sessions per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Activity Duration DL (ms)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    # Cast to the declared xDR schema in one pass (non-numeric values become NaN);
+    # columns that were already loaded with the schema are not touched
+    df = apply_xdr_schema(df, columns=NUMERIC_COLUMNS)
+    
+    # Drop rows with NaN values in any of the numeric columns
+    df_cleaned = df.dropna(subset=NUMERIC_COLUMNS)
+    
+    return df_cleaned
 
-def plot_session_duration(df):
+def _cube_from_frame(df):
     """
-    Plots session duration for each application.
+    Aggregates one frame (or chunk) into the handset cube.
     """
-    data = df.groupby('Handset Type')['Dur. (ms)'].sum().sort_values(ascending=False)
-    top_10_data = data.head(10)  # Ensure top 10 selection
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_10_data.index, y=top_10_data.values, palette="coolwarm")
-    plt.title("Session Duration per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Duration (ms)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    typed = apply_xdr_schema(df, columns=NUMERIC_COLUMNS)
+    measures = {
+        column: typed[column].to_numpy(dtype='float64', na_value=np.nan)
+        for column in CUBE_MEASURES[:-1]
+    }
+    # Per-row total; rows missing DL or UL do not contribute, as with a row-wise sum
+    measures['Total Volume (Bytes)'] = measures['Total DL (Bytes)'] + measures['Total UL (Bytes)']
 
-def plot_dl_ul_data(df):
+    frame = pd.DataFrame({
+        'Handset Manufacturer': typed['Handset Manufacturer'],
+        'Handset Type': typed['Handset Type'],
+        # Rows that survive clean_and_aggregate
+        'complete': typed[NUMERIC_COLUMNS].notna().all(axis=1),
+        **measures,
+    })
+    named_aggregations = {'sessions': ('complete', 'size')}
+    for column in CUBE_MEASURES:
+        named_aggregations[f'{column} sum'] = (column, 'sum')
+        named_aggregations[f'{column} count'] = (column, 'count')
+    return frame.groupby(CUBE_KEYS, observed=True, dropna=False).agg(**named_aggregations)
+
+def handset_cube(df):
     """
-    Plots total download (DL) and upload (UL) data for each application.
+    Aggregate cube of the xDR sessions per handset manufacturer, handset type and
+    completeness (whether the row survives clean_and_aggregate).
+
+    For every cell it holds the number of sessions and the sum / non-null count of
+    session duration, activity duration DL/UL, total DL, total UL and total volume.
+    Every customer overview chart is a roll-up of this cube: build it once and pass it
+    to the chart builders and plot functions instead of the frame, so the xDR frame is
+    scanned once however many charts are drawn. Nothing is cached, so a frame modified
+    in place just needs a new cube. An iterator of chunks is aggregated chunk by chunk
+    and the partial cubes are merged.
+
+    :param df: DataFrame of xDR rows, or an iterator of DataFrame chunks.
+    :return: DataFrame indexed by (Handset Manufacturer, Handset Type, complete).
     """
-    data = df.groupby('Handset Type')[['Total DL (Bytes)', 'Total UL (Bytes)']].sum()
-    top_10_data = data.sort_values(by='Total DL (Bytes)', ascending=False).head(10)
-    # Stacked bar chart: Sum of DL and UL
-    top_10_data.plot(kind='bar', stacked=True, figsize=(12, 6), colormap="cividis")
-    plt.title("Total DL and UL Data per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Data Volume (Bytes)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    if not isinstance(df, pd.DataFrame):
+        partials = [_cube_from_frame(chunk) for chunk in df]
+        return pd.concat(partials).groupby(level=CUBE_KEYS, observed=True, dropna=False).sum()
+    return _cube_from_frame(df)
 
-def plot_total_data_volume(df):
+def _roll_up(cube, level, column, complete_only=False):
     """
-    Plots total data volume (DL + UL) for each application.
+    Sums a cube column per handset type or manufacturer, optionally over complete rows only
+    (an empty result when no row is complete).
     """
-    df['Total Data Volume (Bytes)'] = df['Total DL (Bytes)'] + df['Total UL (Bytes)']
-    data = df.groupby('Handset Type')['Total Data Volume (Bytes)'].sum().sort_values(ascending=False)
-    top_10_data = data.head(10)  # Ensure top 10 selection
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_10_data.index, y=top_10_data.values, palette="viridis")
-    plt.title("Total Data Volume per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Total Data Volume (Bytes)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    if complete_only:
+        cube = cube[cube.index.get_level_values('complete').to_numpy(dtype=bool)]
+    return cube[column].groupby(level=level, observed=True).sum()
+
+def _source_cube(data):
+    # Chart builders accept either xDR rows or a cube built with handset_cube
+    if isinstance(data, pd.DataFrame) and list(data.index.names) == CUBE_KEYS:
+        return data
+    return handset_cube(data)
 
-def plot_top_10_handsets(df):
+# Aggregates for each chart (returned as chart specs, see plot_rendering.py)
+def xdr_sessions_chart(df):
     """
-    Plots the top 10 handsets used by customers.
+    Number of xDR sessions (proxy: Activity Duration DL) for each handset type, top 10.
     """
-    data = df['Handset Type'].value_counts().head(10)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=data.index, y=data.values, palette="magma")
-    plt.title("Top 10 Handsets", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Count", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    # Cleaned rows only, as in clean_and_aggregate
+    data = _roll_up(_source_cube(df), 'Handset Type', 'Activity Duration DL (ms) sum', complete_only=True)
+    data = data.sort_values(ascending=False)
+    return chart('xdr_sessions', 'bar', data.head(10), "Number of xDR Sessions per Application (Top 10)",
+                 "Handset Type", "Activity Duration DL (ms)", palette="viridis", **_TOP_10_STYLE)
 
-def plot_top_3_manufacturers(df):
+def session_duration_chart(df):
     """
-    Plots the top 3 handset manufacturers based on usage.
+    Session duration for each handset type, top 10.
     """
-    data = df['Handset Manufacturer'].value_counts().head(3)
-    plt.figure(figsize=(8, 5))
-    sns.barplot(x=data.index, y=data.values, palette="cool")
-    plt.title("Top 3 Handset Manufacturers", fontsize=16)
-    plt.xlabel("Handset Manufacturer", fontsize=12)
-    plt.ylabel("Count", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
+    data = _roll_up(_source_cube(df), 'Handset Type', 'Dur. (ms) sum', complete_only=True)
+    data = data.sort_values(ascending=False)
+    return chart('session_duration', 'bar', data.head(10), "Session Duration per Application (Top 10)",
+                 "Handset Type", "Duration (ms)", palette="coolwarm", **_TOP_10_STYLE)
 
+def dl_ul_data_chart(df):
+    """
+    Total download (DL) and upload (UL) data for each handset type, top 10 by DL.
+    """
+    cube = _source_cube(df)
+    data = pd.DataFrame({
+        'Total DL (Bytes)': _roll_up(cube, 'Handset Type', 'Total DL (Bytes) sum'),
+        'Total UL (Bytes)': _roll_up(cube, 'Handset Type', 'Total UL (Bytes) sum'),
+    })
+    top_10_data = data.sort_values(by='Total DL (Bytes)', ascending=False).head(10)
+    top_10_data.index = top_10_data.index.astype(str)
+    # Stacked bar chart: Sum of DL and UL
+    return chart('dl_ul_data', 'frame_bar', top_10_data, "Total DL and UL Data per Application (Top 10)",
+                 "Handset Type", "Data Volume (Bytes)", stacked=True, colormap="cividis", **_TOP_10_STYLE)
 
-import pandas as pd
+def total_data_volume_chart(df):
+    """
+    Total data volume (DL + UL) for each handset type, top 10.
+    """
+    data = _roll_up(_source_cube(df), 'Handset Type', 'Total Volume (Bytes) sum').sort_values(ascending=False)
+    return chart('total_data_volume', 'bar', data.head(10), "Total Data Volume per Application (Top 10)",
+                 "Handset Type", "Total Data Volume (Bytes)", palette="viridis", **_TOP_10_STYLE)
 
-def clean_and_aggregate(df):
+def handset_rankings(chunks, capacity=1000):
     """
-    Ensures that the relevant columns are numeric and handles missing data.
+    Streams xDR chunks into bounded frequent-item sketches of handset types and manufacturers,
+    for rankings over more data than fits in memory. capacity=None keeps exact counts.
+
+    :return: Dictionary column -> FrequentItems, accepted by the top-N chart builders.
+    """
+    rankings = {column: FrequentItems(capacity=capacity) for column in ['Handset Type', 'Handset Manufacturer']}
+    for chunk in chunks:
+        for column, sketch in rankings.items():
+            sketch.update(chunk[column])
+    return rankings
+
+def _top_sessions(data, level, n):
+    # data is xDR rows, a handset cube, or the output of handset_rankings
+    if isinstance(data, dict):
+        return data[level].top(n)
+    return _roll_up(_source_cube(data), level, 'sessions').sort_values(ascending=False).head(n)
+
+def top_10_handsets_chart(df):
+    """
+    Top 10 handsets used by customers.
+    """
+    data = _top_sessions(df, 'Handset Type', 10)
+    return chart('top_10_handsets', 'bar', data, "Top 10 Handsets",
+                 "Handset Type", "Count", palette="magma", **_TOP_10_STYLE)
+
+def top_3_manufacturers_chart(df):
+    """
+    Top 3 handset manufacturers based on usage.
     """
-    # List of columns that should be numeric for aggregation
-    numeric_columns = [
-        'Dur. (ms)', 'Activity Duration DL (ms)', 'Activity Duration UL (ms)', 
-        'Avg RTT DL (ms)', 'Avg RTT UL (ms)', 'Avg Bearer TP DL (kbps)', 
-        'Avg Bearer TP UL (kbps)', 'TCP DL Retrans. Vol (Bytes)', 
-        'TCP UL Retrans. Vol (Bytes)', 'HTTP DL (Bytes)', 'HTTP UL (Bytes)', 
-        'Social Media DL (Bytes)', 'Social Media UL (Bytes)', 'Google DL (Bytes)', 
-        'Google UL (Bytes)', 'Email DL (Bytes)', 'Email UL (Bytes)', 
-        'Youtube DL (Bytes)', 'Youtube UL (Bytes)', 'Netflix DL (Bytes)', 
-        'Netflix UL (Bytes)', 'Gaming DL (Bytes)', 'Gaming UL (Bytes)', 
-        'Other DL (Bytes)', 'Other UL (Bytes)', 'Total UL (Bytes)', 'Total DL (Bytes)'
+    data = _top_sessions(df, 'Handset Manufacturer', 3)
+    return chart('top_3_manufacturers', 'bar', data, "Top 3 Handset Manufacturers",
+                 "Handset Manufacturer", "Count", figsize=(8, 5), palette="cool", **_TOP_10_STYLE)
+
+def overview_charts(df):
+    """
+    Chart specs for every customer overview chart, e.g. for plot_rendering.render_charts.
+    All of them are rolled up from a single handset cube.
+    """
+    cube = handset_cube(df)
+    return [
+        xdr_sessions_chart(cube),
+        session_duration_chart(cube),
+        dl_ul_data_chart(cube),
+        total_data_volume_chart(cube),
+        top_10_handsets_chart(cube),
+        top_3_manufacturers_chart(cube),
     ]
-    
-    # Convert all relevant columns to numeric, setting errors='coerce' to handle non-numeric values
-    for column in numeric_columns:
-        df[column] = pd.to_numeric(df[column], errors='coerce')
-    
-    # Drop rows with NaN values in any of the numeric columns
-    df_cleaned = df.dropna(subset=numeric_columns)
-    
-    return df_cleaned
 
-def plot_xdr_sessions(df):
+# Plotting functions: shown interactively, or saved to output_dir when one is given.
+# Each accepts the xDR rows or a cube from handset_cube (built once for several plots).
+def plot_xdr_sessions(df, output_dir=None):
     """
     Plots the number of xDR sessions (proxy: Activity Duration DL) for each application.
     """
-    df_cleaned = clean_and_aggregate(df)  # Clean the data before plotting
-    data = df_cleaned.groupby('Handset Type')['Activity Duration DL (ms)'].sum().sort_values(ascending=False)
-    top_10_data = data.head(10)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_10_data.index, y=top_10_data.values, palette="viridis")
-    plt.title("Number of xDR Sessions per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Activity Duration DL (ms)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
-
-# Example for another plot:
-def plot_session_duration(df):
+    return show_or_save(xdr_sessions_chart(df), output_dir)
+
+def plot_session_duration(df, output_dir=None):
     """
     Plots session duration for each application.
     """
-    df_cleaned = clean_and_aggregate(df)  # Clean the data before plotting
-    data = df_cleaned.groupby('Handset Type')['Dur. (ms)'].sum().sort_values(ascending=False)
-    top_10_data = data.head(10)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=top_10_data.index, y=top_10_data.values, palette="coolwarm")
-    plt.title("Session Duration per Application (Top 10)", fontsize=16)
-    plt.xlabel("Handset Type", fontsize=12)
-    plt.ylabel("Duration (ms)", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
-
-# Add similar cleaning steps for other plotting functions...
+    return show_or_save(session_duration_chart(df), output_dir)
+
+def plot_dl_ul_data(df, output_dir=None):
+    """
+    Plots total download (DL) and upload (UL) data for each application.
+    """
+    return show_or_save(dl_ul_data_chart(df), output_dir)
+
+def plot_total_data_volume(df, output_dir=None):
+    """
+    Plots total data volume (DL + UL) for each application.
+    """
+    return show_or_save(total_data_volume_chart(df), output_dir)
+
+def plot_top_10_handsets(df, output_dir=None):
+    """
+    Plots the top 10 handsets used by customers.
+    """
+    return show_or_save(top_10_handsets_chart(df), output_dir)
+
+def plot_top_3_manufacturers(df, output_dir=None):
+    """
+    Plots the top 3 handset manufacturers based on usage.
+    """
+    return show_or_save(top_3_manufacturers_chart(df), output_dir)
@@ -1,23 +1,19 @@
 import pandas as pd
-import psycopg2
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-
-# Database connection details
-DB_CONFIG = {
-    "dbname": "xdr_data_db",
-    "user": "postgres",
-    "password": "your_password",
-    "host": "localhost",
-    "port": "5432"
-}
+from database import get_engine, get_raw_connection
+from plot_rendering import chart, histogram_data, show_or_save
+from summary_stats import summarize
+from correlation import correlation_matrix
+from pca import fit_pca
+from imputation import ChunkedImputer
 
 # Function to create a database connection
 def create_connection():
+    """
+    Returns a DB-API connection borrowed from the shared pool (see database.py).
+    Closing it hands it back to the pool.
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_raw_connection()
         return conn
     except Exception as e:
         print(f"Error connecting to database: {e}")
@@ -43,32 +39,33 @@ def get_user_behavior_data():
     FROM public.xdr_data
     GROUP BY "MSISDN/Number";
     """
-    conn = create_connection()
-    if conn:
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
-    else:
+    try:
+        with get_engine().connect() as conn:
+            return pd.read_sql_query(query, conn)
+    except Exception as e:
+        print(f"Error connecting to database: {e}")
         return None
 
 # Task 1.2 - Handling Missing Values
-def handle_missing_values(df):
-    return df.fillna(df.mean(numeric_only=True))
+# imputer: optional ChunkedImputer fitted earlier, instead of computing the means on df
+def handle_missing_values(df, imputer=None):
+    # Identifier columns (IMSI, MSISDN, Bearer Id, ...) are never filled with a statistic
+    if imputer is None:
+        imputer = ChunkedImputer(numeric_strategy='mean', categorical_strategy=None).fit(df)
+    return imputer.transform(df)
 
 # Task 1.2 - Exploratory Data Analysis
-def exploratory_analysis(df):
+def exploratory_analysis(df, output_dir=None):
+    stats = summarize(df)
     print("Basic Metrics:")
-    print(df.describe())
+    print(stats.describe())
     print("\nMissing Values:")
-    print(df.isnull().sum())
+    print(stats.null_counts())
 
     # Plot distribution of session duration
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['total_duration'], kde=True, bins=30)
-    plt.title('Distribution of Total Session Duration')
-    plt.xlabel('Total Duration (ms)')
-    plt.ylabel('Frequency')
-    plt.show()
+    spec = chart('total_duration_distribution', 'hist', histogram_data(df['total_duration'], bins=30),
+                 'Distribution of Total Session Duration', 'Total Duration (ms)', 'Frequency', figsize=(10, 6))
+    show_or_save(spec, output_dir)
 
 # Task 1.2 - Variable Transformation and Segmentation
 def segment_users_by_decile(df):
@@ -80,28 +77,29 @@ def segment_users_by_decile(df):
     return decile_summary
 
 # Task 1.2 - Correlation Analysis
-def correlation_analysis(df):
+def correlation_analysis(df, output_dir=None):
     correlation_columns = [
         'social_media_volume', 'google_volume', 'email_volume',
         'youtube_volume', 'netflix_volume', 'gaming_volume', 'other_volume'
     ]
-    correlation_matrix = df[correlation_columns].corr()
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
-    plt.title("Correlation Matrix")
-    plt.show()
-    return correlation_matrix
+    # Accumulated chunk by chunk; df can also be a callable returning chunk iterators
+    correlation = correlation_matrix(df, correlation_columns)
+    spec = chart('correlation_matrix', 'heatmap', correlation, "Correlation Matrix",
+                 figsize=(10, 8), annot=True, cmap='coolwarm')
+    show_or_save(spec, output_dir)
+    return correlation
 
 # Task 1.2 - Dimensionality Reduction
-def perform_pca(df):
+# backend: 'full', 'randomized' or 'incremental' (bounded memory); model_path caches the fitted model
+def perform_pca(df, n_components=2, backend='full', model_path=None):
     features = [
         'social_media_volume', 'google_volume', 'email_volume',
         'youtube_volume', 'netflix_volume', 'gaming_volume', 'other_volume'
     ]
     x = df[features].fillna(0).values
-    x_scaled = StandardScaler().fit_transform(x)
-    pca = PCA(n_components=2)
-    principal_components = pca.fit_transform(x_scaled)
-    explained_variance = pca.explained_variance_ratio_
+    model = fit_pca(x, n_components=n_components, backend=backend, scale=True, model_path=model_path)
+    principal_components = model.transform(x)
+    explained_variance = model[-1].explained_variance_ratio_
     print("Explained Variance Ratios:", explained_variance)
-    return pd.DataFrame(principal_components, columns=['PC1', 'PC2'])
+    return pd.DataFrame(principal_components, columns=[f'PC{i + 1}' for i in range(principal_components.shape[1])])
 
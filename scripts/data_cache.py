@@ -0,0 +1,226 @@
+# scripts/data_cache.py
+
+import os
+import re
+import json
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+from load_data import stream_data_from_postgres
+
+# Where cached extracts are stored (one sub-directory per query hash)
+CACHE_DIR = os.getenv(
+    "XDR_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "xdr_cache")
+)
+
+STATE_FILE = "_cache_state.json"
+
+# Start / End are TEXT in public.xdr_data ('4/9/2019 17:42'), so the refresh compares them
+# as timestamps: parsed with this pattern in SQL, against the watermark cast from ISO text
+WATERMARK_FILTER = """to_timestamp("{column}", 'MM/DD/YYYY HH24:MI') > %(watermark)s::timestamp"""
+
+# The same pattern for pandas, used when a chunk was read without the xDR schema
+WATERMARK_TIME_FORMAT = "%m/%d/%Y %H:%M"
+
+# Columns each analysis task actually reads, used for column projection on load
+TASK_COLUMNS = {
+    "user_overview": [
+        "Bearer Id", "IMSI", "MSISDN/Number", "Dur. (ms)",
+        "Handset Manufacturer", "Handset Type",
+        "Activity Duration DL (ms)", "Activity Duration UL (ms)",
+        "Social Media DL (Bytes)", "Social Media UL (Bytes)",
+        "Google DL (Bytes)", "Google UL (Bytes)",
+        "Email DL (Bytes)", "Email UL (Bytes)",
+        "Youtube DL (Bytes)", "Youtube UL (Bytes)",
+        "Netflix DL (Bytes)", "Netflix UL (Bytes)",
+        "Gaming DL (Bytes)", "Gaming UL (Bytes)",
+        "Other DL (Bytes)", "Other UL (Bytes)",
+        "Total UL (Bytes)", "Total DL (Bytes)",
+    ],
+    "engagement": [
+        "Bearer Id", "IMSI", "Dur. (ms)",
+        "Social Media DL (Bytes)", "Social Media UL (Bytes)",
+        "Youtube DL (Bytes)", "Youtube UL (Bytes)",
+        "Gaming DL (Bytes)", "Gaming UL (Bytes)",
+        "Email DL (Bytes)", "Email UL (Bytes)",
+        "Total UL (Bytes)", "Total DL (Bytes)",
+    ],
+    "experience": [
+        "MSISDN/Number", "Handset Type",
+        "TCP DL Retrans. Vol (Bytes)", "TCP UL Retrans. Vol (Bytes)",
+        "Avg RTT DL (ms)", "Avg RTT UL (ms)",
+        "Avg Bearer TP DL (kbps)", "Avg Bearer TP UL (kbps)",
+    ],
+    "satisfaction": [
+        "Bearer Id", "IMSI", "MSISDN/Number", "Dur. (ms)",
+        "Total UL (Bytes)", "Total DL (Bytes)",
+        "Youtube DL (Bytes)", "Netflix DL (Bytes)", "Gaming DL (Bytes)",
+    ],
+}
+
+
+def query_hash(query):
+    """
+    Returns a short, stable hash of an SQL query (whitespace-insensitive).
+    """
+    normalized = re.sub(r"\s+", " ", query.strip().rstrip(";")).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_path(query, cache_dir):
+    return os.path.join(cache_dir, query_hash(query))
+
+
+def _read_state(path):
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def _write_state(path, state):
+    # Write-then-rename so a crash never leaves a half-written state file
+    state_path = os.path.join(path, STATE_FILE)
+    with open(state_path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def _to_json_value(value):
+    """
+    Converts a watermark value (Timestamp, NumPy scalar, ...) into something JSON can store.
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _watermark_of(series):
+    """
+    Largest value of the watermark column of a chunk: a Timestamp for date columns (text
+    columns are parsed with WATERMARK_TIME_FORMAT), the plain maximum for numeric ones.
+    """
+    if not (pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype)):
+        series = pd.to_datetime(series, format=WATERMARK_TIME_FORMAT, errors="coerce")
+    value = series.max()
+    return None if pd.isna(value) else value
+
+
+def _remove_parts(path, refresh_id):
+    for part in glob.glob(os.path.join(path, f"part-{refresh_id:05d}-*.parquet")):
+        os.remove(part)
+
+
+def _compact_dtypes(df):
+    """
+    Stores repeated strings (handset names, locations, ...) as categoricals,
+    which Parquet writes as compact dictionary-encoded columns.
+    """
+    object_columns = df.select_dtypes(include=["object", "string"]).columns
+    return df.astype({column: "category" for column in object_columns})
+
+
+def refresh_cache(query, watermark_column="Start", cache_dir=CACHE_DIR, chunk_size=100000,
+                  watermark_filter=WATERMARK_FILTER, connection=None):
+    """
+    Brings the Parquet cache of a query up to date.
+
+    The first call stores the full result. Later calls only fetch rows whose
+    watermark_column is strictly greater than the largest value cached so far and
+    write them as new Parquet partitions. Rows arriving late with an older value
+    are not picked up.
+
+    The watermark is kept in the state file as an ISO timestamp (or a number for
+    numeric columns) and compared in SQL through watermark_filter, whose default
+    parses the TEXT Start / End columns of xdr_data; pass e.g.
+    '"{column}" > :watermark' for a typed column or another paramstyle. A refresh
+    that fails removes the partitions it already wrote, so a retry fetches them again
+    without duplicating rows.
+
+    :param query: SQL query producing the extract.
+    :param watermark_column: Column used to detect new rows, or None to never refresh.
+    :param cache_dir: Root directory of the cache.
+    :param chunk_size: Rows per streamed chunk (and per Parquet partition file).
+    :param watermark_filter: SQL condition on "{column}" with a `watermark` parameter.
+    :param connection: Optional open DB-API connection (see stream_data_from_postgres).
+    :return: Number of rows added to the cache.
+    """
+    path = _cache_path(query, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    state = _read_state(path)
+
+    if state.get("refreshes") and watermark_column is None:
+        return 0
+
+    params = None
+    fetch_query = query
+    if state.get("watermark") is not None:
+        fetch_query = (
+            f'SELECT * FROM ({query.strip().rstrip(";")}) AS src '
+            f'WHERE {watermark_filter.format(column=watermark_column)}'
+        )
+        params = {"watermark": state["watermark"]}
+
+    refresh_id = state.get("refreshes", 0)
+    # Partitions left behind by a refresh that was killed before it could clean up
+    _remove_parts(path, refresh_id)
+
+    watermark = None
+    new_rows = 0
+    try:
+        chunks = stream_data_from_postgres(fetch_query, chunk_size, connection=connection, params=params)
+        for i, chunk in enumerate(chunks):
+            if watermark_column is not None and watermark_column in chunk.columns:
+                chunk_max = _watermark_of(chunk[watermark_column])
+                if chunk_max is not None:
+                    watermark = chunk_max if watermark is None else max(watermark, chunk_max)
+
+            chunk = _compact_dtypes(chunk)
+            chunk.to_parquet(os.path.join(path, f"part-{refresh_id:05d}-{i:05d}.parquet"), index=False)
+            new_rows += len(chunk)
+    except Exception:
+        _remove_parts(path, refresh_id)
+        raise
+
+    state.update({
+        "query": query,
+        "watermark_column": watermark_column,
+        "watermark": state.get("watermark") if watermark is None else _to_json_value(watermark),
+        "refreshes": refresh_id + 1,
+        "rows": state.get("rows", 0) + new_rows,
+    })
+    _write_state(path, state)
+    print(f"Cache refreshed: {new_rows} new rows (watermark: {state['watermark']}).")
+    return new_rows
+
+
+def load_cached_extract(query, columns=None, task=None, refresh=True,
+                        watermark_column="Start", cache_dir=CACHE_DIR):
+    """
+    Loads a query's result from the local Parquet cache, refreshing it first if asked.
+
+    Only the requested columns are read from disk. Pass either an explicit column
+    list or a task name from TASK_COLUMNS ('user_overview', 'engagement',
+    'experience', 'satisfaction').
+
+    :param query: SQL query producing the extract (its hash is the cache key).
+    :param columns: Columns to read; defaults to the task's columns, or all columns.
+    :param task: Optional task name used to pick columns.
+    :param refresh: Whether to fetch new rows from the database before loading.
+    :param watermark_column: Column used for incremental refresh.
+    :param cache_dir: Root directory of the cache.
+    :return: DataFrame containing the cached rows.
+    """
+    path = _cache_path(query, cache_dir)
+    if refresh or not glob.glob(os.path.join(path, "*.parquet")):
+        refresh_cache(query, watermark_column=watermark_column, cache_dir=cache_dir)
+
+    if columns is None and task is not None:
+        columns = TASK_COLUMNS[task]
+
+    return pd.read_parquet(path, columns=columns)
@@ -1,14 +1,16 @@
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
+from plot_rendering import chart, histogram_data, sample_rows, show_or_save
+from summary_stats import summarize
+from correlation import correlation_matrix
 
-def explore_data(df):
+def explore_data(df, output_dir=None):
     """
     Performs exploratory data analysis (EDA) on a DataFrame.
 
     Parameters:
         df (pd.DataFrame): The DataFrame to explore.
+        output_dir (str, optional): Save the charts to this directory instead of showing them.
 
     Returns:
         None: Outputs key findings and visualizations.
@@ -19,18 +21,21 @@ def explore_data(df):
     print("\n### Dataset Shape ###")
     print(f"Rows: {df.shape[0]}, Columns: {df.shape[1]}")
     
+    # Summary statistics, missing values and duplicates in a single chunked pass
+    stats = summarize(df)
+
     # 2. Summary Statistics
     print("\n### Summary Statistics ###")
-    print(df.describe(include='all'))
+    print(stats.describe(include='all'))
     
     # 3. Check for Missing Values
     print("\n### Missing Values ###")
-    missing_values = df.isnull().sum().sort_values(ascending=False)
+    missing_values = stats.null_counts().sort_values(ascending=False)
     print(missing_values[missing_values > 0])
     
     # 4. Check for Duplicates
     print("\n### Duplicate Rows ###")
-    duplicates = df.duplicated().sum()
+    duplicates = stats.duplicate_rows
     print(f"Duplicate Rows: {duplicates}")
     
     # 5. Correlation Matrix (Numerical Columns)
@@ -39,11 +44,10 @@ def explore_data(df):
         # Select only numeric columns for correlation
         numeric_cols = df.select_dtypes(include=[np.number])
         if not numeric_cols.empty:
-            correlation_matrix = numeric_cols.corr()
-            plt.figure(figsize=(12, 8))
-            sns.heatmap(correlation_matrix, annot=False, cmap='coolwarm')
-            plt.title("Correlation Matrix")
-            plt.show()
+            correlation = correlation_matrix(numeric_cols)
+            spec = chart("correlation_matrix", "heatmap", correlation, "Correlation Matrix",
+                         figsize=(12, 8), annot=False, cmap='coolwarm')
+            show_or_save(spec, output_dir)
         else:
             print("No numeric columns available for correlation matrix.")
     except Exception as e:
@@ -55,23 +59,21 @@ def explore_data(df):
     # Distribution of Numeric Columns
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     for col in numeric_cols[:5]:  # Limit to first 5 for brevity
-        sns.histplot(df[col].dropna(), kde=True, bins=30)
-        plt.title(f"Distribution of {col}")
-        plt.xlabel(col)
-        plt.ylabel("Frequency")
-        plt.show()
+        spec = chart(f"distribution_{col}", "hist", histogram_data(df[col], bins=30),
+                     f"Distribution of {col}", col, "Frequency")
+        show_or_save(spec, output_dir)
 
     # Bar plot for Categorical Columns
-    categorical_cols = df.select_dtypes(include=['object']).columns
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns
     for col in categorical_cols[:5]:  # Limit to first 5 for brevity
-        sns.countplot(data=df, y=col, order=df[col].value_counts().index)
-        plt.title(f"Value Counts for {col}")
-        plt.xlabel("Count")
-        plt.ylabel(col)
-        plt.show()
+        counts = df[col].value_counts()
+        spec = chart(f"value_counts_{col}", "barh", counts, f"Value Counts for {col}", "Count", col)
+        show_or_save(spec, output_dir)
     
     # Pair Plot for Numerical Columns
     if len(numeric_cols) > 1:
         print("\n### Pair Plot (First 5 Numeric Columns) ###")
-        sns.pairplot(df[numeric_cols[:5]])
-        plt.show()
+        # Drawn from a bounded sample of rows
+        spec = chart("pair_plot", "pairplot", sample_rows(df[numeric_cols[:5]], 10000),
+                     "Pair Plot (First 5 Numeric Columns)", figsize=(12, 12))
+        show_or_save(spec, output_dir)
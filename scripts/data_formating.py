@@ -1,43 +1,124 @@
 import pandas as pd
 
-def format_data(df):
+# How each column is typed and, at export time, rendered. Formatting keeps native dtypes
+# (datetime64, float, category); strings are only produced by format_for_export:
+#
+#   df = format_data(df)                              # typed, still numeric
+#   ... analysis ...
+#   format_for_export(df).to_csv("report.csv", index=False)
+#
+# Types: 'datetime' (format: strftime pattern), 'numeric' (decimals, thousands separator,
+# optional dtype), 'text' (trimmed and lowercased), 'category'.
+FORMAT_SPEC = {
+    "date_column": {"type": "datetime", "format": "%Y-%m-%d"},
+    "numerical_column": {"type": "numeric", "decimals": 2, "thousands": True},
+    "text_column": {"type": "text"},
+    "categorical_column": {"type": "category"},
+}
+
+# Columns removed by format_data
+UNNECESSARY_COLUMNS = ["unnecessary_column"]
+
+def _convert(series, options):
+    """
+    Converts one column to the type of its spec; returns None when it already has it.
     """
-    Formats the input DataFrame by correcting data types, standardizing formats, 
-    and performing text and numerical formatting.
+    kind = options["type"]
+    if kind == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return None
+        return pd.to_datetime(series, errors="coerce")
+    if kind == "numeric":
+        dtype = options.get("dtype")
+        if not pd.api.types.is_numeric_dtype(series.dtype):
+            series = pd.to_numeric(series, errors="coerce")
+        elif dtype is None or series.dtype == dtype:
+            return None
+        return series if dtype is None else series.astype(dtype)
+    if kind == "text":
+        return series.str.strip().str.lower()
+    if kind == "category":
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return None
+        return series.astype("category")
+    raise ValueError(f"Unknown column type '{kind}'.")
+
+
+def _format_frame(df, spec, drop):
+    conversions = {}
+    for column, options in spec.items():
+        if column in df.columns:
+            converted = _convert(df[column], options)
+            if converted is not None:
+                conversions[column] = converted
+    # assign() copies only the converted columns; the input frame is not modified
+    formatted = df.assign(**conversions) if conversions else df
+    return formatted.drop(columns=[col for col in drop if col in formatted.columns])
+
 
-    :param df: pandas DataFrame to format.
-    :return: Formatted pandas DataFrame.
+def format_data(data, spec=None, drop=None):
     """
+    Formats the input DataFrame by correcting data types and normalising text, as
+    described by a column spec. Numbers and dates keep their native dtypes; use
+    format_for_export to render them as strings when writing the output.
+
+    :param data: pandas DataFrame to format, or an iterable of DataFrame chunks.
+    :param spec: Mapping column -> options (see FORMAT_SPEC, the default).
+    :param drop: Columns to remove (defaults to UNNECESSARY_COLUMNS).
+    :return: Formatted pandas DataFrame (a generator of chunks for chunked input), or
+             None if formatting failed. The input is not modified.
+    """
+    spec = FORMAT_SPEC if spec is None else spec
+    drop = UNNECESSARY_COLUMNS if drop is None else drop
+    if not isinstance(data, pd.DataFrame):
+        return (_format_frame(chunk, spec, drop) for chunk in data)
+
     try:
-        # 1. Convert Columns to Correct Data Types
-        if "date_column" in df.columns:
-            df["date_column"] = pd.to_datetime(df["date_column"], errors="coerce")  # Convert to datetime
-        
-        if "numerical_column" in df.columns:
-            df["numerical_column"] = pd.to_numeric(df["numerical_column"], errors="coerce")  # Convert to numeric
-
-        # 2. Standardize Date Format (if a date column exists)
-        if "date_column" in df.columns:
-            df["date_column"] = df["date_column"].dt.strftime('%Y-%m-%d')  # Standardize date format
-
-        # 3. Text Formatting (Trim whitespaces, convert to lowercase)
-        if "text_column" in df.columns:
-            df["text_column"] = df["text_column"].str.strip().str.lower()  # Trim spaces and lowercase text
-        
-        # 4. Handle Categorical Data
-        if "categorical_column" in df.columns:
-            df["categorical_column"] = df["categorical_column"].astype("category")  # Convert to category type
-
-        # 5. Format Numerical Columns (e.g., with thousands separator or 2 decimal places)
-        if "numerical_column" in df.columns:
-            df["numerical_column"] = df["numerical_column"].apply(lambda x: f"{x:,.2f}")  # Format with 2 decimals
-
-        # 6. Remove Unnecessary Columns (if any)
-        unnecessary_columns = ["unnecessary_column"]  # Add any columns you wish to remove
-        df.drop(columns=[col for col in unnecessary_columns if col in df.columns], inplace=True)
-
-        return df
+        return _format_frame(data, spec, drop)
 
     except Exception as e:
         print(f"An error occurred during data formatting: {e}")
         return None
+
+
+def format_numbers(series, decimals=2, thousands=True):
+    """
+    Renders numbers like f"{x:,.2f}", with one bound str.format per value (Series.map).
+    Missing values stay missing.
+
+    :param series: Numeric Series.
+    :param decimals: Digits after the decimal point.
+    :param thousands: Group the integer part with commas.
+    :return: Series of strings with the same index.
+    """
+    pattern = f"{{:{',' if thousands else ''}.{decimals}f}}"
+    return series.map(pattern.format, na_action="ignore").astype(object)
+
+
+def _render_frame(df, spec):
+    rendered = {}
+    for column, options in spec.items():
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if options["type"] == "numeric" and pd.api.types.is_numeric_dtype(series.dtype):
+            rendered[column] = format_numbers(series, options.get("decimals", 2), options.get("thousands", True))
+        elif options["type"] == "datetime" and "format" in options and pd.api.types.is_datetime64_any_dtype(series.dtype):
+            rendered[column] = series.dt.strftime(options["format"])
+    return df.assign(**rendered) if rendered else df
+
+
+def format_for_export(data, spec=None):
+    """
+    Renders the columns of a formatted DataFrame as display strings (dates with their
+    strftime pattern, numbers with fixed decimals and thousands separators), right
+    before writing it out.
+
+    :param data: DataFrame returned by format_data, or an iterable of such chunks.
+    :param spec: Mapping column -> options (see FORMAT_SPEC, the default).
+    :return: DataFrame with the rendered columns (a generator for chunked input).
+    """
+    spec = FORMAT_SPEC if spec is None else spec
+    if not isinstance(data, pd.DataFrame):
+        return (_render_frame(chunk, spec) for chunk in data)
+    return _render_frame(data, spec)
@@ -0,0 +1,101 @@
+# scripts/database.py
+
+import os
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Fetch database connection parameters from environment variables
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Optional full SQLAlchemy URL, e.g. "sqlite:///xdr.db" for a local stand-in
+DB_URL = os.getenv("DB_URL")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_connection_string():
+    """
+    Builds the SQLAlchemy connection string from the environment.
+
+    :return: Connection string for the xDR database.
+    """
+    if DB_URL:
+        return DB_URL
+    return f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def get_engine(pool_size=None, max_overflow=None, pool_recycle=None, pool_pre_ping=None):
+    """
+    Returns the shared SQLAlchemy engine, creating it on first use.
+
+    The engine keeps a pool of open connections, so repeated queries reuse an
+    existing connection instead of paying connect and TLS setup every time.
+    Pool settings default to the DB_POOL_* environment variables and only take
+    effect when the engine is first created (call dispose_engine to rebuild it).
+
+    :param pool_size: Number of connections kept open in the pool.
+    :param max_overflow: Extra connections allowed above pool_size under load.
+    :param pool_recycle: Seconds after which a pooled connection is replaced.
+    :param pool_pre_ping: Whether to test connections before handing them out.
+    :return: SQLAlchemy Engine.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            connection_string = get_connection_string()
+            options = {
+                "pool_pre_ping": DB_POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+                "pool_recycle": DB_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+            }
+            # SQLite stand-ins use their own pool classes, which do not take sizing options
+            if not connection_string.startswith("sqlite"):
+                options["pool_size"] = DB_POOL_SIZE if pool_size is None else pool_size
+                options["max_overflow"] = DB_MAX_OVERFLOW if max_overflow is None else max_overflow
+            _engine = create_engine(connection_string, **options)
+
+    return _engine
+
+
+def get_raw_connection():
+    """
+    Checks out a pooled DB-API (psycopg2) connection from the shared engine.
+
+    Calling close() on the returned connection hands it back to the pool
+    instead of closing the underlying socket.
+
+    :return: Pooled DB-API connection.
+    """
+    return get_engine().raw_connection()
+
+
+def dispose_engine():
+    """
+    Closes all pooled connections and forgets the shared engine.
+
+    Call this in a worker process after a fork so that the child does not
+    reuse the parent's sockets, or to rebuild the engine with new pool settings.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
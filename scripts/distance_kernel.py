@@ -0,0 +1,103 @@
+# scripts/distance_kernel.py
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# Euclidean distances of many rows to one point (e.g. a k-means centroid) without
+# full-size temporaries:
+#
+#   scores = distance_to_point(df[features], centroid)
+#
+# Replaces np.linalg.norm(df[features] - centroid, axis=1), which materialises the
+# difference frame and its squares in float64. Here every column is read in place,
+# blocks of block_rows rows are accumulated in small per-thread scratch buffers that
+# stay in cache, and the distances are written straight into the output array. NumPy
+# releases the GIL in these loops, so blocks run in parallel on n_threads threads.
+
+# Rows per block: 3 scratch vectors of 32k float64 (768 KB) stay in a per-core L2 cache
+BLOCK_ROWS = 32768
+
+_scratch = threading.local()
+
+
+def _columns_of(data):
+    """
+    The columns of a DataFrame (zero-copy for NumPy dtypes) or 2-D array as 1-D arrays.
+    """
+    if isinstance(data, pd.DataFrame):
+        series = [data.iloc[:, j] for j in range(data.shape[1])]
+        # Nullable extension columns (Int64, Float64, ...) are converted, with NaN for missing values
+        return [s.to_numpy() if isinstance(s.dtype, np.dtype) else s.to_numpy(dtype="float64", na_value=np.nan)
+                for s in series]
+    values = np.asarray(data)
+    if values.ndim != 2:
+        raise ValueError("data must be a DataFrame or a 2-D array.")
+    return [values[:, j] for j in range(values.shape[1])]
+
+
+def _buffers(block_rows, dtype):
+    # One pair of scratch vectors per thread, reused for every block it processes
+    key = (block_rows, dtype.str)
+    if getattr(_scratch, "key", None) != key:
+        _scratch.key = key
+        _scratch.diff = np.empty(block_rows, dtype=dtype)
+        _scratch.total = np.empty(block_rows, dtype=dtype)
+    return _scratch.diff, _scratch.total
+
+
+def _distance_block(columns, point, out, start, stop, block_rows):
+    diff, total = _buffers(block_rows, out.dtype)
+    n = stop - start
+    diff, total = diff[:n], total[:n]
+    total.fill(0)
+    for column, coordinate in zip(columns, point):
+        np.subtract(column[start:stop], coordinate, out=diff, casting="unsafe")
+        np.multiply(diff, diff, out=diff)
+        np.add(total, diff, out=total)
+    np.sqrt(total, out=out[start:stop])
+
+
+def distance_to_point(data, point, out=None, dtype=None, block_rows=BLOCK_ROWS, n_threads=None):
+    """
+    Euclidean distance of every row of data to point, computed in cache-sized blocks.
+
+    :param data: DataFrame or 2-D array (rows x features); columns are read in place.
+    :param point: Coordinates to measure from (one per column).
+    :param out: Optional preallocated 1-D output array (its dtype is used).
+    :param dtype: 'float32' or 'float64' computation and output; defaults to float32 when
+                  every column is float32, float64 otherwise.
+    :param block_rows: Rows per block.
+    :param n_threads: Threads (defaults to the number of CPUs; 1 runs inline).
+    :return: The output array (out if given).
+    """
+    columns = _columns_of(data)
+    n_rows = len(columns[0]) if columns else len(data)
+    point = np.asarray(point, dtype="float64").ravel()
+    if len(point) != len(columns):
+        raise ValueError(f"point has {len(point)} coordinates for {len(columns)} columns.")
+
+    if out is None:
+        if dtype is None:
+            dtype = "float32" if columns and all(column.dtype == np.float32 for column in columns) else "float64"
+        out = np.empty(n_rows, dtype=dtype)
+    elif out.shape != (n_rows,):
+        raise ValueError(f"out must have shape ({n_rows},).")
+    if out.dtype not in (np.float32, np.float64):
+        raise ValueError("Only float32 and float64 outputs are supported.")
+    point = point.astype(out.dtype)
+
+    starts = range(0, n_rows, block_rows)
+    n_threads = min(n_threads or os.cpu_count() or 1, len(starts))
+    if n_threads <= 1:
+        for start in starts:
+            _distance_block(columns, point, out, start, min(start + block_rows, n_rows), block_rows)
+    else:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            list(pool.map(
+                lambda start: _distance_block(columns, point, out, start, min(start + block_rows, n_rows), block_rows),
+                starts,
+            ))
+    return out
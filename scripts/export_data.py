@@ -0,0 +1,263 @@
+# scripts/export_data.py
+
+import io
+import time
+import numpy as np
+import pandas as pd
+from database import get_raw_connection
+
+# Signature, flags and header extension length of the PostgreSQL binary COPY format
+PGCOPY_HEADER = b"PGCOPY\n\377\r\n\0" + np.array([0, 0], dtype=">i4").tobytes()
+PGCOPY_TRAILER = np.array([-1], dtype=">i2").tobytes()
+
+# uint64 values are sent as NUMERIC with a fixed five base-10000 digits (10000**5 > 2**64):
+# ndigits, weight, sign and display scale, then the digits, most significant first.
+# PostgreSQL strips the leading zero digits on receive.
+NUMERIC_DIGITS = 5
+NUMERIC_FIELD = np.dtype([("header", ">i2", (4,)), ("digits", ">i2", (NUMERIC_DIGITS,))])
+
+
+def _quote_identifier(name):
+    """
+    Quotes a single identifier (column, table or index name) for use in SQL.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _quote_table(name):
+    """
+    Quotes a possibly schema-qualified table name such as 'public.satisfaction_analysis'.
+    """
+    return ".".join(_quote_identifier(part) for part in name.split("."))
+
+
+def _sql_type(dtype):
+    """
+    Maps a pandas dtype to the PostgreSQL column type used for export.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_unsigned_integer_dtype(dtype) and dtype.itemsize == 8:
+        # uint64 values (e.g. Bearer Id) can exceed BIGINT
+        return "NUMERIC(20)"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DOUBLE PRECISION"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _binary_field_dtype(dtype):
+    """
+    Returns the big-endian NumPy dtype used to encode a column in binary COPY format.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return np.dtype("?")
+    if pd.api.types.is_unsigned_integer_dtype(dtype) and dtype.itemsize == 8:
+        return NUMERIC_FIELD
+    if pd.api.types.is_integer_dtype(dtype):
+        return np.dtype(">i8")
+    if pd.api.types.is_float_dtype(dtype):
+        return np.dtype(">f8")
+    raise ValueError(f"Binary COPY only supports numeric and boolean columns, got {dtype}.")
+
+
+def _numeric_field(values):
+    """
+    Encodes uint64 values as fixed-width binary NUMERIC fields matching NUMERIC(20).
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    fields = np.empty(len(values), dtype=NUMERIC_FIELD)
+    fields["header"] = (NUMERIC_DIGITS, NUMERIC_DIGITS - 1, 0, 0)
+    for position in range(NUMERIC_DIGITS - 1, -1, -1):
+        values, fields["digits"][:, position] = np.divmod(values, np.uint64(10000))
+    return fields
+
+
+def _csv_copy_buffer(df):
+    """
+    Writes a DataFrame into an in-memory CSV buffer readable by COPY ... (FORMAT csv).
+    Missing values are written as empty fields, which COPY loads as NULL.
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep="")
+    buffer.seek(0)
+    return buffer
+
+
+def _binary_copy_buffer(df):
+    """
+    Encodes a numeric / boolean DataFrame into an in-memory PostgreSQL binary COPY buffer.
+
+    Every tuple is first packed with one NumPy structured array (field count, then
+    length + value per column). Missing values (NaN, pd.NA) become NULL fields: their
+    length is set to -1 and their value bytes are dropped from the stream.
+    """
+    fields = [("field_count", ">i2")]
+    for i, column in enumerate(df.columns):
+        value_dtype = _binary_field_dtype(df[column].dtype)
+        fields.append((f"length_{i}", ">i4"))
+        fields.append((f"value_{i}", value_dtype))
+
+    records = np.empty(len(df), dtype=fields)
+    records["field_count"] = len(df.columns)
+    missing_fields = []
+    for i, column in enumerate(df.columns):
+        value_dtype = records.dtype[f"value_{i}"]
+        missing = df[column].isna().to_numpy()
+        records[f"length_{i}"] = np.where(missing, -1, value_dtype.itemsize)
+        if value_dtype == NUMERIC_FIELD:
+            records[f"value_{i}"] = _numeric_field(df[column].to_numpy(dtype=np.uint64, na_value=0))
+        else:
+            records[f"value_{i}"] = df[column].to_numpy(dtype=value_dtype.newbyteorder("="), na_value=0)
+        if missing.any():
+            missing_fields.append((missing, records.dtype.fields[f"value_{i}"][1], value_dtype.itemsize))
+
+    data = records.view(np.uint8).reshape(len(df), records.dtype.itemsize)
+    if missing_fields:
+        keep = np.ones(data.shape, dtype=bool)
+        for missing, offset, size in missing_fields:
+            keep[missing, offset:offset + size] = False
+        # Row-major boolean indexing keeps the tuples in order
+        data = data[keep]
+
+    buffer = io.BytesIO()
+    buffer.write(PGCOPY_HEADER)
+    buffer.write(data.tobytes())
+    buffer.write(PGCOPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_into(cursor, table, df, copy_format, chunk_size):
+    """
+    Streams a DataFrame into an existing table with COPY FROM STDIN, chunk_size rows per buffer.
+    """
+    columns = ", ".join(_quote_identifier(column) for column in df.columns)
+    copy_sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT {copy_format})"
+
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        if copy_format == "binary":
+            buffer = _binary_copy_buffer(chunk)
+        else:
+            buffer = _csv_copy_buffer(chunk)
+        cursor.copy_expert(copy_sql, buffer)
+
+
+def export_dataframe_copy(df, table_name, mode="replace", key="Bearer Id",
+                          copy_format="csv", chunk_size=1000000, connection=None):
+    """
+    Bulk-exports a DataFrame into PostgreSQL using COPY FROM STDIN.
+
+    Modes:
+    - 'replace': load into a staging table, then drop the old table and rename the
+      staging table in the same transaction, so readers never see a partial table.
+    - 'append': COPY straight into the table, creating it if needed.
+    - 'upsert': COPY into a temporary table, then INSERT ... ON CONFLICT (key) DO UPDATE.
+      Duplicate keys in df are resolved in favour of the last occurrence, and rows with
+      a missing key are skipped (NULL never conflicts, so they would pile up on every
+      upsert). The first upsert into an existing table adds a unique index on key, and
+      fails with ValueError if the table already holds duplicate keys (e.g. after an
+      'append').
+
+    :param df: DataFrame to export.
+    :param table_name: Target table, optionally schema-qualified (e.g. 'public.satisfaction_analysis').
+    :param mode: 'replace', 'append' or 'upsert'.
+    :param key: Column used as the conflict key in 'upsert' mode.
+    :param copy_format: 'csv' or 'binary' (binary requires numeric or boolean columns).
+    :param chunk_size: Maximum number of rows held in one in-memory COPY buffer.
+    :param connection: Optional open psycopg2 connection; defaults to one from the shared pool.
+    :return: Dictionary with the number of rows, elapsed seconds and rows per second.
+    """
+    if mode not in ("replace", "append", "upsert"):
+        raise ValueError("mode must be 'replace', 'append' or 'upsert'.")
+    if copy_format not in ("csv", "binary"):
+        raise ValueError("copy_format must be 'csv' or 'binary'.")
+    if mode == "upsert":
+        if key not in df.columns:
+            raise KeyError(f"Upsert key '{key}' is not a column of the DataFrame.")
+        missing_keys = df[key].isna()
+        if missing_keys.any():
+            print(f"Skipping {int(missing_keys.sum())} rows without a '{key}' in upsert mode.")
+            df = df[~missing_keys]
+        df = df.drop_duplicates(subset=key, keep="last")
+
+    schema, _, name = table_name.rpartition(".")
+    target = _quote_table(table_name)
+    column_definitions = ", ".join(
+        f"{_quote_identifier(column)} {_sql_type(dtype)}" for column, dtype in df.dtypes.items()
+    )
+
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_raw_connection()
+
+    start_time = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+
+        if mode == "replace":
+            staging_name = f"{name}__staging"
+            staging = _quote_table(f"{schema}.{staging_name}" if schema else staging_name)
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            cursor.execute(f"CREATE TABLE {staging} ({column_definitions})")
+            _copy_into(cursor, staging, df, copy_format, chunk_size)
+            cursor.execute(f"DROP TABLE IF EXISTS {target}")
+            cursor.execute(f"ALTER TABLE {staging} RENAME TO {_quote_identifier(name)}")
+
+        elif mode == "append":
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {target} ({column_definitions})")
+            _copy_into(cursor, target, df, copy_format, chunk_size)
+
+        else:
+            key_column = _quote_identifier(key)
+            index_name = f"{name}__{key}__key"
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {target} ({column_definitions})")
+            cursor.execute("SELECT to_regclass(%s)", (_quote_table(f"{schema}.{index_name}" if schema else index_name),))
+            if cursor.fetchone()[0] is None:
+                # A table filled in 'replace' / 'append' mode may hold the same key several times
+                cursor.execute(
+                    f"SELECT {key_column} FROM {target} WHERE {key_column} IS NOT NULL "
+                    f"GROUP BY {key_column} HAVING COUNT(*) > 1 LIMIT 5"
+                )
+                duplicates = [row[0] for row in cursor.fetchall()]
+                if duplicates:
+                    raise ValueError(
+                        f"Cannot upsert into '{table_name}': it already has duplicate '{key}' values "
+                        f"(e.g. {duplicates}). Deduplicate it or export with mode='replace' first."
+                    )
+                cursor.execute(f"CREATE UNIQUE INDEX {_quote_identifier(index_name)} ON {target} ({key_column})")
+            staging = _quote_identifier(f"{name}__upsert")
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} ({column_definitions}) ON COMMIT DROP")
+            _copy_into(cursor, staging, df, copy_format, chunk_size)
+
+            columns = ", ".join(_quote_identifier(column) for column in df.columns)
+            updates = ", ".join(
+                f"{_quote_identifier(column)} = EXCLUDED.{_quote_identifier(column)}"
+                for column in df.columns if column != key
+            )
+            conflict_action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            cursor.execute(
+                f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({key_column}) {conflict_action}"
+            )
+
+        connection.commit()
+        cursor.close()
+
+    except Exception:
+        connection.rollback()
+        raise
+
+    finally:
+        if owns_connection:
+            connection.close()
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_sec = len(df) / elapsed if elapsed > 0 else float("inf")
+    print(f"Exported {len(df)} rows to '{table_name}' in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec).")
+
+    return {"rows": len(df), "seconds": elapsed, "rows_per_sec": rows_per_sec}
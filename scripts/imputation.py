@@ -0,0 +1,198 @@
+# scripts/imputation.py
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from data_clearing import apply_fill_values, mode_of_counts
+from sketches import FrequentItems
+from summary_stats import QuantileDigest
+from xdr_schema import ID_COLUMNS
+
+# Fit once over a stream, save, then fill chunk by chunk in later jobs:
+#
+#   imputer = ChunkedImputer(numeric_strategy="median").fit(lambda: stream_data_from_postgres(query))
+#   imputer.save("models/imputer.json")
+#   ...
+#   imputer = ChunkedImputer.load("models/imputer.json")
+#   for chunk in imputer.transform_in_chunks(stream_data_from_postgres(new_rows_query)):
+#       ...
+
+
+def _to_json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ChunkedImputer:
+    """
+    Missing-value imputer fitted chunk by chunk.
+
+    Numeric columns are filled with their mean (exact, from running sums) or median
+    (exact when fitted on an in-memory DataFrame; over a stream of chunks approximate,
+    from a QuantileDigest, and exact while a column has at most 10k values).
+    Categorical columns are filled with their mode (from a FrequentItems heavy-hitter
+    summary; exact while a column has at most `capacity` distinct values) or with a
+    constant. Identifier columns are never filled.
+    """
+
+    def __init__(self, numeric_strategy="mean", categorical_strategy="most_frequent",
+                 fill_value="missing", capacity=10000, exclude=ID_COLUMNS):
+        """
+        :param numeric_strategy: 'mean', 'median', or None to leave numeric columns alone.
+        :param categorical_strategy: 'most_frequent', 'constant', or None to leave them alone.
+        :param fill_value: Value used by the 'constant' categorical strategy.
+        :param capacity: Counters kept per categorical column for the mode.
+        :param exclude: Columns never filled (identifiers by default).
+        """
+        if numeric_strategy not in ("mean", "median", None):
+            raise ValueError("numeric_strategy must be 'mean', 'median' or None.")
+        if categorical_strategy not in ("most_frequent", "constant", None):
+            raise ValueError("categorical_strategy must be 'most_frequent', 'constant' or None.")
+        self.numeric_strategy = numeric_strategy
+        self.categorical_strategy = categorical_strategy
+        self.fill_value = fill_value
+        self.capacity = capacity
+        self.exclude = list(exclude)
+        self._statistics = None
+        self._state = None
+
+    @property
+    def statistics_(self):
+        """
+        Fill value per column, computed from the accumulated state on first use after
+        fitting (not after every chunk); None while the imputer is not fitted.
+        """
+        if self._statistics is None and self._state is not None:
+            self._statistics = self._compute_statistics()
+        return self._statistics
+
+    @statistics_.setter
+    def statistics_(self, statistics):
+        self._statistics = statistics
+
+    def _init_state(self, chunk, streamed=True):
+        numeric_cols = [] if self.numeric_strategy is None else list(
+            chunk.select_dtypes(include=["number"]).columns.difference(self.exclude, sort=False)
+        )
+        categorical_cols = [] if self.categorical_strategy is None else list(
+            chunk.select_dtypes(include=["object", "category"]).columns.difference(self.exclude, sort=False)
+        )
+        self._state = {
+            "numeric": numeric_cols,
+            "categorical": categorical_cols,
+            "sums": np.zeros(len(numeric_cols)),
+            "counts": np.zeros(len(numeric_cols), dtype="int64"),
+            "digests": [QuantileDigest() for _ in numeric_cols] if self.numeric_strategy == "median" and streamed else [],
+            # Exact medians of an in-memory DataFrame, which need no digest
+            "medians": {},
+            "frequent": {
+                col: FrequentItems(self.capacity) for col in categorical_cols
+            } if self.categorical_strategy == "most_frequent" else {},
+        }
+
+    def partial_fit(self, chunk):
+        """
+        Updates the statistics with one chunk.
+        """
+        if self._state is None:
+            self._init_state(chunk)
+        state = self._state
+
+        values = chunk[state["numeric"]].to_numpy(dtype="float64", na_value=np.nan)
+        present = ~np.isnan(values)
+        state["sums"] += np.where(present, values, 0).sum(axis=0)
+        state["counts"] += present.sum(axis=0)
+        for j, digest in enumerate(state["digests"]):
+            digest.update(values[present[:, j], j])
+        for col, sketch in state["frequent"].items():
+            sketch.update(chunk[col])
+
+        self._statistics = None
+        return self
+
+    def fit(self, data, chunk_size=100000):
+        """
+        Fits the imputer over a DataFrame (processed chunk_size rows at a time), a
+        callable returning a chunk iterator, or an iterator of chunks.
+        """
+        self._state = None
+        self._statistics = None
+        if isinstance(data, pd.DataFrame):
+            self._init_state(data, streamed=False)
+            if self.numeric_strategy == "median":
+                self._state["medians"] = data[self._state["numeric"]].median().to_dict()
+            chunks = (data.iloc[start:start + chunk_size] for start in range(0, max(len(data), 1), chunk_size))
+        else:
+            chunks = data() if callable(data) else data
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def _compute_statistics(self):
+        state = self._state
+        statistics = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = state["sums"] / state["counts"]
+        for j, col in enumerate(state["numeric"]):
+            if state["counts"][j] == 0:
+                continue
+            if self.numeric_strategy == "mean":
+                statistics[col] = float(means[j])
+            elif col in state["medians"]:
+                statistics[col] = float(state["medians"][col])
+            else:
+                statistics[col] = float(state["digests"][j].quantile(0.5))
+        for col in state["categorical"]:
+            if self.categorical_strategy == "constant":
+                statistics[col] = self.fill_value
+            else:
+                statistics[col] = _to_json_value(mode_of_counts(state["frequent"][col].counts))
+        return statistics
+
+    def transform(self, chunk):
+        """
+        Returns the chunk with missing values filled (the input is not modified).
+        """
+        if self.statistics_ is None:
+            raise ValueError("The imputer is not fitted yet.")
+        return apply_fill_values(chunk, self.statistics_)
+
+    def transform_in_chunks(self, chunks):
+        """
+        Fills missing values chunk by chunk.
+        """
+        for chunk in chunks:
+            yield self.transform(chunk)
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def save(self, path):
+        """
+        Saves the fitted statistics as JSON.
+        """
+        if self.statistics_ is None:
+            raise ValueError("The imputer is not fitted yet.")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "numeric_strategy": self.numeric_strategy,
+                "categorical_strategy": self.categorical_strategy,
+                "fill_value": self.fill_value,
+                "statistics": self.statistics_,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an imputer saved with save(), ready to transform.
+        """
+        with open(path) as f:
+            saved = json.load(f)
+        imputer = cls(saved["numeric_strategy"], saved["categorical_strategy"], saved["fill_value"])
+        imputer.statistics_ = saved["statistics"]
+        return imputer
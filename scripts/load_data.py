@@ -1,44 +1,27 @@
 # scripts/load_data.py
 
-import os
-import psycopg2
+import uuid
 import pandas as pd
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from database import get_engine, get_raw_connection
+from xdr_schema import apply_xdr_schema
 
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Fetch database connection parameters from environment variables
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-def load_data_from_postgres(query):
+def load_data_from_postgres(query, apply_schema=True):
     """
     Connects to the PostgreSQL database and loads data based on the provided SQL query.
 
     :param query: SQL query to execute.
+    :param apply_schema: Cast xDR columns to the compact dtypes declared in xdr_schema.py.
     :return: DataFrame containing the results of the query.
     """
     try:
-        # Establish a connection to the database
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
+        # Borrow a connection from the shared pool; it is returned when the block exits
+        with get_engine().connect() as connection:
+            # Load data using pandas
+            df = pd.read_sql_query(query, connection)
 
-        # Load data using pandas
-        df = pd.read_sql_query(query, connection)
-
-        # Close the database connection
-        connection.close()
+        if apply_schema:
+            df = apply_xdr_schema(df)
 
         return df
 
@@ -48,25 +31,82 @@ def load_data_from_postgres(query):
 
 
 
-def load_data_using_sqlalchemy(query):
+def load_data_using_sqlalchemy(query, apply_schema=True):
     """
     Connects to the PostgreSQL database and loads data based on the provided SQL query using SQLAlchemy.
 
     :param query: SQL query to execute.
+    :param apply_schema: Cast xDR columns to the compact dtypes declared in xdr_schema.py.
     :return: DataFrame containing the results of the query.
     """
     try:
-        # Create a connection string
-        connection_string = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-        # Create an SQLAlchemy engine
-        engine = create_engine(connection_string)
+        # Reuse the shared, pooled SQLAlchemy engine
+        engine = get_engine()
 
         # Load data into a pandas DataFrame
         df = pd.read_sql_query(query, engine)
 
+        if apply_schema:
+            df = apply_xdr_schema(df)
+
         return df
 
     except Exception as e:
         print(f"An error occurred: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def stream_data_from_postgres(query, chunk_size=100000, connection=None, params=None,
+                              apply_schema=True):
+    """
+    Streams the results of the provided SQL query as fixed-size DataFrame chunks.
+
+    A named (server-side) psycopg2 cursor is used so that rows stay on the server until
+    they are fetched, which keeps peak memory proportional to chunk_size rather than to
+    the size of the table. Any DB-API connection that does not support named cursors
+    (e.g. sqlite3, handy as a local stand-in) falls back to a regular cursor with fetchmany.
+
+    :param query: SQL query to execute.
+    :param chunk_size: Number of rows per DataFrame chunk.
+    :param connection: Optional open DB-API connection. If omitted, a connection is
+                       borrowed from the shared pool and returned once the stream is exhausted.
+    :param params: Optional query parameters passed to cursor.execute.
+    :param apply_schema: Cast xDR columns of each chunk to the dtypes declared in xdr_schema.py.
+    :return: Iterator of DataFrames with at most chunk_size rows each.
+    """
+    owns_connection = connection is None
+    cursor = None
+    try:
+        if owns_connection:
+            connection = get_raw_connection()
+
+        try:
+            # Named cursors are server-side in psycopg2
+            cursor = connection.cursor(name=f"xdr_stream_{uuid.uuid4().hex}")
+            cursor.itersize = chunk_size
+        except TypeError:
+            cursor = connection.cursor()
+
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            # The description of a named cursor is only populated after the first fetch
+            columns = [column[0] for column in cursor.description]
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            yield apply_xdr_schema(chunk) if apply_schema else chunk
+
+    except Exception as e:
+        print(f"An error occurred while streaming data: {e}")
+        raise
+
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if owns_connection and connection is not None:
+            connection.close()
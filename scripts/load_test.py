@@ -0,0 +1,108 @@
+# scripts/load_test.py
+
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from scoring_service import FEATURE_TABLE_DIR, FeatureTable
+
+# Load test of scoring_service.py, standard library only:
+#
+#   python scoring_service.py --port 8080 &
+#   python load_test.py --port 8080 --connections 32 --requests 20000
+#   python load_test.py --port 8080 --batch-size 100         # POST /score batches
+
+
+async def _request(reader, writer, method, target, body=b""):
+    """
+    Sends one keep-alive request and returns (status, payload).
+    """
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in header_lines:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    payload = json.loads(await reader.readexactly(length))
+    return int(status_line.split(" ")[1]), payload
+
+
+async def _client(host, port, keys, batch_size, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for start in range(0, len(keys), max(batch_size, 1)):
+            if batch_size:
+                body = json.dumps({"msisdn": keys[start:start + batch_size].tolist()}).encode("utf-8")
+                request = ("POST", "/score", body)
+            else:
+                request = ("GET", f"/score/{keys[start]}", b"")
+            begin = time.perf_counter()
+            status, _ = await _request(reader, writer, *request)
+            latencies.append(time.perf_counter() - begin)
+            if status not in (200, 404):
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host="127.0.0.1", port=8080, connections=32, requests=20000, batch_size=0,
+                        feature_dir=FEATURE_TABLE_DIR, unknown_fraction=0.0, seed=42):
+    """
+    Sends `requests` lookups over `connections` concurrent keep-alive connections and
+    reports latency percentiles and throughput.
+
+    :param batch_size: 0 sends single GET lookups; otherwise POST batches of batch_size keys.
+    :param feature_dir: Feature table the keys are sampled from.
+    :param unknown_fraction: Share of keys that are not in the table (404 path).
+    :return: Dictionary with requests, seconds, requests_per_sec and p50 / p90 / p99 / max latency in ms.
+    """
+    rng = np.random.default_rng(seed)
+    table = FeatureTable(feature_dir)
+    n_keys = requests * max(batch_size, 1)
+    keys = np.asarray(table.keys)[rng.integers(0, len(table), n_keys)]
+    unknown = rng.random(n_keys) < unknown_fraction
+    keys[unknown] = -keys[unknown] - 1
+
+    latencies, errors = [], []
+    per_client = np.array_split(keys, connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, part, batch_size, latencies, errors)
+                           for part in per_client if len(part)))
+    seconds = time.perf_counter() - start
+
+    ms = np.asarray(latencies) * 1000
+    report = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": seconds,
+        "requests_per_sec": len(latencies) / seconds,
+        **{f"p{q}_ms": float(np.percentile(ms, q)) for q in (50, 90, 99)},
+        "max_ms": float(ms.max()),
+    }
+    kind = f"batches of {batch_size}" if batch_size else "single lookups"
+    print(f"{report['requests']:,} requests ({kind}) over {connections} connections in {seconds:.2f}s: "
+          f"{report['requests_per_sec']:,.0f} req/s, p50 {report['p50_ms']:.2f} ms, "
+          f"p90 {report['p90_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, max {report['max_ms']:.2f} ms, "
+          f"{report['errors']} errors")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the local scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=0, help="0 for single lookups.")
+    parser.add_argument("--features", default=FEATURE_TABLE_DIR, help="Feature table directory.")
+    parser.add_argument("--unknown-fraction", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.host, args.port, args.connections, args.requests, args.batch_size,
+                              args.features, args.unknown_fraction))
@@ -0,0 +1,262 @@
+# scripts/model_registry.py
+
+import os
+import re
+import json
+import shutil
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from scoring_features import ENGAGEMENT_FEATURES, EXPERIENCE_FEATURES, SUBSCRIBER_KEYS
+from distance_kernel import distance_to_point
+
+# Fitted models kept as plain arrays, so new rows are scored with NumPy only:
+#
+#   registry = ModelRegistry()
+#   version = save_satisfaction_model(registry, satisfaction_analysis(df, compute_only=True))
+#   scorer = load_scorer(registry)                  # latest version, arrays memory-mapped
+#   scores = scorer.score_batch(new_rows)           # dict of NumPy arrays
+#
+# Every version is a directory holding one .npy file per array and a JSON manifest:
+#
+#   models/satisfaction/v0003/manifest.json
+#   models/satisfaction/v0003/engagement_centroids.npy
+#   ...
+
+# Where versions are stored (one sub-directory per model name)
+REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+)
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+SCORING_FEATURES = ENGAGEMENT_FEATURES + EXPERIENCE_FEATURES
+
+
+def estimator_arrays(estimator, prefix, columns=None):
+    """
+    Extracts the fitted parameters of an estimator as named arrays.
+
+    Supported: StandardScaler (mean, scale), KMeans / MiniBatchKMeans (centroids),
+    LinearRegression (coef, intercept) and ChunkedImputer (fill values of `columns`,
+    NaN where a column has none).
+
+    :param estimator: Fitted estimator.
+    :param prefix: Prefix of the array names, e.g. 'engagement'.
+    :param columns: Column order of the imputer fill values.
+    :return: Dictionary name -> array.
+    """
+    if hasattr(estimator, "cluster_centers_"):
+        return {f"{prefix}_centroids": estimator.cluster_centers_}
+    if hasattr(estimator, "coef_"):
+        return {f"{prefix}_coef": np.atleast_1d(estimator.coef_),
+                f"{prefix}_intercept": np.atleast_1d(estimator.intercept_)}
+    if hasattr(estimator, "scale_"):
+        return {f"{prefix}_mean": estimator.mean_, f"{prefix}_scale": estimator.scale_}
+    if hasattr(estimator, "statistics_"):
+        if columns is None:
+            raise ValueError("columns is needed to store imputer fill values.")
+        fill_values = [estimator.statistics_.get(column, np.nan) for column in columns]
+        return {f"{prefix}_fill_values": np.asarray(fill_values, dtype="float64")}
+    raise TypeError(f"Unsupported estimator: {type(estimator).__name__}.")
+
+
+class ModelRegistry:
+    """
+    Versioned store of fitted models as memory-mappable .npy arrays plus a JSON manifest.
+
+    Versions are numbered v0001, v0002, ... per model name and never overwritten; a
+    version is written to a temporary directory and renamed into place, so readers
+    never see a partial version.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def versions(self, name):
+        """
+        Saved versions of a model, oldest first.
+        """
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(entry for entry in os.listdir(directory) if re.fullmatch(r"v\d{4,}", entry))
+
+    def latest(self, name):
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f"No saved versions of model '{name}' in {self.root}.")
+        return versions[-1]
+
+    def save(self, name, arrays, metadata=None):
+        """
+        Saves a new version of a model.
+
+        :param name: Model name, e.g. 'satisfaction'.
+        :param arrays: Dictionary name -> array.
+        :param metadata: JSON-serialisable details (feature names, parameters, ...).
+        :return: The new version, e.g. 'v0003'.
+        """
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        versions = self.versions(name)
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+
+        staging = tempfile.mkdtemp(prefix=f".{version}-", dir=directory)
+        try:
+            for array_name, values in arrays.items():
+                np.save(os.path.join(staging, f"{array_name}.npy"), np.ascontiguousarray(values))
+            manifest = {
+                "name": name,
+                "version": version,
+                "format_version": FORMAT_VERSION,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "arrays": {
+                    array_name: {"dtype": str(np.asarray(values).dtype), "shape": list(np.shape(values))}
+                    for array_name, values in arrays.items()
+                },
+                "metadata": metadata or {},
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, os.path.join(directory, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return version
+
+    def load(self, name, version=None, mmap=True):
+        """
+        Loads a version of a model (the latest by default).
+
+        :param mmap: Memory-map the arrays read-only instead of reading them into memory.
+        :return: Tuple (dictionary name -> array, manifest).
+        """
+        version = version or self.latest(name)
+        directory = os.path.join(self.root, name, version)
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Model '{name}' {version} was saved in a newer format ({manifest['format_version']}).")
+        arrays = {
+            array_name: np.load(os.path.join(directory, f"{array_name}.npy"), mmap_mode="r" if mmap else None)
+            for array_name in manifest["arrays"]
+        }
+        return arrays, manifest
+
+
+def save_satisfaction_model(registry, results, name="satisfaction"):
+    """
+    Saves the fitted parts of a satisfaction_analysis run: the imputer fill values of the
+    scoring features, the engagement / experience / satisfaction centroids (and which
+    engagement / experience cluster the scores are measured from) and the regression.
+    The manifest records the level of the run and, per subscriber, its subscriber key.
+
+    :param registry: ModelRegistry.
+    :param results: Return value of satisfaction_analysis.
+    :param name: Model name in the registry.
+    :return: The new version.
+    """
+    stages = results["stages"]
+    # The reduced frame of a subscriber-level run holds exactly one of the subscriber keys
+    subscribers = stages.get("reduce")
+    subscriber_key = None if subscribers is None else next(key for key in SUBSCRIBER_KEYS if key in subscribers.columns)
+    engagement, experience = stages["engagement_score"], stages["experience_score"]
+    arrays = {
+        **estimator_arrays(stages["impute"], "imputer", SCORING_FEATURES),
+        "engagement_centroids": engagement["centroids"],
+        "experience_centroids": experience["centroids"],
+        "satisfaction_centroids": stages["clustering"]["centroids"],
+        **estimator_arrays(results["regression_model"], "regression"),
+    }
+    metadata = {
+        "engagement_features": ENGAGEMENT_FEATURES,
+        "experience_features": EXPERIENCE_FEATURES,
+        "engagement_reference": engagement["reference"],
+        "experience_reference": experience["reference"],
+        "level": "session" if subscribers is None else "subscriber",
+        "subscriber_key": subscriber_key,
+    }
+    return registry.save(name, arrays, metadata)
+
+
+def _squared_distance(X, point):
+    diff = X - point
+    return np.einsum("ij,ij->i", diff, diff)
+
+
+def _nearest(X, centroids):
+    """
+    Index of the nearest centroid of every row (as KMeans.predict).
+    """
+    return np.stack([_squared_distance(X, centroid) for centroid in centroids], axis=1).argmin(axis=1).astype("int32")
+
+
+class SatisfactionScorer:
+    """
+    Scores new rows with a saved satisfaction model, in vectorized NumPy only.
+    """
+
+    def __init__(self, arrays, manifest):
+        metadata = manifest["metadata"]
+        self.version = manifest["version"]
+        self.level = metadata["level"]
+        self.subscriber_key = metadata.get("subscriber_key")
+        self.features = metadata["engagement_features"] + metadata["experience_features"]
+        self.n_engagement = len(metadata["engagement_features"])
+        self.fill_values = np.asarray(arrays["imputer_fill_values"], dtype="float64")
+        self.engagement_centroids = np.asarray(arrays["engagement_centroids"], dtype="float64")
+        self.experience_centroids = np.asarray(arrays["experience_centroids"], dtype="float64")
+        self.satisfaction_centroids = np.asarray(arrays["satisfaction_centroids"], dtype="float64")
+        self.engagement_reference = self.engagement_centroids[metadata["engagement_reference"]]
+        self.experience_reference = self.experience_centroids[metadata["experience_reference"]]
+        self.coef = np.asarray(arrays["regression_coef"], dtype="float64")
+        self.intercept = float(arrays["regression_intercept"][0])
+
+    def features_of(self, data):
+        """
+        Feature matrix of a DataFrame (scoring feature columns) or an (n, 6) array.
+        """
+        if isinstance(data, pd.DataFrame):
+            return data[self.features].to_numpy(dtype="float64", na_value=np.nan)
+        return np.asarray(data, dtype="float64").reshape(-1, len(self.features))
+
+    def score_batch(self, data):
+        """
+        Scores a batch of rows (raw feature values; missing values are filled like the imputer).
+
+        :param data: DataFrame with the scoring feature columns, or an (n, 6) array in
+                     ENGAGEMENT_FEATURES + EXPERIENCE_FEATURES order.
+        :return: Dictionary of arrays: engagement_cluster / score, experience_cluster / score,
+                 satisfaction_score, satisfaction_cluster and predicted_satisfaction (regression).
+        """
+        X = self.features_of(data)
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+        engagement, experience = X[:, :self.n_engagement], X[:, self.n_engagement:]
+
+        engagement_score = distance_to_point(engagement, self.engagement_reference, dtype="float64")
+        experience_score = distance_to_point(experience, self.experience_reference, dtype="float64")
+        satisfaction_score = (engagement_score + experience_score) / 2
+        return {
+            "engagement_cluster": _nearest(engagement, self.engagement_centroids),
+            "engagement_score": engagement_score,
+            "experience_cluster": _nearest(experience, self.experience_centroids),
+            "experience_score": experience_score,
+            "satisfaction_score": satisfaction_score,
+            "satisfaction_cluster": _nearest(np.column_stack([engagement_score, experience_score]),
+                                             self.satisfaction_centroids),
+            "predicted_satisfaction": X @ self.coef + self.intercept,
+        }
+
+
+def load_scorer(registry=None, name="satisfaction", version=None):
+    """
+    Loads a saved satisfaction model (the latest version by default) as a SatisfactionScorer.
+    """
+    registry = registry or ModelRegistry()
+    return SatisfactionScorer(*registry.load(name, version))
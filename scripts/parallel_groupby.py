@@ -0,0 +1,96 @@
+# scripts/parallel_groupby.py
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-subscriber aggregations spread over a process pool:
+#
+#   metrics = parallel_groupby(df, 'IMSI', _engagement_by_imsi, max_workers=8)
+#
+# Rows are hash-partitioned by the key, so every subscriber lands in exactly one partition
+# and the per-partition results only need to be concatenated. Partitions are handed to the
+# workers as Arrow IPC files in shared memory (/dev/shm), which the workers memory-map
+# instead of receiving a pickled copy of their rows.
+#
+# The pool is opt-in: without max_workers the aggregation runs inline. Writing the
+# partitions is a serial pass in the parent (about the cost of one groupby), so the pool
+# only pays off when func is much heavier than a hash partition, on large frames.
+
+# RAM-backed directory for the partition files, when the platform has one
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Below this many rows the process pool costs more than it saves
+PARALLEL_MIN_ROWS = 1000000
+
+
+def partition_ids(keys, n_partitions):
+    """
+    Assigns every row to one of n_partitions partitions by a 64-bit hash of its key.
+    """
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return (hashes % np.uint64(n_partitions)).astype("int64")
+
+
+def _write_partitions(df, key, n_partitions, directory):
+    """
+    Writes the rows of each non-empty partition to its own Arrow IPC file; returns the paths.
+    """
+    ids = partition_ids(df[key], n_partitions)
+    order = np.argsort(ids, kind="stable")
+    bounds = np.searchsorted(ids[order], np.arange(n_partitions + 1))
+
+    paths = []
+    for p in range(n_partitions):
+        start, end = bounds[p], bounds[p + 1]
+        if start == end:
+            continue
+        table = pa.Table.from_pandas(df.take(order[start:end]), preserve_index=False)
+        path = os.path.join(directory, f"part-{p:05d}.arrow")
+        with ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+        paths.append(path)
+    return paths
+
+
+def _aggregate_partition(task):
+    """
+    Memory-maps one partition file and runs the aggregation on it.
+    """
+    path, func = task
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    return func(table.to_pandas())
+
+
+def parallel_groupby(df, key, func, max_workers=None, partitions_per_worker=4, shared_dir=SHARED_DIR):
+    """
+    Runs a per-key aggregation over hash partitions of df in parallel.
+
+    func receives a DataFrame holding every row of some of the keys and must return
+    one result per key, indexed by key (e.g. lambda part: part.groupby(key).sum(), but
+    defined at module level so the workers can import it). The results of all partitions
+    are concatenated and sorted by key, as a single groupby would return them.
+
+    :param df: DataFrame to aggregate.
+    :param key: Grouping column (e.g. 'IMSI' or 'MSISDN/Number').
+    :param func: Module-level function DataFrame -> DataFrame/Series indexed by key.
+    :param max_workers: Worker processes; None or 1 runs func inline (default).
+    :param partitions_per_worker: Partitions per worker, so uneven partitions still balance out.
+    :param shared_dir: Directory for the partition files (RAM-backed by default).
+    :return: Concatenated result of func, sorted by key.
+    """
+    if not max_workers or max_workers == 1 or len(df) < PARALLEL_MIN_ROWS:
+        return func(df)
+
+    with tempfile.TemporaryDirectory(prefix="groupby-", dir=shared_dir) as directory:
+        paths = _write_partitions(df, key, max_workers * partitions_per_worker, directory)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_aggregate_partition, [(path, func) for path in paths]))
+
+    if not results:
+        return func(df)
+    return pd.concat(results).sort_index(kind="stable")
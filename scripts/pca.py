@@ -0,0 +1,184 @@
+# scripts/pca.py
+
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler, FunctionTransformer
+from clustering import as_array
+
+# Fitted models already loaded in this process: model_path -> (fit parameters, model)
+_MODEL_CACHE = {}
+
+
+def _columns_of(data):
+    """
+    Column names of a DataFrame, the column count of an array, or None for chunk streams.
+    """
+    if isinstance(data, pd.DataFrame):
+        return [str(column) for column in data.columns]
+    if isinstance(data, np.ndarray):
+        return data.shape[1] if data.ndim == 2 else 1
+    return None
+
+
+def _same_fit(saved, params):
+    # Streamed data has no known columns before it is read, so its columns are not compared
+    return all(saved.get(name) == value for name, value in params.items()
+               if not (name == "columns" and value is None))
+
+
+def _chunks_of(data, batch_size):
+    """
+    Returns a callable producing a fresh iterator of chunks for in-memory data or a
+    callable, or None for a one-shot iterator.
+    """
+    if isinstance(data, (pd.DataFrame, np.ndarray)):
+        values = as_array(data)
+        return lambda: (values[start:start + batch_size] for start in range(0, len(values), batch_size))
+    if callable(data):
+        return data
+    return None
+
+
+def _recording_columns(source, params):
+    """
+    Wraps a chunk source so the columns of its first chunk are stored in params["columns"].
+    """
+    def chunks():
+        for chunk in source():
+            if params["columns"] is None:
+                params["columns"] = _columns_of(chunk)
+            yield chunk
+    return chunks
+
+
+def _rebatch(chunks, batch_size, min_rows):
+    """
+    Re-cuts a stream of chunks into batches of batch_size rows. The last batch absorbs the
+    remainder, so no batch has fewer than min_rows rows (IncrementalPCA needs at least
+    n_components rows per partial_fit).
+    """
+    pending = np.empty((0, 0))
+    previous = None
+    for chunk in chunks:
+        values = as_array(chunk)
+        pending = values if pending.size == 0 else np.vstack([pending, values])
+        while len(pending) >= batch_size:
+            if previous is not None:
+                yield previous
+            previous, pending = pending[:batch_size], pending[batch_size:]
+    if previous is not None and 0 < len(pending) < min_rows:
+        yield np.vstack([previous, pending])
+        return
+    if previous is not None:
+        yield previous
+    if len(pending):
+        yield pending
+
+
+def fit_pca(data, n_components=None, backend="full", scale=True, batch_size=10000,
+            random_state=42, model_path=None, refit=False):
+    """
+    Fits a (optionally standardised) PCA with one of three backends:
+
+    - 'full': exact PCA on data held in memory;
+    - 'randomized': randomized SVD on data held in memory (needs n_components; much
+      faster when n_components is small compared with the number of columns);
+    - 'incremental': IncrementalPCA fed batch_size rows at a time, so memory stays
+      bounded by the batch size. data can be in memory, or a callable returning a fresh
+      iterator of chunks (e.g. lambda: stream_data_from_postgres(query)); with scale=True
+      the scaler is fitted in a first streaming pass (StandardScaler.partial_fit).
+
+    If model_path is given, a model saved there is reused instead of refitting (unless
+    refit=True), and a newly fitted model is saved to it, so new users can be projected
+    with transform_in_chunks() without fitting again. The model is saved with its
+    n_components, backend, scale and column names, and is only reused when they match
+    this call (the columns of streamed data are those of its first chunk, and are not
+    checked when reusing a model for a stream).
+
+    :param data: Training data (see above).
+    :param n_components: Number of components to keep (None keeps all).
+    :param backend: 'full', 'randomized' or 'incremental'.
+    :param scale: Standardise the features before the PCA.
+    :param batch_size: Rows per partial_fit for the 'incremental' backend.
+    :param random_state: Random seed ('randomized' backend).
+    :param model_path: Optional .joblib file used to cache the fitted model.
+    :param refit: Ignore a cached model.
+    :return: Fitted pipeline (scaler + PCA); its last step exposes explained_variance_ratio_.
+    """
+    if backend not in ("full", "randomized", "incremental"):
+        raise ValueError("backend must be 'full', 'randomized' or 'incremental'.")
+
+    params = {"columns": _columns_of(data), "n_components": n_components, "backend": backend, "scale": scale}
+    if model_path is not None and not refit:
+        if model_path not in _MODEL_CACHE and os.path.exists(model_path):
+            saved = joblib.load(model_path)
+            # Files saved before the parameters were stored hold the bare pipeline
+            if isinstance(saved, dict):
+                _MODEL_CACHE[model_path] = (saved["params"], saved["model"])
+        if model_path in _MODEL_CACHE and _same_fit(_MODEL_CACHE[model_path][0], params):
+            return _MODEL_CACHE[model_path][1]
+
+    scaler = StandardScaler() if scale else FunctionTransformer()
+    in_memory = isinstance(data, (pd.DataFrame, np.ndarray))
+
+    if backend in ("full", "randomized"):
+        if not in_memory:
+            raise ValueError(f"The '{backend}' backend needs the data in memory; use backend='incremental' for chunks.")
+        if backend == "randomized" and n_components is None:
+            raise ValueError("The 'randomized' backend needs n_components.")
+        pca = PCA(n_components=n_components, svd_solver=backend, random_state=random_state)
+        model = make_pipeline(scaler, pca).fit(as_array(data))
+
+    else:
+        source = _chunks_of(data, batch_size)
+        if source is None:
+            if scale:
+                raise ValueError("Scaling needs two passes: pass the data in memory or a callable returning chunks.")
+            source = lambda: data
+        if params["columns"] is None:
+            source = _recording_columns(source, params)
+        if scale:
+            for chunk in source():
+                scaler.partial_fit(as_array(chunk))
+
+        pca = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+        for batch in _rebatch(source(), batch_size, n_components or 1):
+            pca.partial_fit(scaler.transform(batch))
+        model = make_pipeline(scaler, pca)
+
+    if model_path is not None:
+        directory = os.path.dirname(model_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        joblib.dump({"params": params, "model": model}, model_path)
+        _MODEL_CACHE[model_path] = (params, model)
+
+    return model
+
+
+def transform_in_chunks(model, chunks):
+    """
+    Projects data onto the fitted components chunk by chunk.
+
+    :param model: Pipeline returned by fit_pca.
+    :param chunks: Iterable of DataFrame / array chunks.
+    :return: NumPy array with one row of component scores per input row.
+    """
+    scores = [model.transform(as_array(chunk)) for chunk in chunks]
+    n_components = model[-1].n_components_
+    return np.vstack(scores) if scores else np.empty((0, n_components))
+
+
+def explained_variance(model):
+    """
+    Explained variance ratio of every component, and its cumulative sum.
+    """
+    ratio = model[-1].explained_variance_ratio_
+    return pd.DataFrame({
+        "explained_variance_ratio": ratio,
+        "cumulative": np.cumsum(ratio),
+    }, index=[f"PC{i + 1}" for i in range(len(ratio))])
@@ -0,0 +1,278 @@
+# scripts/plot_rendering.py
+
+import os
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Charts are described by plain dictionaries ("chart specs") holding already-aggregated
+# data, so that computing a chart and drawing it are separate steps:
+#
+#   spec = chart("top_10_handsets", "bar", counts, "Top 10 Handsets", "Handset Type", "Count")
+#   show_chart(spec)                    # interactive (notebooks)
+#   save_chart(spec, "reports/")        # headless, Agg canvas, figure freed immediately
+#   render_charts(specs, "reports/")    # many charts in a process pool
+#
+# Specs only contain small aggregates (or bounded samples), so they are cheap to send
+# to worker processes.
+
+
+def chart(name, kind, data, title, xlabel=None, ylabel=None, figsize=(12, 6), **options):
+    """
+    Builds a chart spec.
+
+    :param name: File name stem used when the chart is saved.
+    :param kind: One of the keys of DRAWERS ('bar', 'barh', 'frame_bar', 'hist', ...).
+    :param data: Aggregated data to draw (Series, DataFrame or dict, depending on kind).
+    :param title: Chart title.
+    :param xlabel: X axis label.
+    :param ylabel: Y axis label.
+    :param figsize: Figure size in inches.
+    :param options: Kind-specific options (palette, colormap, rotation, ...).
+    :return: Chart spec dictionary.
+    """
+    return {
+        "name": name, "kind": kind, "data": data, "title": title,
+        "xlabel": xlabel, "ylabel": ylabel, "figsize": figsize, "options": options,
+    }
+
+
+def _gaussian_kde(sample, points, block=16):
+    """
+    Gaussian kernel density estimate of a 1-D sample at the given points, with Scott's
+    bandwidth (as scipy.stats.gaussian_kde). Points are evaluated a block at a time so
+    the (points x sample) distance matrix stays small.
+    """
+    sample = np.asarray(sample, dtype="float64")
+    points = np.asarray(points, dtype="float64")
+    bandwidth = sample.std(ddof=1) * len(sample) ** (-1 / 5)
+    density = np.empty(len(points))
+    for start in range(0, len(points), block):
+        z = (points[start:start + block, None] - sample) / bandwidth
+        density[start:start + block] = np.exp(-0.5 * z ** 2).sum(axis=1)
+    return density / (len(sample) * bandwidth * np.sqrt(2 * np.pi))
+
+
+def histogram_data(values, bins=30, kde=True, kde_sample=50000, random_state=42):
+    """
+    Computes histogram counts (exact) and a KDE curve (from a bounded sample) for a hist chart.
+
+    :param values: Series or array of values; missing values are ignored.
+    :return: Dictionary with bin edges, counts and the KDE curve scaled to counts.
+    """
+    values = pd.Series(values).dropna().to_numpy(dtype="float64")
+    counts, edges = np.histogram(values, bins=bins)
+    result = {"edges": edges, "counts": counts, "kde_x": None, "kde_y": None}
+
+    if kde and len(values) > 1 and np.ptp(values) > 0:
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(values, kde_sample, replace=False) if len(values) > kde_sample else values
+        kde_x = np.linspace(edges[0], edges[-1], 200)
+        # Scale the density to the histogram: density * number of values * bin width
+        result["kde_x"] = kde_x
+        result["kde_y"] = _gaussian_kde(sample, kde_x) * len(values) * (edges[1] - edges[0])
+
+    return result
+
+
+def sample_rows(df, max_rows=100000, random_state=42):
+    """
+    Returns at most max_rows rows of df, for charts (scatter, pair plots) that draw individual points.
+    """
+    if len(df) <= max_rows:
+        return df
+    return df.sample(n=max_rows, random_state=random_state)
+
+
+def _draw_bar(fig, spec):
+    ax = fig.add_subplot()
+    data = spec["data"]
+    sns.barplot(x=data.index.astype(str), y=data.values, palette=spec["options"].get("palette"), ax=ax)
+    return ax
+
+
+def _draw_barh(fig, spec):
+    ax = fig.add_subplot()
+    data = spec["data"]
+    sns.barplot(x=data.values, y=data.index.astype(str), orient="h",
+                palette=spec["options"].get("palette"), ax=ax)
+    return ax
+
+
+def _draw_frame_bar(fig, spec):
+    # DataFrame.plot drawn onto our axes (never opens a second figure)
+    ax = fig.add_subplot()
+    options = spec["options"]
+    spec["data"].plot(
+        kind=options.get("plot_kind", "bar"), stacked=options.get("stacked", False),
+        width=options.get("width", 0.8), colormap=options.get("colormap"), ax=ax
+    )
+    return ax
+
+
+def _draw_hist(fig, spec):
+    ax = fig.add_subplot()
+    data = spec["data"]
+    edges = data["edges"]
+    ax.bar(edges[:-1], data["counts"], width=np.diff(edges), align="edge",
+           color=spec["options"].get("color", "C0"), alpha=0.6, edgecolor="white")
+    if data["kde_x"] is not None:
+        ax.plot(data["kde_x"], data["kde_y"], color=spec["options"].get("color", "C0"))
+    return ax
+
+
+def _draw_scatter(fig, spec):
+    ax = fig.add_subplot()
+    data = spec["data"]
+    options = spec["options"]
+    points = ax.scatter(data["x"], data["y"], c=data.get("c"), cmap=options.get("cmap"))
+    if options.get("colorbar_label"):
+        fig.colorbar(points, ax=ax, label=options["colorbar_label"])
+    return ax
+
+
+def _draw_heatmap(fig, spec):
+    ax = fig.add_subplot()
+    options = spec["options"]
+    sns.heatmap(spec["data"], annot=options.get("annot", False), fmt=options.get("fmt", ".2g"),
+                cmap=options.get("cmap", "coolwarm"), ax=ax)
+    return ax
+
+
+def _draw_pairplot(fig, spec):
+    # Scatter matrix with histograms on the diagonal, drawn onto a single figure
+    data = spec["data"]
+    columns = list(data.columns)
+    axes = np.atleast_2d(fig.subplots(len(columns), len(columns)))
+    for i, y_col in enumerate(columns):
+        for j, x_col in enumerate(columns):
+            ax = axes[i, j]
+            if i == j:
+                ax.hist(data[x_col].dropna(), bins=20)
+            else:
+                ax.scatter(data[x_col], data[y_col], s=4, alpha=0.5)
+            ax.set_xlabel(x_col if i == len(columns) - 1 else "")
+            ax.set_ylabel(y_col if j == 0 else "")
+    return None
+
+
+DRAWERS = {
+    "bar": _draw_bar,
+    "barh": _draw_barh,
+    "frame_bar": _draw_frame_bar,
+    "hist": _draw_hist,
+    "scatter": _draw_scatter,
+    "heatmap": _draw_heatmap,
+    "pairplot": _draw_pairplot,
+}
+
+
+def draw_chart(spec, fig=None):
+    """
+    Draws a chart spec onto a figure.
+
+    Without a figure, a standalone Agg-backed Figure is created. It is not registered
+    with pyplot, so it is released as soon as it goes out of scope.
+
+    :param spec: Chart spec built with chart().
+    :param fig: Optional existing figure (e.g. from plt.figure()).
+    :return: The figure.
+    """
+    if fig is None:
+        fig = Figure(figsize=spec["figsize"])
+        FigureCanvasAgg(fig)
+
+    ax = DRAWERS[spec["kind"]](fig, spec)
+    options = spec["options"]
+    if ax is not None:
+        ax.set_title(spec["title"], fontsize=options.get("title_fontsize"))
+        if spec["xlabel"] is not None:
+            ax.set_xlabel(spec["xlabel"], fontsize=options.get("label_fontsize"))
+        if spec["ylabel"] is not None:
+            ax.set_ylabel(spec["ylabel"], fontsize=options.get("label_fontsize"))
+        if "rotation" in options:
+            for label in ax.get_xticklabels():
+                label.set_rotation(options["rotation"])
+                label.set_horizontalalignment(options.get("ha", "center"))
+    else:
+        fig.suptitle(spec["title"])
+    fig.tight_layout()
+    return fig
+
+
+def show_chart(spec):
+    """
+    Draws a chart spec with pyplot and shows it, then closes the figure.
+    """
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=spec["figsize"])
+    try:
+        draw_chart(spec, fig=fig)
+        plt.show()
+    finally:
+        plt.close(fig)
+
+
+def save_chart(spec, output_dir, fmt="png", dpi=100):
+    """
+    Renders a chart spec to a file on an Agg canvas (no display needed).
+
+    :param spec: Chart spec built with chart().
+    :param output_dir: Directory to write to (created if needed).
+    :param fmt: Image format, e.g. 'png' or 'svg'.
+    :param dpi: Resolution for raster formats.
+    :return: Path of the written file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{spec['name']}.{fmt}")
+    fig = draw_chart(spec)
+    try:
+        fig.savefig(path, format=fmt, dpi=dpi)
+    finally:
+        # Drop all artists now rather than waiting for garbage collection
+        fig.clear()
+    return path
+
+
+def show_or_save(spec, output_dir=None):
+    """
+    Shows a chart interactively, or saves it to output_dir when one is given.
+
+    :return: Path of the written file, or None when the chart was shown.
+    """
+    if output_dir is None:
+        show_chart(spec)
+        return None
+    return save_chart(spec, output_dir)
+
+
+def _save_chart_task(args):
+    spec, output_dir, fmt, dpi = args
+    return save_chart(spec, output_dir, fmt=fmt, dpi=dpi)
+
+
+def render_charts(specs, output_dir, max_workers=None, fmt="png", dpi=100):
+    """
+    Renders many chart specs to files, in parallel across processes.
+
+    Every chart is drawn on its own Agg canvas and freed as soon as it is written,
+    so memory does not grow with the number of charts.
+
+    :param specs: Iterable of chart specs.
+    :param output_dir: Directory to write to.
+    :param max_workers: Worker processes (defaults to the number of CPUs; 1 renders inline).
+    :param fmt: Image format.
+    :param dpi: Resolution for raster formats.
+    :return: List of written file paths, in the order of specs.
+    """
+    tasks = [(spec, output_dir, fmt, dpi) for spec in specs]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        return [_save_chart_task(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_save_chart_task, tasks))
@@ -0,0 +1,65 @@
+# scripts/report.py
+
+import sys
+import time
+from customer_overview import overview_charts
+from Experiance_analysis import distribution_charts, top_bottom_frequent_charts
+from User_Engagement_Analysis import top_engaged_users_chart, most_used_applications_chart
+from plot_rendering import render_charts
+
+
+def report_charts(df, engagement_metrics=None, satisfaction_results=None):
+    """
+    Collects the chart specs of the full report.
+
+    All aggregation happens here, in the calling process; the specs only hold the
+    aggregated results, so rendering them does not need the xDR frame.
+
+    :param df: DataFrame of xDR rows.
+    :param engagement_metrics: Optional output of aggregate_engagement_metrics.
+    :param satisfaction_results: Optional output of satisfaction_analysis (its 'charts').
+    :return: List of chart specs.
+    """
+    specs = list(overview_charts(df))
+    specs.extend(distribution_charts(df)[2])
+    specs.extend(top_bottom_frequent_charts(df, 'Avg Bearer TP DL (kbps)'))
+    specs.append(most_used_applications_chart(df))
+    if engagement_metrics is not None:
+        specs.append(top_engaged_users_chart(engagement_metrics))
+    if satisfaction_results is not None:
+        specs.extend(satisfaction_results.get('charts', []))
+    return specs
+
+
+def build_report(df, output_dir, engagement_metrics=None, satisfaction_results=None,
+                 max_workers=None, fmt="png", dpi=100):
+    """
+    Renders every chart of the report to output_dir in one headless batch run.
+
+    :param df: DataFrame of xDR rows.
+    :param output_dir: Directory the images are written to.
+    :param engagement_metrics: Optional output of aggregate_engagement_metrics.
+    :param satisfaction_results: Optional output of satisfaction_analysis.
+    :param max_workers: Rendering processes (defaults to the number of CPUs).
+    :param fmt: Image format, e.g. 'png' or 'svg'.
+    :param dpi: Resolution for raster formats.
+    :return: List of written file paths.
+    """
+    start = time.perf_counter()
+    specs = report_charts(df, engagement_metrics, satisfaction_results)
+    compute_seconds = time.perf_counter() - start
+
+    paths = render_charts(specs, output_dir, max_workers=max_workers, fmt=fmt, dpi=dpi)
+    render_seconds = time.perf_counter() - start - compute_seconds
+    print(f"Report: {len(paths)} charts written to {output_dir} "
+          f"(compute {compute_seconds:.1f}s, render {render_seconds:.1f}s).")
+    return paths
+
+
+if __name__ == "__main__":
+    # Usage: python report.py <output_dir> [query]
+    from load_data import load_data_from_postgres
+
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else "reports"
+    query = sys.argv[2] if len(sys.argv) > 2 else "SELECT * FROM xdr_data"
+    build_report(load_data_from_postgres(query), output_dir)
@@ -0,0 +1,11 @@
+# scripts/scoring_features.py
+
+# Feature sets of the satisfaction scores, shared by the analysis (Satisfaction_Analysis.py)
+# and the NumPy-only scoring path (model_registry.py, scoring_service.py), which must not
+# import the analysis and its sklearn / matplotlib / database dependencies.
+
+ENGAGEMENT_FEATURES = ['Total UL (Bytes)', 'Total DL (Bytes)', 'Dur. (ms)']
+EXPERIENCE_FEATURES = ['Youtube DL (Bytes)', 'Netflix DL (Bytes)', 'Gaming DL (Bytes)']
+
+# Keys of the per-subscriber level (level='subscriber')
+SUBSCRIBER_KEYS = ['IMSI', 'MSISDN/Number']
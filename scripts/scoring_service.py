@@ -0,0 +1,357 @@
+# scripts/scoring_service.py
+
+import os
+import re
+import json
+import asyncio
+import argparse
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from model_registry import REGISTRY_DIR, SCORING_FEATURES, ModelRegistry, load_scorer
+
+# Local HTTP service answering satisfaction lookups per MSISDN, standard library only:
+#
+#   build_feature_table(df)                         # once per refresh of the xDR extract
+#   python scoring_service.py --port 8080
+#
+#   GET  /score/33601001234                         -> scores of one subscriber
+#   GET  /score?msisdn=33601001234
+#   POST /score  {"msisdn": [33601001234, ...]}     -> scores of many subscribers
+#   GET  /health                                    -> model version and table size
+#
+# Concurrent requests are coalesced by RequestBatcher into one vectorized score_batch call.
+
+# Where the per-subscriber feature table is stored
+FEATURE_TABLE_DIR = os.getenv("FEATURE_TABLE_DIR", os.path.join(REGISTRY_DIR, "features"))
+
+# Range of the int64 keys of the feature table
+KEY_MIN, KEY_MAX = int(np.iinfo("int64").min), int(np.iinfo("int64").max)
+
+# Largest request body read, in bytes; longer requests are answered with 413 and closed
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def build_feature_table(df, directory=FEATURE_TABLE_DIR, key="MSISDN/Number", imputer=None, max_workers=None):
+    """
+    Precomputes the per-subscriber scoring features of an xDR frame and saves them as
+    memory-mappable arrays: keys.npy (sorted int64 subscriber keys) and features.npy
+    (one row of SCORING_FEATURES per key).
+
+    :param df: DataFrame of xDR rows.
+    :param directory: Directory to write the table to.
+    :param key: Subscriber key ('MSISDN/Number' or 'IMSI'), recorded in table.json; it must
+                match the subscriber_key of the served model (see create_service).
+    :param imputer: Fitted imputer applied to the rows first, as satisfaction_analysis does.
+    :param max_workers: Processes for the per-subscriber reduction (None runs inline).
+    :return: Number of subscribers in the table.
+    """
+    # Imported here so the service itself does not load the analysis and its dependencies
+    from Satisfaction_Analysis import subscriber_features
+
+    rows = df if imputer is None else imputer.transform(df)
+    features = subscriber_features(rows, key, max_workers).dropna(subset=[key]).sort_values(key)
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "keys.npy"), features[key].to_numpy(dtype="int64"))
+    np.save(os.path.join(directory, "features.npy"),
+            np.ascontiguousarray(features[SCORING_FEATURES].to_numpy(dtype="float64")))
+    with open(os.path.join(directory, "table.json"), "w") as f:
+        json.dump({"key": key, "features": SCORING_FEATURES, "rows": len(features)}, f, indent=2)
+    return len(features)
+
+
+class FeatureTable:
+    """
+    Per-subscriber features saved by build_feature_table, memory-mapped read-only.
+    """
+
+    def __init__(self, directory=FEATURE_TABLE_DIR):
+        with open(os.path.join(directory, "table.json")) as f:
+            self.info = json.load(f)
+        self.keys = np.load(os.path.join(directory, "keys.npy"), mmap_mode="r")
+        self.features = np.load(os.path.join(directory, "features.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys):
+        """
+        Finds the feature rows of many keys with one binary search.
+
+        :param keys: Array of int64 subscriber keys.
+        :return: Tuple (features of the found keys, boolean mask of found keys).
+        """
+        keys = np.asarray(keys, dtype="int64")
+        if len(self.keys) == 0:
+            return np.empty((0, self.features.shape[1])), np.zeros(len(keys), dtype=bool)
+        position = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        found = self.keys[position] == keys
+        return self.features[position[found]], found
+
+
+class SubscriberScorer:
+    """
+    Scores subscribers by key: feature lookup, then the saved model's score_batch.
+    """
+
+    def __init__(self, table, scorer):
+        self.table = table
+        self.scorer = scorer
+
+    def score(self, keys):
+        """
+        :param keys: Array of int64 subscriber keys.
+        :return: One JSON-ready dictionary per key ({'msisdn': key, 'found': False} if unknown).
+        """
+        keys = np.asarray(keys, dtype="int64")
+        rows, found = self.table.lookup(keys)
+        scores = self.scorer.score_batch(rows) if len(rows) else {}
+        names = list(scores)
+        scored = zip(*(values.tolist() for values in scores.values()))
+        results = []
+        for key, is_found in zip(keys.tolist(), found.tolist()):
+            if is_found:
+                results.append({"msisdn": key, "found": True, **dict(zip(names, next(scored)))})
+            else:
+                results.append({"msisdn": key, "found": False})
+        return results
+
+
+class RequestBatcher:
+    """
+    Coalesces concurrent lookups into one vectorized call.
+
+    With max_delay=0, lookups made in the same event-loop iteration (every request read
+    from the sockets ready at once) are scored together without any added wait; with
+    max_delay > 0 they wait up to that many seconds for more lookups. A batch is scored
+    early once max_batch keys are pending.
+    """
+
+    def __init__(self, score, max_batch=1024, max_delay=0.0):
+        self.score = score
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._pending_keys = 0
+        self._timer = None
+
+    async def submit(self, keys):
+        """
+        Scores a list of keys as part of the next batch.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((keys, future))
+        self._pending_keys += len(keys)
+        if self._pending_keys >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            if self.max_delay > 0:
+                self._timer = loop.call_later(self.max_delay, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_keys = self._pending, [], 0
+        if not pending:
+            return
+        try:
+            results = self.score(np.concatenate([np.asarray(keys, dtype="int64") for keys, _ in pending]))
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for keys, future in pending:
+            if not future.done():
+                future.set_result(results[start:start + len(keys)])
+            start += len(keys)
+
+
+def _parse_keys(values):
+    """
+    Subscriber keys of a request as ints within the int64 range of the feature table.
+    Only JSON integers are keys: 1.5, true or "1" raise ValueError (answered with 400)
+    like any other bad key, so one bad key never reaches the batch it would share with
+    other requests.
+    """
+    if not isinstance(values, list):
+        raise ValueError("msisdn must be a list.")
+    # bool is a subclass of int, so test the exact type
+    if not all(type(value) is int for value in values):
+        raise ValueError("msisdn values must be integers.")
+    if not values:
+        raise ValueError("No msisdn given.")
+    if not all(KEY_MIN <= value <= KEY_MAX for value in values):
+        raise ValueError("msisdn out of range.")
+    return values
+
+
+def _parse_path_keys(values):
+    """
+    Subscriber keys given in the URL (path or query string), which must be written as
+    decimal integers; see _parse_keys.
+    """
+    if not all(re.fullmatch(r"-?[0-9]{1,19}", value) for value in values):
+        raise ValueError("msisdn values must be integers.")
+    return _parse_keys([int(value) for value in values])
+
+
+def _parse_head(head):
+    """
+    Request line and headers of one request; ValueError if they are malformed.
+    """
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    parts = request_line.split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise ValueError("Malformed request line.")
+    method, target, version = parts
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if not headers.get("content-length", "0").isdigit():
+        raise ValueError("Invalid Content-Length.")
+    return method, target, version, headers
+
+
+class ScoringService:
+    """
+    Minimal HTTP/1.1 server (asyncio streams, keep-alive) in front of a RequestBatcher.
+    """
+
+    def __init__(self, scorer, table, version, max_batch=1024, max_delay=0.0, max_keys=10000,
+                 max_body=MAX_BODY_BYTES):
+        self.subscribers = SubscriberScorer(table, scorer)
+        self.batcher = RequestBatcher(self.subscribers.score, max_batch, max_delay)
+        self.version = version
+        self.max_keys = max_keys
+        self.max_body = max_body
+
+    async def route(self, method, target, body):
+        """
+        Handles one request; returns (status, JSON-ready payload).
+        """
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        if path == "/health":
+            return 200, {"status": "ok", "model_version": self.version, "subscribers": len(self.subscribers.table)}
+
+        if path == "/score" and method == "POST":
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError('Expected a JSON object {"msisdn": [...]}.')
+            keys = _parse_keys(request.get("msisdn", []))
+            if len(keys) > self.max_keys:
+                return 400, {"error": f"At most {self.max_keys} msisdn per request."}
+            return 200, {"model_version": self.version, "results": await self.batcher.submit(keys)}
+
+        if path == "/score" or path.startswith("/score/"):
+            if method != "GET":
+                return 405, {"error": "Use GET for one msisdn, POST for a batch."}
+            values = [path[len("/score/"):]] if path.startswith("/score/") else parse_qs(url.query).get("msisdn", [])
+            keys = _parse_path_keys(values)
+            if len(keys) > 1:
+                return 400, {"error": "Use POST /score for several msisdn."}
+            result = (await self.batcher.submit(keys))[0]
+            return (200 if result["found"] else 404), {"model_version": self.version, **result}
+
+        return 404, {"error": f"Unknown path {url.path}."}
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection until the client closes it.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                keep_alive = False
+                try:
+                    method, target, version, headers = _parse_head(head)
+                    length = int(headers.get("content-length", 0))
+                    if length > self.max_body:
+                        # The body is left unread, so the connection is closed after the answer
+                        status, payload = 413, {"error": f"Request body over {self.max_body} bytes."}
+                    else:
+                        body = await reader.readexactly(length)
+                        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                        status, payload = await self.route(method, target, body)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Scoring service (model {self.version}, {len(self.subscribers.table):,} subscribers) "
+              f"listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def create_service(registry_dir=REGISTRY_DIR, feature_dir=FEATURE_TABLE_DIR, name="satisfaction",
+                   version=None, **options):
+    """
+    Loads the saved model (latest version by default) and the feature table into a ScoringService.
+
+    The table holds per-subscriber sums, so the model must have been fitted on them too:
+    satisfaction_analysis(level='subscriber') with the same subscriber key the table was
+    built with. Anything else raises ValueError instead of scoring on the wrong scale.
+    """
+    registry = ModelRegistry(registry_dir)
+    scorer = load_scorer(registry, name, version)
+    table = FeatureTable(feature_dir)
+    if scorer.level != "subscriber":
+        raise ValueError(f"Model '{name}' {scorer.version} was fitted on {scorer.level} rows; the service "
+                         f"needs a model fitted with satisfaction_analysis(level='subscriber').")
+    if scorer.subscriber_key != table.info["key"]:
+        raise ValueError(f"Model '{name}' {scorer.version} is keyed by {scorer.subscriber_key}, but the feature "
+                         f"table in {feature_dir} by {table.info['key']}; rebuild one of them with the same key.")
+    return ScoringService(scorer, table, scorer.version, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local satisfaction scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--registry", default=REGISTRY_DIR, help="Model registry directory.")
+    parser.add_argument("--features", default=FEATURE_TABLE_DIR, help="Feature table directory.")
+    parser.add_argument("--version", default=None, help="Model version (defaults to the latest).")
+    parser.add_argument("--max-batch", type=int, default=1024, help="Keys scored per coalesced batch.")
+    parser.add_argument("--max-delay", type=float, default=0.0, help="Seconds a lookup may wait for its batch.")
+    args = parser.parse_args()
+
+    service = create_service(args.registry, args.features, version=args.version,
+                             max_batch=args.max_batch, max_delay=args.max_delay)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
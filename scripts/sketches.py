@@ -0,0 +1,123 @@
+# scripts/sketches.py
+
+import numpy as np
+import pandas as pd
+
+# Streaming summaries for rankings over data too large to hold in memory.
+# Every sketch is updated chunk by chunk with update() and can be combined with
+# the sketch of another worker / partition with merge():
+#
+#   handsets = FrequentItems(capacity=1000)
+#   for chunk in stream_data_from_postgres(query):
+#       handsets.update(chunk['Handset Type'])
+#   handsets.top(10)
+
+
+class FrequentItems:
+    """
+    Most frequent values of a column (Space-Saving / Misra-Gries style summary).
+
+    At most `capacity` counters are kept. Counts are never underestimated, and each
+    count overestimates the true count by at most its recorded error; a value that
+    is not tracked occurred at most `floor` times. With capacity=None every distinct
+    value is tracked and the counts are exact (the same as value_counts()).
+    """
+
+    def __init__(self, capacity=None, name=None):
+        self.capacity = capacity
+        self.name = name
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+        self.floor = 0
+
+    def update(self, values):
+        """
+        Adds a chunk of values (Series or array); missing values are ignored.
+        """
+        values = pd.Series(values)
+        if self.name is None:
+            self.name = values.name
+        chunk_counts = values.value_counts(sort=False)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Categoricals report unused categories too, and their categories can differ between chunks
+            chunk_counts = chunk_counts[chunk_counts > 0]
+            chunk_counts.index = chunk_counts.index.astype(object)
+        chunk = FrequentItems(capacity=None, name=self.name)
+        chunk.counts = chunk_counts.astype("int64")
+        chunk.errors = pd.Series(0, index=chunk_counts.index, dtype="int64")
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Merges another FrequentItems summary into this one (in place).
+        """
+        # A value missing from one summary occurred at most `floor` times there
+        index = self.counts.index.union(other.counts.index, sort=False)
+        counts = (self.counts.reindex(index, fill_value=self.floor)
+                  + other.counts.reindex(index, fill_value=other.floor))
+        errors = (self.errors.reindex(index, fill_value=self.floor)
+                  + other.errors.reindex(index, fill_value=other.floor))
+        floor = self.floor + other.floor
+
+        if self.capacity is not None and len(counts) > self.capacity:
+            order = np.argsort(-counts.to_numpy(), kind="stable")
+            evicted = counts.iloc[order[self.capacity:]]
+            floor = max(floor, int(evicted.max()))
+            counts = counts.iloc[order[:self.capacity]]
+            errors = errors.loc[counts.index]
+
+        self.counts = counts.astype("int64")
+        self.errors = errors.astype("int64")
+        self.floor = floor
+        return self
+
+    @property
+    def exact(self):
+        return self.floor == 0
+
+    def top(self, n=10):
+        """
+        Returns the n most frequent values and their (estimated) counts, like value_counts().head(n).
+        """
+        top = self.counts.sort_values(ascending=False, kind="stable").head(n)
+        top.index.name = self.name
+        return top.rename("count")
+
+
+class ExtremeValues:
+    """
+    The n largest and n smallest values of a column, kept in bounded memory.
+
+    Only the current 2 * n candidates are kept between chunks, so the result is
+    exact (the same as nlargest(n) / nsmallest(n) on the full column).
+    """
+
+    def __init__(self, n=10):
+        self.n = n
+        self.largest = pd.Series(dtype="float64")
+        self.smallest = pd.Series(dtype="float64")
+
+    def update(self, values):
+        """
+        Adds a chunk of values (Series keeps its index labels); missing values are ignored.
+        """
+        values = pd.Series(values)
+        return self._combine(values.nlargest(self.n), values.nsmallest(self.n))
+
+    def merge(self, other):
+        """
+        Merges another ExtremeValues summary into this one (in place).
+        """
+        return self._combine(other.largest, other.smallest)
+
+    def _combine(self, largest, smallest):
+        # Concatenate only the non-empty candidates so dtypes are not widened
+        self.largest = pd.concat([s for s in (self.largest, largest) if len(s)] or [largest]).nlargest(self.n)
+        self.smallest = pd.concat([s for s in (self.smallest, smallest) if len(s)] or [smallest]).nsmallest(self.n)
+        return self
+
+    def top(self):
+        return self.largest
+
+    def bottom(self):
+        return self.smallest
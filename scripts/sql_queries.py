@@ -0,0 +1,78 @@
+# scripts/sql_queries.py
+
+# Default xDR source table
+XDR_TABLE = "public.xdr_data"
+
+
+def quote_column(column):
+    """
+    Quotes a column name such as 'Dur. (ms)' for use in SQL.
+    """
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sum(column):
+    """
+    SUM that treats missing values as 0 and returns 0 for all-NULL groups, like pandas.
+    """
+    return f"COALESCE(SUM({quote_column(column)}), 0)"
+
+
+def _from_clause(source):
+    """
+    Accepts either a table name or a SELECT query and returns a FROM target.
+    """
+    if source.lstrip().lower().startswith(("select", "with")):
+        return f"({source.strip().rstrip(';')}) AS xdr"
+    return source
+
+
+def build_user_behavior_query(app_columns, source=XDR_TABLE):
+    """
+    Builds the per-IMSI GROUP BY equivalent of user_overview_analysis.aggregate_user_behavior.
+
+    :param app_columns: Mapping of application name to its [DL, UL] byte columns.
+    :param source: Table name or SELECT query providing raw xDR rows.
+    :return: SQL query returning one row per IMSI.
+    """
+    select_items = [
+        quote_column("IMSI"),
+        f"COUNT({quote_column('Bearer Id')}) AS {quote_column('total_xDR_sessions')}",
+        f"{_sum('Dur. (ms)')} AS {quote_column('total_session_duration')}",
+    ]
+    for app, cols in app_columns.items():
+        total = " + ".join(_sum(col) for col in cols)
+        select_items.append(f"{total} AS {quote_column(f'total_{app}_data')}")
+
+    select_list = ",\n        ".join(select_items)
+
+    return f"""
+    SELECT
+        {select_list}
+    FROM {_from_clause(source)}
+    WHERE {quote_column("IMSI")} IS NOT NULL
+    GROUP BY {quote_column("IMSI")}
+    ORDER BY {quote_column("IMSI")};
+    """
+
+
+def build_engagement_metrics_query(source=XDR_TABLE):
+    """
+    Builds the per-IMSI GROUP BY equivalent of User_Engagement_Analysis.aggregate_engagement_metrics.
+
+    :param source: Table name or SELECT query providing raw xDR rows.
+    :return: SQL query returning one row per IMSI.
+    """
+    return f"""
+    SELECT
+        {quote_column("IMSI")},
+        {_sum("Dur. (ms)")} AS "Total_Duration",
+        {_sum("Total UL (Bytes)")} AS "Total_UL",
+        {_sum("Total DL (Bytes)")} AS "Total_DL",
+        {_sum("Total UL (Bytes)")} + {_sum("Total DL (Bytes)")} AS "Total_Traffic",
+        COUNT({quote_column("Bearer Id")}) AS "Session_Frequency"
+    FROM {_from_clause(source)}
+    WHERE {quote_column("IMSI")} IS NOT NULL
+    GROUP BY {quote_column("IMSI")}
+    ORDER BY {quote_column("IMSI")};
+    """
@@ -0,0 +1,318 @@
+# scripts/summary_stats.py
+
+import copy
+import numpy as np
+import pandas as pd
+from sketches import FrequentItems
+
+# Single-pass, mergeable replacement for describe() / isnull().sum() / duplicated().sum():
+#
+#   stats = summarize(stream_data_from_postgres(query))     # or summarize(df)
+#   stats.describe(include='all')                           # same layout as df.describe()
+#   stats.null_counts(), stats.duplicate_rows
+#
+# Partial summaries built by parallel workers are combined with merge().
+
+
+class QuantileDigest:
+    """
+    Mergeable approximate quantiles (a merging t-digest).
+
+    Values are buffered exactly until there are more than buffer_size of them; the
+    buffer is then compressed into about `compression` weighted centroids, small at
+    the tails and larger in the middle, so extreme quantiles stay accurate. While no
+    compression has happened the quantiles are exact (linear interpolation, as pandas).
+    """
+
+    def __init__(self, compression=1000, buffer_size=10000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0, dtype="float64")
+        self.weights = np.empty(0, dtype="float64")
+
+    def update(self, values):
+        """
+        Adds an array of (non-missing) values.
+        """
+        values = np.asarray(values, dtype="float64")
+        return self._add(values, np.ones(len(values)))
+
+    def merge(self, other):
+        """
+        Merges another digest into this one (in place).
+        """
+        return self._add(other.means, other.weights)
+
+    def _add(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="mergesort")
+        self.means, self.weights = means[order], weights[order]
+        if len(self.means) > self.buffer_size:
+            self._compress()
+        return self
+
+    def _compress(self):
+        # Group neighbouring centroids whose midpoints fall in the same unit of the
+        # t-digest scale function k(q) = compression / (2 pi) * asin(2q - 1)
+        total = self.weights.sum()
+        midpoints = (np.cumsum(self.weights) - self.weights / 2) / total
+        scale = self.compression / (2 * np.pi) * np.arcsin(2 * midpoints - 1)
+        bins = np.floor(scale)
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        weights = np.add.reduceat(self.weights, starts)
+        self.means = np.add.reduceat(self.weights * self.means, starts) / weights
+        self.weights = weights
+
+    def quantile(self, q, minimum=None, maximum=None):
+        """
+        Returns the approximate q-quantiles (q is a float or an array of floats in [0, 1]).
+        minimum / maximum are the exact extremes, used to anchor the tails.
+        """
+        q = np.asarray(q, dtype="float64")
+        if len(self.means) == 0:
+            return np.full(q.shape, np.nan)
+        if np.all(self.weights == 1):
+            return np.quantile(self.means, q)
+
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        xs = np.r_[0, centres, total]
+        ys = np.r_[self.means[0] if minimum is None else minimum,
+                   self.means,
+                   self.means[-1] if maximum is None else maximum]
+        return np.interp(q * total, xs, ys)
+
+    def cdf_rank(self, values):
+        """
+        Maps values to their (approximate) average rank among the values added so far,
+        1-based as in Series.rank(); exact while no compression has happened.
+        """
+        values = np.asarray(values, dtype="float64")
+        if np.all(self.weights == 1):
+            below = np.searchsorted(self.means, values, side="left")
+            at_or_below = np.searchsorted(self.means, values, side="right")
+            ranks = (below + at_or_below + 1) / 2
+        else:
+            centres = np.cumsum(self.weights) - self.weights / 2
+            ranks = np.interp(values, self.means, centres) + 0.5
+        return np.where(np.isnan(values), np.nan, ranks)
+
+
+def _union_hashes(seen, hashes):
+    """
+    Sorted distinct union of two uint64 hash arrays (seen is already sorted and distinct).
+    """
+    merged = np.concatenate([seen, hashes])
+    # Stable sort of integers is a radix sort, much faster here than np.union1d
+    merged.sort(kind="stable")
+    return merged[np.r_[True, merged[1:] != merged[:-1]]] if len(merged) else merged
+
+
+def _percentile_label(p):
+    return f"{p * 100:g}%"
+
+
+class SummaryStats:
+    """
+    Summary statistics of a DataFrame accumulated chunk by chunk.
+
+    For numeric and datetime columns it keeps the count, mean and variance (Welford,
+    combined across chunks with Chan's formula), min / max and a QuantileDigest. For
+    other columns it keeps value counts (FrequentItems; exact unless capacity is
+    given). For every column it keeps the number of missing values, and for the rows
+    a set of 64-bit row hashes to count duplicate rows.
+    """
+
+    def __init__(self, percentiles=(0.25, 0.5, 0.75), compression=1000, capacity=None, track_duplicates=True):
+        self.percentiles = list(percentiles)
+        self.compression = compression
+        self.capacity = capacity
+        self.track_duplicates = track_duplicates
+        self.columns = None
+        self.rows = 0
+
+    def _init_columns(self, chunk):
+        self.columns = list(chunk.columns)
+        self.numeric_columns = list(chunk.select_dtypes(include=["number"]).columns)
+        self.datetime_columns = list(chunk.select_dtypes(include=["datetime", "datetimetz"]).columns)
+        # describe() reports datetime statistics in the resolution of the column
+        self.datetime_units = {column: chunk[column].dt.unit for column in self.datetime_columns}
+        measured = set(self.numeric_columns) | set(self.datetime_columns)
+        self.other_columns = [column for column in self.columns if column not in measured]
+
+        n = len(self.numeric_columns) + len(self.datetime_columns)
+        self.nulls = np.zeros(len(self.columns), dtype="int64")
+        self.count = np.zeros(n, dtype="int64")
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.digests = [QuantileDigest(self.compression) for _ in range(n)]
+        self.frequent = {column: FrequentItems(self.capacity, name=column) for column in self.other_columns}
+        self.row_hashes = np.empty(0, dtype="uint64")
+
+    def _measured_block(self, chunk):
+        """
+        Numeric and datetime columns of a chunk as one float64 matrix (datetimes as ns since epoch).
+        """
+        blocks = [chunk[self.numeric_columns].to_numpy(dtype="float64", na_value=np.nan)]
+        for column in self.datetime_columns:
+            values = chunk[column]
+            ns = values.to_numpy(dtype="datetime64[ns]").view("int64").astype("float64")
+            blocks.append(np.where(values.isna().to_numpy(), np.nan, ns)[:, None])
+        return np.hstack(blocks)
+
+    def _combine_moments(self, count, mean, m2, minimum, maximum):
+        # Chan et al. parallel update of count / mean / M2
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+
+    def update(self, chunk):
+        """
+        Adds a chunk of rows (DataFrame with the same columns as the previous chunks).
+        """
+        if self.columns is None:
+            self._init_columns(chunk)
+        self.rows += len(chunk)
+        self.nulls += chunk.isna().sum().to_numpy(dtype="int64")
+
+        X = self._measured_block(chunk)
+        present = ~np.isnan(X)
+        count = present.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.where(present, X, 0).sum(axis=0) / count, 0.0)
+        m2 = np.where(present, (X - mean) ** 2, 0).sum(axis=0)
+        self._combine_moments(count, mean, m2,
+                              np.where(present, X, np.inf).min(axis=0, initial=np.inf),
+                              np.where(present, X, -np.inf).max(axis=0, initial=-np.inf))
+        for j, digest in enumerate(self.digests):
+            digest.update(X[present[:, j], j])
+
+        for column, sketch in self.frequent.items():
+            sketch.update(chunk[column])
+
+        if self.track_duplicates:
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            self.row_hashes = _union_hashes(self.row_hashes, hashes)
+        return self
+
+    def merge(self, other):
+        """
+        Merges the summary of another worker / partition (same columns) into this one.
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self._combine_moments(other.count, other.mean, other.m2, other.min, other.max)
+        for digest, other_digest in zip(self.digests, other.digests):
+            digest.merge(other_digest)
+        for column, sketch in self.frequent.items():
+            sketch.merge(other.frequent[column])
+        self.row_hashes = _union_hashes(self.row_hashes, other.row_hashes)
+        return self
+
+    def null_counts(self):
+        """
+        Missing values per column, like df.isnull().sum().
+        """
+        return pd.Series(self.nulls, index=self.columns, dtype="int64")
+
+    @property
+    def duplicate_rows(self):
+        """
+        Number of rows identical to an earlier row, like df.duplicated().sum().
+        """
+        if not self.track_duplicates:
+            return None
+        return int(self.rows - len(self.row_hashes))
+
+    def _column_stats(self, column):
+        """
+        describe() statistics of one column, as a Series.
+        """
+        if column in self.frequent:
+            top = self.frequent[column].top(1)
+            return pd.Series({
+                "count": self.rows - self.nulls[self.columns.index(column)],
+                "unique": len(self.frequent[column].counts),
+                "top": top.index[0] if len(top) else np.nan,
+                "freq": top.iloc[0] if len(top) else np.nan,
+            }, name=column)
+
+        j = (self.numeric_columns + self.datetime_columns).index(column)
+        n = self.count[j]
+        quantiles = (self.digests[j].quantile(self.percentiles, self.min[j], self.max[j])
+                     if n else np.full(len(self.percentiles), np.nan))
+        stats = {"count": float(n), "mean": self.mean[j] if n else np.nan}
+        if column in self.numeric_columns:
+            stats["std"] = np.sqrt(self.m2[j] / (n - 1)) if n > 1 else np.nan
+        stats["min"] = self.min[j] if n else np.nan
+        stats.update({_percentile_label(p): q for p, q in zip(self.percentiles, quantiles)})
+        stats["max"] = self.max[j] if n else np.nan
+
+        if column in self.datetime_columns:
+            # Back from ns since epoch to Timestamps (count stays an integer, as in pandas)
+            unit = self.datetime_units[column]
+            stats = {
+                name: int(value) if name == "count" else
+                (pd.NaT if pd.isna(value) else pd.Timestamp(int(value)).as_unit(unit))
+                for name, value in stats.items()
+            }
+        return pd.Series(stats, name=column)
+
+    def describe(self, include=None):
+        """
+        Returns the statistics in the layout of DataFrame.describe().
+
+        Rows follow the fixed order count, unique, top, freq, mean, std, min, percentiles,
+        max, keeping those that apply. This is pandas' order for any single kind of column;
+        when numeric and datetime columns are described together pandas moves std last.
+
+        :param include: None for numeric and datetime columns (other columns if there are none), or 'all'.
+        :return: DataFrame with one column per described column.
+        """
+        if include not in (None, "all"):
+            raise ValueError("include must be None or 'all'.")
+        measured = set(self.numeric_columns + self.datetime_columns)
+        if include == "all" or not measured:
+            columns = self.columns
+        else:
+            columns = [column for column in self.columns if column in measured]
+
+        described = [self._column_stats(column) for column in columns]
+        present = set().union(*(stats.index for stats in described))
+        order = ["count", "unique", "top", "freq", "mean", "std", "min",
+                 *map(_percentile_label, self.percentiles), "max"]
+        rows = [name for name in order if name in present]
+        return pd.concat([stats.reindex(rows) for stats in described], axis=1)
+
+
+def summarize(data, chunk_size=1000000, **options):
+    """
+    Computes SummaryStats over a DataFrame (processed chunk_size rows at a time) or an
+    iterator of DataFrame chunks, in a single pass.
+
+    :param data: DataFrame or iterable of DataFrame chunks.
+    :param chunk_size: Rows per slice when data is a DataFrame.
+    :param options: Passed to SummaryStats (percentiles, compression, capacity, track_duplicates).
+    :return: Filled SummaryStats.
+    """
+    stats = SummaryStats(**options)
+    if isinstance(data, pd.DataFrame):
+        chunks = (data.iloc[start:start + chunk_size] for start in range(0, max(len(data), 1), chunk_size))
+    else:
+        chunks = data
+    for chunk in chunks:
+        stats.update(chunk)
+    return stats
@@ -2,61 +2,79 @@
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.decomposition import PCA
+from load_data import load_data_using_sqlalchemy
+from sql_queries import build_user_behavior_query
+from plot_rendering import chart, histogram_data, show_or_save
+from summary_stats import summarize
+from correlation import correlation_matrix
+from pca import fit_pca, transform_in_chunks
+from imputation import ChunkedImputer
+
+APP_COLUMNS = {
+    "Social Media": ["Social Media DL (Bytes)", "Social Media UL (Bytes)"],
+    "Google": ["Google DL (Bytes)", "Google UL (Bytes)"],
+    "Email": ["Email DL (Bytes)", "Email UL (Bytes)"],
+    "YouTube": ["Youtube DL (Bytes)", "Youtube UL (Bytes)"],
+    "Netflix": ["Netflix DL (Bytes)", "Netflix UL (Bytes)"],
+    "Gaming": ["Gaming DL (Bytes)", "Gaming UL (Bytes)"],
+    "Other": ["Other DL (Bytes)", "Other UL (Bytes)"],
+}
 
 def aggregate_user_behavior(df):
     """
     Aggregates user behavior data for specified applications.
-    """
-    app_columns = {
-        "Social Media": ["Social Media DL (Bytes)", "Social Media UL (Bytes)"],
-        "Google": ["Google DL (Bytes)", "Google UL (Bytes)"],
-        "Email": ["Email DL (Bytes)", "Email UL (Bytes)"],
-        "YouTube": ["Youtube DL (Bytes)", "Youtube UL (Bytes)"],
-        "Netflix": ["Netflix DL (Bytes)", "Netflix UL (Bytes)"],
-        "Gaming": ["Gaming DL (Bytes)", "Gaming UL (Bytes)"],
-        "Other": ["Other DL (Bytes)", "Other UL (Bytes)"],
-    }
-    
-    # Group by IMSI and perform the main aggregations
-    user_agg = df.groupby("IMSI").agg(
+
+    df can be:
+    - a DataFrame, aggregated in pandas;
+    - an iterator of DataFrame chunks (e.g. from load_data.stream_data_from_postgres);
+    - a table name or SELECT query (str), in which case the GROUP BY is pushed down
+      to the database and only the per-user result is fetched.
+    """
+    if isinstance(df, str):
+        return load_data_using_sqlalchemy(build_user_behavior_query(APP_COLUMNS, source=df))
+
+    if not isinstance(df, pd.DataFrame):
+        # Every metric is a count or a sum, so per-chunk partials simply add up
+        partials = [aggregate_user_behavior(chunk) for chunk in df]
+        return pd.concat(partials, ignore_index=True).groupby("IMSI").sum().reset_index()
+
+    # Precompute DL + UL per application (missing bytes count as 0, like a groupby sum)
+    # so that a single groupby over IMSI produces every metric
+    frame = df[["IMSI", "Bearer Id"]].copy()
+    frame["Dur. (ms)"] = df["Dur. (ms)"].to_numpy(dtype="float64", na_value=np.nan)
+    for app, (dl_col, ul_col) in APP_COLUMNS.items():
+        frame[f"total_{app}_data"] = (
+            df[dl_col].to_numpy(dtype="float64", na_value=0)
+            + df[ul_col].to_numpy(dtype="float64", na_value=0)
+        )
+
+    user_agg = frame.groupby("IMSI").agg(
         total_xDR_sessions=("Bearer Id", "count"),
         total_session_duration=("Dur. (ms)", "sum"),
+        **{f"total_{app}_data": (f"total_{app}_data", "sum") for app in APP_COLUMNS},
     ).reset_index()
-    
-    # Add total data for each application by summing the respective columns
-    for app, cols in app_columns.items():
-        # Sum the download and upload bytes for each application
-        total_data = df.groupby("IMSI")[cols].sum().sum(axis=1).reset_index(drop=True)
-        user_agg[f"total_{app}_data"] = total_data
 
     return user_agg
 
 
-
-
 # Task 1.2 - Exploratory Data Analysis
 def describe_variables(df):
     """
     Prints description of variables and their data types.
     """
     print(df.info())
-    print(df.describe())
+    print(summarize(df).describe())
 
-import pandas as pd
-
-import pandas as pd
-
-def handle_missing_values(df, strategy="mean"):
+def handle_missing_values(df, strategy="mean", imputer=None):
     """
     Handles missing values in the dataset by filling numeric columns with a specified strategy
-    (mean, median, or mode) and categorical columns with their mode (most frequent value).
+    (mean or median) and categorical columns with their mode (most frequent value).
     
     Parameters:
     - df: pandas DataFrame to process
     - strategy: Strategy for filling missing values in numeric columns. Default is 'mean'.
+    - imputer: Optional ChunkedImputer fitted earlier (e.g. loaded with ChunkedImputer.load),
+      used instead of computing the statistics on df.
     
     Returns:
     - df: pandas DataFrame with missing values handled
@@ -66,31 +84,15 @@ def handle_missing_values(df, strategy="mean"):
         print("DataFrame is empty. No action taken.")
         return df  # Return the empty dataframe if no data is available
     
-    # Handling numeric columns
-    numeric_cols = df.select_dtypes(include=["float64", "int64"]).columns
-    if strategy == "mean":
-        for col in numeric_cols:
-            if df[col].isnull().any():
-                df[col] = df[col].fillna(df[col].mean())  # Fill with column mean
-    elif strategy == "median":
-        for col in numeric_cols:
-            if df[col].isnull().any():
-                df[col] = df[col].fillna(df[col].median())  # Fill with column median
-    else:
-        print("Unsupported strategy for numeric columns. Use 'mean' or 'median'.")
-    
-    # Handling categorical columns
-    categorical_cols = df.select_dtypes(include=["object"]).columns
-    for col in categorical_cols:
-        if df[col].isnull().any():
-            # Safely handle mode by checking if mode exists
-            mode_value = df[col].mode()
-            if not mode_value.empty:
-                df[col] = df[col].fillna(mode_value[0])  # Fill with the most frequent value
-            else:
-                df[col] = df[col].fillna('Unknown')  # Fill with a default value if no mode is found
+    if imputer is None:
+        if strategy not in ("mean", "median"):
+            print("Unsupported strategy for numeric columns. Use 'mean' or 'median'.")
+            strategy = None
+        # Identifier columns (IMSI, MSISDN, Bearer Id, ...) are never filled with a statistic;
+        # categorical columns without any value are filled with 'Unknown'
+        imputer = ChunkedImputer(numeric_strategy=strategy, categorical_strategy="most_frequent").fit(df)
     
-    return df
+    return imputer.transform(df)
 
 
 
@@ -118,37 +120,45 @@ def perform_variable_transformations(df):
 def compute_dispersion(df):
     """
     Computes dispersion metrics for quantitative variables.
+    df can also be an iterator of chunks (quantiles are then approximate).
     """
-    metrics = df.describe().T
+    metrics = summarize(df).describe().T
     print(metrics[['mean', 'std', 'min', '25%', '50%', '75%', 'max']])
 
 # Graphical Analysis
-def plot_graphical_analysis(df):
+def plot_graphical_analysis(df, output_dir=None):
     """
     Generates suitable plots for variables.
     """
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['total_session_duration'], kde=True)
-    plt.title("Distribution of Session Durations")
-    plt.show()
+    spec = chart('session_duration_distribution', 'hist', histogram_data(df['total_session_duration']),
+                 "Distribution of Session Durations", figsize=(10, 6))
+    return show_or_save(spec, output_dir)
 
-def correlation_analysis(df, columns):
+def correlation_analysis(df, columns, output_dir=None):
     """
     Computes and visualizes a correlation matrix.
+    df can also be a callable returning chunk iterators (see correlation.correlation_matrix).
     """
-    corr_matrix = df[columns].corr()
-    sns.heatmap(corr_matrix, annot=True, fmt='.2f', cmap='coolwarm')
-    plt.title("Correlation Matrix")
-    plt.show()
+    corr_matrix = correlation_matrix(df, columns)
+    spec = chart('correlation_matrix', 'heatmap', corr_matrix, "Correlation Matrix",
+                 figsize=(10, 8), annot=True, fmt='.2f', cmap='coolwarm')
+    show_or_save(spec, output_dir)
 
 # Dimensionality Reduction
-def perform_pca(df, columns):
+def perform_pca(df, columns, n_components=None, backend='full', scale=False, model_path=None,
+                chunk_size=100000):
     """
     Performs PCA on specified columns and interprets results.
-    """
-    pca = PCA()
-    principal_components = pca.fit_transform(df[columns])
-    explained_variance = pca.explained_variance_ratio_
+    backend is 'full', 'randomized' or 'incremental' (see pca.fit_pca); with model_path the
+    fitted model is reused to project new users instead of refitting.
+    """
+    model = fit_pca(df[columns], n_components=n_components, backend=backend, scale=scale,
+                    batch_size=chunk_size, model_path=model_path)
+    features = df[columns]
+    principal_components = transform_in_chunks(
+        model, (features.iloc[start:start + chunk_size] for start in range(0, len(features), chunk_size))
+    )
+    explained_variance = model[-1].explained_variance_ratio_
     print(f"Explained Variance: {explained_variance}")
     return principal_components
 
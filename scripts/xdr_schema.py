@@ -0,0 +1,90 @@
+# scripts/xdr_schema.py
+
+import pandas as pd
+
+# Byte volumes and session / activity durations of public.xdr_data: kept as float64,
+# since float32 rounds values near 1e9 to a multiple of 64 and per-user totals would drift
+_FLOAT64_COLUMNS = [
+    "Dur. (ms)", "Activity Duration DL (ms)", "Activity Duration UL (ms)", "Dur. (ms).1",
+    "TCP DL Retrans. Vol (Bytes)", "TCP UL Retrans. Vol (Bytes)",
+    "HTTP DL (Bytes)", "HTTP UL (Bytes)",
+    "Social Media DL (Bytes)", "Social Media UL (Bytes)",
+    "Google DL (Bytes)", "Google UL (Bytes)",
+    "Email DL (Bytes)", "Email UL (Bytes)",
+    "Youtube DL (Bytes)", "Youtube UL (Bytes)",
+    "Netflix DL (Bytes)", "Netflix UL (Bytes)",
+    "Gaming DL (Bytes)", "Gaming UL (Bytes)",
+    "Other DL (Bytes)", "Other UL (Bytes)",
+    "Total UL (Bytes)", "Total DL (Bytes)",
+]
+
+# Small-range measurements (ms offsets, RTT, throughput, shares, seconds per band) that
+# float32 holds without meaningful loss
+_FLOAT32_COLUMNS = [
+    "Start ms", "End ms",
+    "Avg RTT DL (ms)", "Avg RTT UL (ms)",
+    "Avg Bearer TP DL (kbps)", "Avg Bearer TP UL (kbps)",
+    "DL TP < 50 Kbps (%)", "50 Kbps < DL TP < 250 Kbps (%)",
+    "250 Kbps < DL TP < 1 Mbps (%)", "DL TP > 1 Mbps (%)",
+    "UL TP < 10 Kbps (%)", "10 Kbps < UL TP < 50 Kbps (%)",
+    "50 Kbps < UL TP < 300 Kbps (%)", "UL TP > 300 Kbps (%)",
+    "Nb of sec with 125000B < Vol DL", "Nb of sec with 1250B < Vol UL < 6250B",
+    "Nb of sec with 31250B < Vol DL < 125000B", "Nb of sec with 37500B < Vol UL",
+    "Nb of sec with 6250B < Vol DL < 31250B", "Nb of sec with 6250B < Vol UL < 37500B",
+    "Nb of sec with Vol DL < 6250B", "Nb of sec with Vol UL < 1250B",
+]
+
+# Subscriber / session identifiers: typed as integers and never imputed
+ID_COLUMNS = ["Bearer Id", "IMSI", "MSISDN/Number", "IMEI"]
+
+# Declared dtypes of the xDR table, applied by the loaders at read time.
+# Identifiers are nullable integers (Bearer Id needs UInt64: its values exceed the int64 range;
+# export_data writes it as NUMERIC(20)), repeated strings are categoricals, volumes and
+# durations are float64 and the other measurements float32.
+XDR_SCHEMA = {
+    "Bearer Id": "UInt64",
+    "Start": "datetime64[ns]",
+    "End": "datetime64[ns]",
+    "IMSI": "Int64",
+    "MSISDN/Number": "Int64",
+    "IMEI": "Int64",
+    "Last Location Name": "category",
+    "Handset Manufacturer": "category",
+    "Handset Type": "category",
+    **{column: "float64" for column in _FLOAT64_COLUMNS},
+    **{column: "float32" for column in _FLOAT32_COLUMNS},
+}
+
+
+def _convert_column(series, dtype):
+    """
+    Converts one column to its declared dtype, turning unparseable values into missing values.
+    """
+    if dtype == "category":
+        return series.astype("category")
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(series, errors="coerce").astype(dtype)
+    return pd.to_numeric(series, errors="coerce").astype(dtype)
+
+
+def apply_xdr_schema(df, columns=None, schema=XDR_SCHEMA):
+    """
+    Casts the columns of an xDR frame to the declared schema in one pass.
+
+    Columns missing from the frame, not in the schema, or already of the right dtype
+    are left untouched, so applying the schema twice costs nothing.
+
+    :param df: DataFrame (or chunk) of xDR rows.
+    :param columns: Optional subset of columns to convert; defaults to all schema columns.
+    :param schema: Mapping of column name to dtype; defaults to XDR_SCHEMA.
+    :return: DataFrame with the declared dtypes (the input frame is not modified).
+    """
+    columns = df.columns if columns is None else columns
+    conversions = {
+        column: _convert_column(df[column], schema[column])
+        for column in columns
+        if column in schema and column in df.columns and str(df[column].dtype) != schema[column]
+    }
+    if not conversions:
+        return df
+    return df.assign(**conversions)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+import clustering
+from clustering import chunked_inertia, fit_kmeans, predict_in_chunks, select_k
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, _ = make_blobs(n_samples=20000, n_features=5, centers=4, cluster_std=1.0, random_state=0)
+    return X
+
+
+def _chunks(X, size=3000):
+    return [X[start:start + size] for start in range(0, len(X), size)]
+
+
+def _sorted_centres(model):
+    centres = model.cluster_centers_
+    return centres[np.lexsort(centres.T[::-1])]
+
+
+def test_streamed_minibatch_finds_the_full_batch_centres(blobs, tmp_path):
+    full = fit_kmeans(blobs, n_clusters=4)
+    path = str(tmp_path / "centroids.npy")
+    streamed = fit_kmeans(lambda: iter(_chunks(blobs)), n_clusters=4, backend="minibatch",
+                          batch_size=1000, centroids_path=path)
+
+    np.testing.assert_allclose(_sorted_centres(streamed), _sorted_centres(full), atol=0.1)
+    np.testing.assert_array_equal(np.load(path), streamed.cluster_centers_)
+    # Warm-started from the saved centroids
+    assert fit_kmeans(blobs, n_clusters=4, backend="minibatch", centroids_path=path).n_init == 1
+
+
+def test_full_backend_rejects_chunks(blobs):
+    with pytest.raises(ValueError):
+        fit_kmeans(iter(_chunks(blobs)), backend="full")
+
+
+def test_chunked_predictions_and_inertia_match_in_memory(blobs):
+    model = fit_kmeans(blobs, n_clusters=4)
+
+    np.testing.assert_array_equal(predict_in_chunks(model, _chunks(blobs)), model.predict(blobs))
+    assert chunked_inertia(model, _chunks(blobs)) == pytest.approx(model.inertia_, rel=1e-6)
+
+
+@pytest.fixture
+def no_select_k_cache(monkeypatch):
+    monkeypatch.setattr(clustering, "_SELECT_K_CACHE", {})
+
+
+def test_select_k_finds_the_known_k_and_stops_early(blobs, no_select_k_cache):
+    k, metrics = select_k(blobs, k_range=range(2, 11), n_jobs=1)
+
+    assert k == 4
+    assert list(metrics["k"]) == [2, 3, 4, 5]
+
+
+def test_select_k_without_early_stop_fits_every_k(blobs, no_select_k_cache):
+    k, metrics = select_k(blobs, k_range=range(2, 9), n_jobs=1, early_stop=False)
+
+    assert k == 4
+    assert list(metrics["k"]) == list(range(2, 9))
+
+
+def test_select_k_parallel_window_matches_inline(blobs, no_select_k_cache):
+    k, metrics = select_k(blobs, k_range=range(2, 11), n_jobs=2, sample_size=5000)
+    clustering._SELECT_K_CACHE.clear()
+    inline_k, _ = select_k(blobs, k_range=range(2, 11), n_jobs=1, sample_size=5000)
+
+    assert k == inline_k == 4
+    # The window may have fitted one k past the elbow before stopping
+    assert list(metrics["k"])[:4] == [2, 3, 4, 5] and len(metrics) <= 5
+
+
+def test_select_k_results_are_cached(blobs, no_select_k_cache, tmp_path):
+    k, metrics = select_k(blobs, n_jobs=1, cache_dir=str(tmp_path))
+    clustering._SELECT_K_CACHE.clear()
+    cached_k, cached_metrics = select_k(blobs, n_jobs=1, cache_dir=str(tmp_path))
+
+    assert cached_k == k
+    np.testing.assert_allclose(cached_metrics["inertia"], metrics["inertia"])
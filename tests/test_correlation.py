@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from correlation import CorrelationAccumulator, correlation_matrix
+
+
+@pytest.fixture
+def apps():
+    rng = np.random.default_rng(0)
+    base = rng.gamma(2.0, 5e8, 4000)
+    return pd.DataFrame({
+        "Youtube DL (Bytes)": base + rng.normal(0, 1e8, 4000),
+        "Netflix DL (Bytes)": base * 0.5 + rng.gamma(2.0, 2e8, 4000),
+        "Gaming DL (Bytes)": rng.gamma(2.0, 4e8, 4000),
+        "Dur. (ms)": rng.integers(1000, 2000000, 4000).astype("float64"),
+    })
+
+
+def test_merged_accumulators_equal_pearson_corr(apps):
+    apps = apps.copy()
+    apps.iloc[::9, 1] = np.nan
+    apps.iloc[::13, 2] = np.nan
+    columns = list(apps.columns)
+    # Different first-chunk means, so merge has to re-centre the sums
+    left = CorrelationAccumulator(columns).update(apps.iloc[:1500])
+    right = CorrelationAccumulator(columns).update(apps.iloc[1500:3000]).update(apps.iloc[3000:])
+
+    tm.assert_frame_equal(left.merge(right).pearson(), apps.corr(), rtol=1e-9)
+
+
+def test_chunked_pearson_equals_corr(apps):
+    tm.assert_frame_equal(correlation_matrix(apps, chunk_size=700), apps.corr(), rtol=1e-9)
+
+
+def test_chunked_spearman_equals_corr(apps):
+    apps = apps.copy()
+    apps["Dur. (ms)"] = apps["Dur. (ms)"] // 1000  # ties
+
+    tm.assert_frame_equal(correlation_matrix(apps, method="spearman", chunk_size=700),
+                          apps.corr(method="spearman"), rtol=1e-9)
+
+
+def test_constant_columns_have_no_correlation():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [5.0, 5.0, 5.0]})
+
+    assert np.isnan(correlation_matrix(df).loc["a", "b"])
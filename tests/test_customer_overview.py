@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from customer_overview import (NUMERIC_COLUMNS, _roll_up, clean_and_aggregate, handset_cube, overview_charts,
+                               session_duration_chart)
+
+
+def _rows(complete=True):
+    df = pd.DataFrame({
+        "Handset Manufacturer": ["Apple", "Apple", "Huawei"],
+        "Handset Type": ["Apple iPhone 6", "Apple iPhone 7", "Huawei B528S-23A"],
+        **{column: [1.0, 2.0, 3.0] for column in NUMERIC_COLUMNS},
+    })
+    if not complete:
+        df["Avg RTT DL (ms)"] = np.nan
+    return df
+
+
+def test_roll_up_of_complete_rows():
+    cube = handset_cube(_rows())
+
+    assert _roll_up(cube, "Handset Manufacturer", "Dur. (ms) sum", complete_only=True).to_dict() == \
+        {"Apple": 3.0, "Huawei": 3.0}
+
+
+def test_roll_up_without_complete_rows_is_empty():
+    cube = handset_cube(_rows(complete=False))
+
+    assert _roll_up(cube, "Handset Type", "Dur. (ms) sum", complete_only=True).empty
+    assert session_duration_chart(cube)["data"].empty
+
+
+def _xdr(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    types = [f"Handset {i}" for i in range(25)]
+    df = pd.DataFrame({
+        "Handset Type": rng.choice(types, n),
+        **{column: rng.gamma(2.0, 1e6, n) for column in NUMERIC_COLUMNS},
+    })
+    df["Handset Manufacturer"] = "Maker " + (df["Handset Type"].str[-1].astype(int) % 4).astype(str)
+    df.loc[::6, "Avg RTT DL (ms)"] = np.nan
+    df.loc[::9, "Total UL (Bytes)"] = np.nan
+    return df
+
+
+def test_charts_from_one_cube_match_direct_aggregations():
+    df = _xdr()
+    cleaned = clean_and_aggregate(df)
+    charts = {spec["name"]: spec["data"] for spec in overview_charts(df)}
+
+    tm.assert_series_equal(charts["session_duration"],
+                           cleaned.groupby("Handset Type")["Dur. (ms)"].sum().nlargest(10),
+                           check_names=False)
+    total_volume = (df["Total DL (Bytes)"] + df["Total UL (Bytes)"]).groupby(df["Handset Type"]).sum()
+    tm.assert_series_equal(charts["total_data_volume"], total_volume.nlargest(10), check_names=False)
+    tm.assert_series_equal(charts["top_3_manufacturers"], df["Handset Manufacturer"].value_counts().head(3),
+                           check_names=False)
+    tm.assert_series_equal(charts["dl_ul_data"]["Total DL (Bytes)"],
+                           df.groupby("Handset Type")["Total DL (Bytes)"].sum().nlargest(10), check_names=False)
+
+
+def test_cube_of_chunks_equals_cube_of_frame():
+    df = _xdr()
+    chunked = handset_cube(df.iloc[start:start + 300] for start in range(0, len(df), 300))
+
+    tm.assert_frame_equal(chunked, handset_cube(df).sort_index(), check_dtype=False)
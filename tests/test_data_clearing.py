@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from data_clearing import RowDeduplicator, clean_in_chunks, clean_large_dataframe, compute_fill_values
+
+
+@pytest.fixture
+def sessions():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Bearer Id": rng.integers(0, 400, 1200).astype("float64"),
+        "IMSI": rng.integers(0, 50, 1200).astype("float64"),
+        "Handset Type": pd.Series(rng.choice(["Apple iPhone 6", "Huawei B528S-23A", None], 1200), dtype=object),
+        "Total DL (Bytes)": rng.choice([1e6, 2e6, np.nan], 1200),
+    })
+    # Whole repeated rows spread over several chunks
+    return pd.concat([df, df.iloc[::7]], ignore_index=True)
+
+
+def _chunks(df, size=250):
+    return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+
+@pytest.mark.parametrize("subset", [None, "Bearer Id", ["Bearer Id", "IMSI"]])
+def test_deduplicator_across_chunks_matches_drop_duplicates(sessions, subset):
+    deduplicator = RowDeduplicator(subset)
+    kept = pd.concat([chunk[deduplicator.keep_mask(chunk)] for chunk in _chunks(sessions)])
+
+    tm.assert_frame_equal(kept, sessions.drop_duplicates(subset=subset))
+
+
+def test_clean_large_dataframe_matches_the_pandas_version(sessions):
+    deduplicated = sessions.drop_duplicates()
+    expected = deduplicated.fillna({
+        "Total DL (Bytes)": deduplicated["Total DL (Bytes)"].mean(),
+        "Handset Type": deduplicated["Handset Type"].mode()[0],
+    })
+    original = sessions.copy()
+
+    tm.assert_frame_equal(clean_large_dataframe(sessions), expected)
+    # The input is left untouched and identifiers are never filled
+    tm.assert_frame_equal(sessions, original)
+    assert "Bearer Id" not in compute_fill_values(sessions)
+
+
+def test_clean_in_chunks_equals_cleaning_the_whole_frame(sessions):
+    sessions.loc[5, "Bearer Id"] = np.nan
+    fill_values = compute_fill_values(sessions, subset="Bearer Id", chunk_size=300)
+    cleaned = pd.concat(clean_in_chunks(_chunks(sessions), fill_values, subset="Bearer Id"))
+
+    tm.assert_frame_equal(cleaned, clean_large_dataframe(sessions, subset="Bearer Id"))
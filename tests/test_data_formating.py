@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_formating import format_data, format_for_export, format_numbers
+
+
+@pytest.mark.parametrize("value", [0.0, 0.005, 2.675, 1234567.891, -1234.5, -0.001, 999.995, 1e20, 7])
+@pytest.mark.parametrize("decimals,thousands", [(2, True), (0, False), (3, True)])
+def test_format_numbers_matches_str_format(value, decimals, thousands):
+    pattern = f"{{:{',' if thousands else ''}.{decimals}f}}"
+
+    assert format_numbers(pd.Series([value]), decimals, thousands).tolist() == [pattern.format(value)]
+
+
+def test_format_numbers_keeps_missing_values_and_index():
+    series = pd.Series([1234.5, np.nan, -2.0], index=[10, 20, 30], name="Total DL (Bytes)")
+    formatted = format_numbers(series)
+
+    assert formatted.iloc[[0, 2]].tolist() == ["1,234.50", "-2.00"]
+    assert pd.isna(formatted.iloc[1])
+    assert list(formatted.index) == [10, 20, 30] and formatted.name == "Total DL (Bytes)"
+
+
+def test_format_numbers_of_empty_input():
+    assert format_numbers(pd.Series([], dtype="float64")).empty
+
+
+def test_export_renders_numbers_and_dates_only():
+    df = format_data(pd.DataFrame({
+        "date_column": ["2019-04-04 12:01", "not a date"],
+        "numerical_column": ["1234.567", "x"],
+        "text_column": ["  Mixed Case ", "b"],
+    }))
+    exported = format_for_export(df)
+
+    assert df["numerical_column"].dtype == "float64"
+    assert exported["numerical_column"].iloc[0] == "1,234.57" and pd.isna(exported["numerical_column"].iloc[1])
+    assert exported["date_column"].iloc[0] == "2019-04-04" and pd.isna(exported["date_column"].iloc[1])
+    assert exported["text_column"].tolist() == ["mixed case", "b"]
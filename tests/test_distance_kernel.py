@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from distance_kernel import distance_to_point
+
+FEATURES = ["Total UL (Bytes)", "Total DL (Bytes)", "Dur. (ms)"]
+CENTROID = np.array([4e7, 1.5e7, 2.5e7])
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({column: rng.gamma(2.0, 1e7, 10001) for column in FEATURES})
+
+
+@pytest.mark.parametrize("n_threads,block_rows", [(1, 32768), (1, 1000), (3, 1000)])
+def test_matches_linalg_norm(frame, n_threads, block_rows):
+    expected = np.linalg.norm(frame[FEATURES] - CENTROID, axis=1)
+    distances = distance_to_point(frame, CENTROID, n_threads=n_threads, block_rows=block_rows)
+
+    assert distances.dtype == np.float64
+    np.testing.assert_allclose(distances, expected, rtol=1e-12)
+
+
+def test_float32_columns_and_preallocated_output(frame):
+    compact = frame.astype("float32")
+    expected = np.linalg.norm(compact.to_numpy(dtype="float64") - CENTROID, axis=1)
+    out = np.empty(len(frame), dtype="float32")
+
+    assert distance_to_point(compact, CENTROID).dtype == np.float32
+    assert distance_to_point(compact, CENTROID, out=out, block_rows=999, n_threads=2) is out
+    np.testing.assert_allclose(out, expected, rtol=1e-5)
+    np.testing.assert_allclose(distance_to_point(compact, CENTROID, dtype="float64"), expected, rtol=1e-6)
+
+
+def test_arrays_and_nullable_columns():
+    values = np.array([[3.0, 4.0], [0.0, 0.0], [np.nan, 1.0]])
+    nullable = pd.DataFrame({"a": pd.array([3, 0, None], dtype="Int64"), "b": [4.0, 0.0, 1.0]})
+
+    np.testing.assert_array_equal(distance_to_point(values, [0, 0]), [5.0, 0.0, np.nan])
+    np.testing.assert_array_equal(distance_to_point(nullable, [0, 0]), [5.0, 0.0, np.nan])
+
+
+def test_shape_errors(frame):
+    with pytest.raises(ValueError):
+        distance_to_point(frame, CENTROID[:2])
+    with pytest.raises(ValueError):
+        distance_to_point(frame, CENTROID, out=np.empty(3))
+    with pytest.raises(ValueError):
+        distance_to_point(frame, CENTROID, out=np.empty(len(frame), dtype="int64"))
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from Experiance_analysis import group_mode
+
+
+def _sessions(dtype):
+    rng = np.random.default_rng(0)
+    handsets = ["Apple iPhone 6", "Huawei B528S-23A", "Samsung Galaxy S8", "undefined"]
+    df = pd.DataFrame({
+        "MSISDN/Number": rng.integers(0, 150, 3000).astype("float64"),
+        "Handset Type": pd.Series(rng.choice(handsets, 3000), dtype=object),
+    })
+    # Subscribers 0-4 have a tie between two handsets
+    ties = pd.DataFrame({"MSISDN/Number": np.repeat(np.arange(1000.0, 1005.0), 2),
+                         "Handset Type": ["undefined", "Apple iPhone 6"] * 5})
+    df = pd.concat([df, ties], ignore_index=True)
+    return df.astype({"Handset Type": dtype})
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_group_mode_matches_series_mode(dtype):
+    df = _sessions(dtype)
+    expected = df.groupby("MSISDN/Number", observed=True)["Handset Type"].agg(lambda values: values.mode()[0])
+
+    result = group_mode(df, "MSISDN/Number", "Handset Type")
+
+    tm.assert_series_equal(result.astype(object), expected.astype(object), check_names=False)
+    assert (result.loc[1000.0:1004.0] == "Apple iPhone 6").all()
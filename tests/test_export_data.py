@@ -0,0 +1,165 @@
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from export_data import (PGCOPY_HEADER, PGCOPY_TRAILER, _binary_copy_buffer, _csv_copy_buffer,
+                         export_dataframe_copy)
+
+
+class FakeCursor:
+    """
+    Records the SQL and COPY buffers it receives; fetch results are queued by the test.
+    """
+
+    def __init__(self, results=()):
+        self.statements = []
+        self.copies = []
+        self.results = list(results)
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append((sql, buffer.getvalue()))
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def _decode_binary(data, formats):
+    """
+    Parses a binary COPY stream into a list of row tuples (None for NULL). formats holds one
+    struct code per column ('q' BIGINT, 'd' DOUBLE PRECISION, '?' BOOLEAN) or 'N' for NUMERIC.
+    """
+    assert data.startswith(PGCOPY_HEADER) and data.endswith(PGCOPY_TRAILER)
+    data = data[len(PGCOPY_HEADER):-len(PGCOPY_TRAILER)]
+    rows, position = [], 0
+    while position < len(data):
+        (field_count,) = struct.unpack_from(">h", data, position)
+        assert field_count == len(formats)
+        position += 2
+        row = []
+        for code in formats:
+            (length,) = struct.unpack_from(">i", data, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+                continue
+            value = data[position:position + length]
+            position += length
+            if code == "N":
+                digits = struct.unpack(">9h", value)[4:]
+                row.append(int("".join(f"{digit:04d}" for digit in digits)))
+            else:
+                row.append(struct.unpack(">" + code, value)[0])
+        rows.append(tuple(row))
+    return rows
+
+
+def test_csv_buffer_writes_missing_values_as_empty_fields():
+    df = pd.DataFrame({"IMSI": pd.array([1, None], dtype="Int64"), "score": [0.5, np.nan], "name": ["a", None]})
+
+    assert _csv_copy_buffer(df).getvalue().splitlines() == ["1,0.5,a", ",,"]
+
+
+def test_binary_buffer_encodes_nulls_and_integer_types():
+    df = pd.DataFrame({
+        "Bearer Id": pd.array([13114483460844900352, None, 5], dtype="UInt64"),
+        "IMSI": pd.array([208201402342131, 7, None], dtype="Int64"),
+        "score": [0.25, np.nan, -1.5],
+        "flag": pd.array([True, None, False], dtype="boolean"),
+    })
+
+    assert _decode_binary(_binary_copy_buffer(df).getvalue(), "Nqd?") == [
+        (13114483460844900352, 208201402342131, 0.25, True),
+        (None, 7, None, None),
+        (5, None, -1.5, False),
+    ]
+
+
+def test_binary_buffer_rejects_text_columns():
+    with pytest.raises(ValueError):
+        _binary_copy_buffer(pd.DataFrame({"name": ["a"]}))
+
+
+def test_replace_loads_a_staging_table_then_swaps_it_in():
+    cursor = FakeCursor()
+    connection = FakeConnection(cursor)
+    df = pd.DataFrame({"MSISDN": [1, 2], "score": [0.5, 1.5]})
+
+    export_dataframe_copy(df, "public.scores", mode="replace", connection=connection)
+
+    assert cursor.statements == [
+        'DROP TABLE IF EXISTS "public"."scores__staging"',
+        'CREATE TABLE "public"."scores__staging" ("MSISDN" BIGINT, "score" DOUBLE PRECISION)',
+        'DROP TABLE IF EXISTS "public"."scores"',
+        'ALTER TABLE "public"."scores__staging" RENAME TO "scores"',
+    ]
+    assert cursor.copies == [
+        ('COPY "public"."scores__staging" ("MSISDN", "score") FROM STDIN WITH (FORMAT csv)', "1,0.5\n2,1.5\n"),
+    ]
+    assert connection.committed
+
+
+def test_upsert_skips_null_keys_and_keeps_the_last_duplicate():
+    # to_regclass finds the unique index, so the table is not checked for duplicates
+    cursor = FakeCursor(results=[("scores__MSISDN__key",)])
+    df = pd.DataFrame({"MSISDN": pd.array([1, None, 1, 2], dtype="Int64"), "score": [0.5, 9.0, 1.5, 2.5]})
+
+    result = export_dataframe_copy(df, "scores", mode="upsert", key="MSISDN", connection=FakeConnection(cursor))
+
+    assert result["rows"] == 2
+    assert cursor.copies[0][1] == "1,1.5\n2,2.5\n"
+    assert cursor.statements[-1] == (
+        'INSERT INTO "scores" ("MSISDN", "score") SELECT "MSISDN", "score" FROM "scores__upsert" '
+        'ON CONFLICT ("MSISDN") DO UPDATE SET "score" = EXCLUDED."score"'
+    )
+
+
+def test_upsert_refuses_a_table_with_duplicate_keys():
+    # No unique index yet, and the duplicate check finds key 7 twice
+    cursor = FakeCursor(results=[(None,), [(7,)]])
+    connection = FakeConnection(cursor)
+    df = pd.DataFrame({"MSISDN": [7], "score": [0.5]})
+
+    with pytest.raises(ValueError, match="duplicate"):
+        export_dataframe_copy(df, "scores", mode="upsert", key="MSISDN", connection=connection)
+
+    assert connection.rolled_back and not connection.committed
+    assert not any("CREATE UNIQUE INDEX" in sql for sql in cursor.statements)
+    assert cursor.copies == []
+
+
+def test_upsert_adds_the_unique_index_on_first_use():
+    cursor = FakeCursor(results=[(None,), []])
+    df = pd.DataFrame({"MSISDN": [7], "score": [0.5]})
+
+    export_dataframe_copy(df, "scores", mode="upsert", key="MSISDN", copy_format="binary",
+                          connection=FakeConnection(cursor))
+
+    assert 'CREATE UNIQUE INDEX "scores__MSISDN__key" ON "scores" ("MSISDN")' in cursor.statements
+    assert _decode_binary(cursor.copies[0][1], "qd") == [(7, 0.5)]
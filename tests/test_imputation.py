@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from imputation import ChunkedImputer
+
+
+@pytest.fixture
+def sessions():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "IMSI": rng.integers(0, 50, 3000).astype("float64"),
+        "Dur. (ms)": rng.gamma(2.0, 1e5, 3000),
+        "Avg RTT DL (ms)": rng.gamma(2.0, 20.0, 3000).astype("float32"),
+        "Handset Type": pd.Series(rng.choice(["Apple iPhone 6", "Huawei B528S-23A", "undefined"], 3000),
+                                  dtype=object),
+        "Last Location Name": pd.Series(rng.choice(["L1", "L2"], 3000)).astype("category"),
+    })
+    for column in df.columns:
+        df.loc[df.sample(frac=0.1, random_state=1).index, column] = np.nan
+    return df
+
+
+def _chunks(df, size=400):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+def test_statistics_match_pandas(sessions):
+    mean = ChunkedImputer().fit(sessions)
+    median = ChunkedImputer(numeric_strategy="median").fit(sessions)
+
+    assert mean.statistics_["Dur. (ms)"] == pytest.approx(sessions["Dur. (ms)"].mean())
+    assert median.statistics_["Avg RTT DL (ms)"] == pytest.approx(sessions["Avg RTT DL (ms)"].median())
+    assert mean.statistics_["Handset Type"] == sessions["Handset Type"].mode()[0]
+    assert "IMSI" not in mean.statistics_
+
+
+def test_streamed_fit_equals_in_memory_fit(sessions):
+    in_memory = ChunkedImputer(numeric_strategy="median").fit(sessions)
+    streamed = ChunkedImputer(numeric_strategy="median").fit(lambda: _chunks(sessions))
+
+    # Medians over a stream come from a digest, exact below 10k values
+    assert streamed.statistics_ == pytest.approx(in_memory.statistics_)
+
+
+def test_save_load_round_trip(sessions, tmp_path):
+    imputer = ChunkedImputer(numeric_strategy="median", categorical_strategy="constant").fit(sessions)
+    path = str(tmp_path / "models" / "imputer.json")
+    imputer.save(path)
+    loaded = ChunkedImputer.load(path)
+
+    assert loaded.statistics_ == imputer.statistics_
+    filled = pd.concat(loaded.transform_in_chunks(_chunks(sessions)))
+    tm.assert_frame_equal(filled, imputer.transform(sessions))
+    assert filled.drop(columns="IMSI").notna().all().all()
+    assert filled["Avg RTT DL (ms)"].dtype == "float32"
+    assert (filled["Handset Type"] == "missing").sum() == sessions["Handset Type"].isna().sum()
+
+
+def test_unfitted_imputer_refuses_to_transform(sessions):
+    with pytest.raises(ValueError):
+        ChunkedImputer().transform(sessions)
@@ -0,0 +1,123 @@
+import glob
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from data_cache import STATE_FILE, _cache_path, _read_state, load_cached_extract, refresh_cache
+from load_data import stream_data_from_postgres
+from User_Engagement_Analysis import aggregate_engagement_metrics
+from user_overview_analysis import APP_COLUMNS, aggregate_user_behavior
+
+APP_BYTE_COLUMNS = [column for columns in APP_COLUMNS.values() for column in columns]
+
+# sqlite stand-in for Postgres' to_timestamp on the TEXT Start column, returning ISO text
+SQLITE_WATERMARK_FILTER = "xdr_time(\"{column}\") > :watermark"
+
+
+def _xdr_rows(n, start_bearer=1, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame({
+        "Bearer Id": np.arange(start_bearer, start_bearer + n),
+        "Start": [f"4/{1 + (start_bearer + i) // 24}/2019 {(start_bearer + i) % 24}:05" for i in range(n)],
+        "IMSI": rng.integers(1, 8, n),
+        "MSISDN/Number": rng.integers(1, 8, n) + 33600000000,
+        "Dur. (ms)": rng.integers(1000, 100000, n).astype("float64"),
+        "Total UL (Bytes)": rng.integers(0, 10 ** 6, n).astype("float64"),
+        "Total DL (Bytes)": rng.integers(0, 10 ** 8, n).astype("float64"),
+        **{column: rng.integers(0, 10 ** 6, n).astype("float64") for column in APP_BYTE_COLUMNS},
+    })
+    rows.loc[::5, "Youtube DL (Bytes)"] = np.nan
+    return rows
+
+
+def _xdr_time(text):
+    return datetime.strptime(text, "%m/%d/%Y %H:%M").isoformat()
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    connection.create_function("xdr_time", 1, _xdr_time)
+    _xdr_rows(23).to_sql("xdr_data", connection, index=False)
+    yield connection
+    connection.close()
+
+
+def test_stream_falls_back_to_fetchmany_without_named_cursors(connection):
+    chunks = list(stream_data_from_postgres("SELECT * FROM xdr_data", chunk_size=5,
+                                            connection=connection, apply_schema=False))
+
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 5, 3]
+    expected = pd.read_sql_query("SELECT * FROM xdr_data", connection)
+    tm.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+    # A connection passed in is left open for the caller
+    assert connection.execute("SELECT COUNT(*) FROM xdr_data").fetchone() == (23,)
+
+
+def test_stream_applies_the_xdr_schema(connection):
+    chunk = next(stream_data_from_postgres("SELECT * FROM xdr_data", chunk_size=5, connection=connection))
+
+    assert chunk["IMSI"].dtype == "Int64"
+    assert chunk["Total DL (Bytes)"].dtype == "float64"
+    assert chunk["Start"].dtype == "datetime64[ns]"
+
+
+def test_chunked_aggregations_match_in_memory(connection):
+    query = "SELECT * FROM xdr_data"
+    df = pd.concat(stream_data_from_postgres(query, chunk_size=100, connection=connection))
+
+    chunked = aggregate_engagement_metrics(stream_data_from_postgres(query, chunk_size=4, connection=connection))
+    tm.assert_frame_equal(chunked.sort_index(), aggregate_engagement_metrics(df, max_workers=1).sort_index())
+
+    chunked = aggregate_user_behavior(stream_data_from_postgres(query, chunk_size=4, connection=connection))
+    in_memory = aggregate_user_behavior(df)
+    tm.assert_frame_equal(chunked.sort_values("IMSI").reset_index(drop=True),
+                          in_memory.sort_values("IMSI").reset_index(drop=True), check_dtype=False)
+
+
+def test_refresh_cache_fetches_only_rows_after_the_watermark(connection, tmp_path):
+    query = "SELECT * FROM xdr_data"
+    options = dict(cache_dir=str(tmp_path), chunk_size=10, watermark_filter=SQLITE_WATERMARK_FILTER,
+                   connection=connection)
+
+    assert refresh_cache(query, **options) == 23
+    state = _read_state(_cache_path(query, str(tmp_path)))
+    # Stored as an ISO timestamp, not as the largest 'M/D/YYYY' string
+    assert state["watermark"] == "2019-04-01T23:05:00"
+
+    assert refresh_cache(query, **options) == 0
+    _xdr_rows(4, start_bearer=24, seed=1).to_sql("xdr_data", connection, index=False, if_exists="append")
+    assert refresh_cache(query, **options) == 4
+
+    cached = load_cached_extract(query, refresh=False, cache_dir=str(tmp_path))
+    assert sorted(cached["Bearer Id"]) == list(range(1, 28))
+
+
+def test_failed_refresh_leaves_no_partial_rows(connection, tmp_path):
+    calls = {"fail": True}
+
+    def checked(bearer_id):
+        if calls["fail"] and bearer_id == 15:
+            raise ValueError("connection lost")
+        return bearer_id
+
+    connection.create_function("checked", 1, checked)
+    query = 'SELECT *, checked("Bearer Id") AS "Checked Id" FROM xdr_data'
+    options = dict(cache_dir=str(tmp_path), chunk_size=5, watermark_filter=SQLITE_WATERMARK_FILTER,
+                   connection=connection)
+
+    with pytest.raises(sqlite3.OperationalError):
+        refresh_cache(query, **options)
+    path = _cache_path(query, str(tmp_path))
+    assert glob.glob(os.path.join(path, "*.parquet")) == []
+    assert not os.path.exists(os.path.join(path, STATE_FILE))
+
+    calls["fail"] = False
+    assert refresh_cache(query, **options) == 23
+    cached = load_cached_extract(query, refresh=False, cache_dir=str(tmp_path))
+    assert sorted(cached["Bearer Id"]) == list(range(1, 24))
@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks import make_synthetic_xdr
+from model_registry import ModelRegistry, load_scorer, save_satisfaction_model
+from Satisfaction_Analysis import SCORE_COLUMNS, satisfaction_analysis
+
+
+def test_versions_round_trip(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.versions("satisfaction") == []
+    with pytest.raises(FileNotFoundError):
+        registry.latest("satisfaction")
+
+    first = registry.save("satisfaction", {"centroids": np.eye(3)}, {"level": "session"})
+    second = registry.save("satisfaction", {"centroids": 2 * np.eye(3), "coef": np.arange(6.0)})
+
+    assert (first, second) == ("v0001", "v0002")
+    assert registry.versions("satisfaction") == ["v0001", "v0002"] == sorted(os.listdir(tmp_path / "satisfaction"))
+    arrays, manifest = registry.load("satisfaction")
+    assert manifest["version"] == "v0002" and isinstance(arrays["centroids"], np.memmap)
+    np.testing.assert_array_equal(arrays["coef"], np.arange(6.0))
+    arrays, manifest = registry.load("satisfaction", "v0001", mmap=False)
+    np.testing.assert_array_equal(arrays["centroids"], np.eye(3))
+    assert manifest["metadata"] == {"level": "session"}
+
+
+def test_newer_format_is_refused(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.save("satisfaction", {"centroids": np.eye(2)})
+    path = tmp_path / "satisfaction" / version / "manifest.json"
+    manifest = json.loads(path.read_text())
+    path.write_text(json.dumps({**manifest, "format_version": manifest["format_version"] + 1}))
+
+    with pytest.raises(ValueError):
+        registry.load("satisfaction")
+
+
+@pytest.fixture(scope="module")
+def fitted(tmp_path_factory):
+    df = make_synthetic_xdr(800, n_users=80)
+    df.loc[::5, "Youtube DL (Bytes)"] = np.nan
+    results = satisfaction_analysis(df, compute_only=True, render_plots=False)
+    registry = ModelRegistry(str(tmp_path_factory.mktemp("models")))
+    save_satisfaction_model(registry, results)
+    return df, results, load_scorer(registry)
+
+
+def test_score_batch_reproduces_the_analysis(fitted):
+    df, results, scorer = fitted
+    scores = scorer.score_batch(df)
+
+    assert scorer.level == "session" and scorer.subscriber_key is None
+    for column in SCORE_COLUMNS:
+        np.testing.assert_allclose(scores[column], results["scores"][column], rtol=1e-9, err_msg=column)
+    np.testing.assert_allclose(scores["predicted_satisfaction"],
+                               results["regression_model"].predict(results["scores"][scorer.features]), rtol=1e-9)
+
+
+def test_score_batch_matches_row_by_row_scores(fitted):
+    df, _, scorer = fitted
+    rows = df.iloc[:20]
+    batch = scorer.score_batch(rows)
+    single = [scorer.score_batch(rows.iloc[[i]]) for i in range(len(rows))]
+
+    for name, values in batch.items():
+        np.testing.assert_allclose(values, np.concatenate([scores[name] for scores in single]), err_msg=name)
+    # A feature array in ENGAGEMENT_FEATURES + EXPERIENCE_FEATURES order scores the same
+    np.testing.assert_allclose(scorer.score_batch(rows[scorer.features].to_numpy())["satisfaction_score"],
+                               batch["satisfaction_score"])
@@ -0,0 +1,36 @@
+import pandas as pd
+import pandas.testing as tm
+
+import parallel_groupby as pg
+from benchmarks import make_synthetic_xdr
+from User_Engagement_Analysis import aggregate_engagement_metrics
+
+
+def test_parallel_result_equals_serial(monkeypatch):
+    df = make_synthetic_xdr(20000, n_users=700)
+    expected = aggregate_engagement_metrics(df)
+
+    monkeypatch.setattr(pg, "PARALLEL_MIN_ROWS", 0)
+    result = aggregate_engagement_metrics(df, max_workers=2)
+
+    tm.assert_frame_equal(result, expected)
+
+
+def test_partitions_cover_every_key_once():
+    df = make_synthetic_xdr(5000, n_users=300)
+    ids = pg.partition_ids(df["IMSI"], 8)
+
+    assert ids.min() >= 0 and ids.max() < 8
+    assert (pd.Series(ids).groupby(df["IMSI"].to_numpy()).nunique() == 1).all()
+
+
+def test_pool_is_opt_in(monkeypatch):
+    class NoPool:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("max_workers=None must not start a process pool")
+
+    monkeypatch.setattr(pg, "PARALLEL_MIN_ROWS", 0)
+    monkeypatch.setattr(pg, "ProcessPoolExecutor", NoPool)
+    df = make_synthetic_xdr(2000)
+
+    assert len(aggregate_engagement_metrics(df)) == df["IMSI"].nunique()
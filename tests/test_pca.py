@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pca
+from pca import explained_variance, fit_pca, transform_in_chunks
+
+
+@pytest.fixture
+def users():
+    rng = np.random.default_rng(0)
+    latent = rng.normal(size=(3000, 2))
+    values = latent @ rng.normal(size=(2, 6)) + rng.normal(scale=0.1, size=(3000, 6))
+    return pd.DataFrame(values * 1e6, columns=[f"App {i} (Bytes)" for i in range(6)])
+
+
+@pytest.fixture(autouse=True)
+def empty_model_cache(monkeypatch):
+    monkeypatch.setattr(pca, "_MODEL_CACHE", {})
+
+
+def test_incremental_matches_full(users):
+    full = fit_pca(users, n_components=2)
+    incremental = fit_pca(lambda: (users.iloc[start:start + 500] for start in range(0, len(users), 500)),
+                          n_components=2, backend="incremental", batch_size=700)
+
+    np.testing.assert_allclose(explained_variance(incremental)["explained_variance_ratio"],
+                               explained_variance(full)["explained_variance_ratio"], rtol=1e-3)
+    np.testing.assert_allclose(np.abs(transform_in_chunks(incremental, [users])),
+                               np.abs(full.transform(users.to_numpy())), rtol=1e-2, atol=1e-2)
+
+
+def test_cached_model_is_reused_only_for_the_same_fit(users, tmp_path, monkeypatch):
+    path = str(tmp_path / "pca.joblib")
+    fitted = fit_pca(users, n_components=2, model_path=path)
+    assert fit_pca(users, n_components=2, model_path=path) is fitted
+
+    # In a new process the model is read back from the file
+    monkeypatch.setattr(pca, "_MODEL_CACHE", {})
+    loaded = fit_pca(users, n_components=2, model_path=path)
+    np.testing.assert_array_equal(loaded[-1].components_, fitted[-1].components_)
+
+    for changed in [dict(n_components=3), dict(n_components=2, scale=False),
+                    dict(n_components=2, backend="randomized")]:
+        refitted = fit_pca(users, model_path=path, **changed)
+        assert refitted is not loaded
+        assert refitted[-1].n_components_ == changed["n_components"]
+        loaded = refitted
+
+    renamed = users.rename(columns={"App 0 (Bytes)": "Other"})
+    assert fit_pca(renamed, n_components=2, backend="randomized", model_path=path) is not loaded
+    latest = fit_pca(renamed, n_components=2, backend="randomized", model_path=path)
+    assert fit_pca(renamed, n_components=2, backend="randomized", model_path=path, refit=True) is not latest
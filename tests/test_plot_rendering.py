@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from plot_rendering import _gaussian_kde, histogram_data
+
+
+def test_kde_matches_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    sample = np.random.default_rng(0).gamma(2.0, 1e6, 3000)
+    points = np.linspace(sample.min(), sample.max(), 50)
+
+    np.testing.assert_allclose(_gaussian_kde(sample, points), stats.gaussian_kde(sample)(points), rtol=1e-9)
+
+
+def test_histogram_data_counts_every_value():
+    values = np.r_[np.random.default_rng(1).normal(size=1000), np.nan]
+    data = histogram_data(values, bins=20, kde_sample=200)
+
+    assert data["counts"].sum() == 1000
+    assert len(data["kde_x"]) == len(data["kde_y"]) == 200
+    assert histogram_data(np.ones(5))["kde_x"] is None
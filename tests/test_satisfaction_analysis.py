@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas.testing as tm
+
+from benchmarks import make_synthetic_xdr
+from Satisfaction_Analysis import _run_stage, satisfaction_analysis, subscriber_features
+from User_Engagement_Analysis import aggregate_engagement_metrics
+
+
+def test_subscriber_features_agree_with_engagement_metrics():
+    df = make_synthetic_xdr(3000, n_users=200)
+    df.loc[::10, "Bearer Id"] = np.nan
+    features = subscriber_features(df, "IMSI").set_index("IMSI")
+    engagement = aggregate_engagement_metrics(df)
+
+    tm.assert_series_equal(features["Dur. (ms)"], engagement["Total_Duration"], check_names=False)
+    tm.assert_series_equal(features["Total DL (Bytes)"], engagement["Total_DL"], check_names=False)
+    tm.assert_series_equal(features["Session_Frequency"], engagement["Session_Frequency"])
+    assert features["Youtube DL (Bytes)"].sum() == df["Youtube DL (Bytes)"].sum()
+
+
+def test_run_stage_cache_key_chains_input_and_parameters(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    first, key = _run_stage("engagement_score", "input-a", "full", compute, str(tmp_path))
+    again, same_key = _run_stage("engagement_score", "input-a", "full", compute, str(tmp_path))
+    assert (again, same_key, len(calls)) == (first, key, 1)
+
+    # A new input or new parameters give a new key, and so recompute this stage and every later one
+    _, new_input = _run_stage("engagement_score", "input-b", "full", compute, str(tmp_path))
+    _, new_params = _run_stage("engagement_score", "input-a", "minibatch", compute, str(tmp_path))
+    assert len({key, new_input, new_params}) == 3 and len(calls) == 3
+    _, next_key = _run_stage("satisfaction", key, None, compute, str(tmp_path))
+    _, next_after_change = _run_stage("satisfaction", new_params, None, compute, str(tmp_path))
+    assert next_key != next_after_change
+
+    # Without cache_dir nothing is stored
+    _run_stage("engagement_score", "input-a", "full", compute, None)
+    assert len(calls) == 6
+
+
+def _stage_files(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_rerun_with_cache_recomputes_only_changed_stages(tmp_path):
+    df = make_synthetic_xdr(600, n_users=60)
+    cache_dir = str(tmp_path)
+    first = satisfaction_analysis(df, compute_only=True, render_plots=False, cache_dir=cache_dir)
+    files = _stage_files(cache_dir)
+    assert [name.split("-")[0] for name in files] == [
+        "clustering", "engagement_score", "experience_score", "impute", "regression", "satisfaction"]
+
+    second = satisfaction_analysis(df, compute_only=True, render_plots=False, cache_dir=cache_dir)
+    assert _stage_files(cache_dir) == files
+    tm.assert_frame_equal(second["scores"], first["scores"])
+
+    satisfaction_analysis(df, compute_only=True, render_plots=False, cache_dir=cache_dir, kmeans_backend="minibatch")
+    added = sorted(set(_stage_files(cache_dir)) - set(files))
+    assert [name.split("-")[0] for name in added] == [
+        "clustering", "engagement_score", "experience_score", "regression", "satisfaction"]
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from model_registry import SCORING_FEATURES, ModelRegistry
+from scoring_service import RequestBatcher, create_service
+
+KEYS = [33600000001, 33600000002, 33600000005]
+
+
+def _save_model(registry_dir, level="subscriber", subscriber_key="MSISDN/Number"):
+    rng = np.random.default_rng(0)
+    arrays = {
+        "imputer_fill_values": np.zeros(6),
+        "engagement_centroids": rng.random((3, 3)),
+        "experience_centroids": rng.random((3, 3)),
+        "satisfaction_centroids": rng.random((2, 2)),
+        "regression_coef": rng.random(6),
+        "regression_intercept": np.array([0.5]),
+    }
+    metadata = {
+        "engagement_features": SCORING_FEATURES[:3],
+        "experience_features": SCORING_FEATURES[3:],
+        "engagement_reference": 0,
+        "experience_reference": 1,
+        "level": level,
+        "subscriber_key": subscriber_key,
+    }
+    return ModelRegistry(registry_dir).save("satisfaction", arrays, metadata)
+
+
+def _save_table(feature_dir, key="MSISDN/Number"):
+    os.makedirs(feature_dir)
+    np.save(os.path.join(feature_dir, "keys.npy"), np.array(KEYS, dtype="int64"))
+    np.save(os.path.join(feature_dir, "features.npy"), np.arange(18, dtype="float64").reshape(3, 6))
+    with open(os.path.join(feature_dir, "table.json"), "w") as f:
+        json.dump({"key": key, "features": SCORING_FEATURES, "rows": len(KEYS)}, f)
+
+
+@pytest.fixture
+def service(tmp_path):
+    _save_model(str(tmp_path / "models"))
+    _save_table(str(tmp_path / "features"))
+    return create_service(str(tmp_path / "models"), str(tmp_path / "features"), max_body=200)
+
+
+def _request(service, raw):
+    """
+    Sends one raw HTTP request to the service on a local port; returns (status, payload).
+    """
+    async def run():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(body)
+
+
+def _post(service, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    return _request(service, b"POST /score HTTP/1.1\r\nConnection: close\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(data), data))
+
+
+def _get(service, target):
+    return _request(service, f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+
+
+def test_scores_match_score_batch(service):
+    status, payload = _post(service, {"msisdn": [KEYS[2], 1, KEYS[0]]})
+    expected = service.subscribers.scorer.score_batch(np.arange(18, dtype="float64").reshape(3, 6))
+
+    assert status == 200
+    found = payload["results"]
+    assert [result["found"] for result in found] == [True, False, True]
+    assert found[1] == {"msisdn": 1, "found": False}
+    assert found[0]["satisfaction_score"] == pytest.approx(expected["satisfaction_score"][2])
+    assert found[2]["engagement_cluster"] == expected["engagement_cluster"][0]
+
+    assert _get(service, f"/score/{KEYS[1]}")[0] == 200
+    assert _get(service, f"/score?msisdn={KEYS[1]}")[0] == 200
+    assert _get(service, "/score/42")[0] == 404
+
+
+@pytest.mark.parametrize("body", [
+    {"msisdn": [1.5]},
+    {"msisdn": [True]},
+    {"msisdn": ["33600000001"]},
+    {"msisdn": [2**63]},
+    {"msisdn": []},
+    {"msisdn": 33600000001},
+    [33600000001],
+    b"{not json",
+])
+def test_bad_post_bodies_are_rejected(service, body):
+    status, payload = _post(service, body)
+
+    assert status == 400
+    assert "error" in payload
+
+
+@pytest.mark.parametrize("target", ["/score/1.5", "/score/abc", "/score/+1", "/score?msisdn=1&msisdn=2",
+                                    "/score/99999999999999999999"])
+def test_bad_get_keys_are_rejected(service, target):
+    assert _get(service, target)[0] == 400
+
+
+def test_oversized_body_is_refused(service):
+    status, payload = _request(service, b"POST /score HTTP/1.1\r\nContent-Length: 201\r\n\r\n")
+
+    assert status == 413
+    assert "200 bytes" in payload["error"]
+
+
+def test_refuses_a_model_of_another_level_or_key(tmp_path):
+    _save_table(str(tmp_path / "features"), key="IMSI")
+    _save_model(str(tmp_path / "session"), level="session", subscriber_key=None)
+    _save_model(str(tmp_path / "msisdn"))
+
+    with pytest.raises(ValueError, match="subscriber"):
+        create_service(str(tmp_path / "session"), str(tmp_path / "features"))
+    with pytest.raises(ValueError, match="keyed by MSISDN/Number"):
+        create_service(str(tmp_path / "msisdn"), str(tmp_path / "features"))
+
+
+def test_concurrent_lookups_are_scored_in_one_batch():
+    calls = []
+
+    def score(keys):
+        calls.append(keys.tolist())
+        return [key * 10 for key in keys.tolist()]
+
+    async def run():
+        batcher = RequestBatcher(score)
+        return await asyncio.gather(batcher.submit([1, 2]), batcher.submit([3]), batcher.submit([4, 5]))
+
+    assert asyncio.run(run()) == [[10, 20], [30], [40, 50]]
+    assert calls == [[1, 2, 3, 4, 5]]
+
+
+def test_full_batches_are_scored_early():
+    calls = []
+
+    def score(keys):
+        calls.append(keys.tolist())
+        return keys.tolist()
+
+    async def run():
+        batcher = RequestBatcher(score, max_batch=2)
+        return await asyncio.gather(batcher.submit([1, 2]), batcher.submit([3]))
+
+    assert asyncio.run(run()) == [[1, 2], [3]]
+    assert calls == [[1, 2], [3]]
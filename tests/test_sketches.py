@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from sketches import ExtremeValues, FrequentItems
+
+
+def _handsets(n, seed):
+    rng = np.random.default_rng(seed)
+    values = pd.Series(rng.choice([f"Handset {i}" for i in range(40)], n, p=np.arange(1, 41) / 820), dtype=object)
+    values[::17] = None
+    return values
+
+
+def _by_value(counts):
+    return counts.sort_index().rename(None).rename_axis(None)
+
+
+def test_frequent_items_merge_is_exact_when_capacity_covers_every_value():
+    left, right = _handsets(3000, 0), _handsets(2000, 1)
+    merged = FrequentItems(capacity=40).update(left).merge(FrequentItems(capacity=40).update(right))
+
+    assert merged.exact
+    tm.assert_series_equal(_by_value(merged.counts), _by_value(pd.concat([left, right]).value_counts()))
+
+
+def test_frequent_items_chunks_equal_one_pass():
+    values = _handsets(5000, 2)
+    chunked = FrequentItems()
+    for start in range(0, len(values), 700):
+        chunked.update(values.iloc[start:start + 700])
+
+    tm.assert_series_equal(_by_value(chunked.counts), _by_value(FrequentItems().update(values).counts))
+    assert list(chunked.top(5)) == list(values.value_counts().head(5))
+
+
+def test_frequent_items_bounded_counts_never_undercount():
+    values = _handsets(5000, 3)
+    sketch = FrequentItems(capacity=10)
+    for start in range(0, len(values), 500):
+        sketch.update(values.iloc[start:start + 500])
+
+    true_counts = values.value_counts().reindex(sketch.counts.index)
+    assert (sketch.counts >= true_counts).all()
+    assert (sketch.counts - sketch.errors <= true_counts).all()
+
+
+def test_extreme_values_merge_is_exact():
+    values = pd.Series(np.random.default_rng(4).gamma(2.0, 1e6, 3000))
+    values[::9] = np.nan
+    merged = ExtremeValues(n=10).update(values.iloc[:1000])
+    for start in range(1000, len(values), 400):
+        merged.merge(ExtremeValues(n=10).update(values.iloc[start:start + 400]))
+
+    tm.assert_series_equal(merged.top(), values.nlargest(10))
+    tm.assert_series_equal(merged.bottom(), values.nsmallest(10))
+
+
+def test_extreme_values_with_n_over_the_row_count_keeps_everything():
+    values = pd.Series([3.0, 1.0, 2.0])
+    merged = ExtremeValues(n=5).update(values.iloc[:1]).merge(ExtremeValues(n=5).update(values.iloc[1:]))
+
+    tm.assert_series_equal(merged.top(), values.nlargest(5))
+    tm.assert_series_equal(merged.bottom(), values.nsmallest(5))
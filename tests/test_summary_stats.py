@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from summary_stats import summarize
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "Dur. (ms)": rng.gamma(2.0, 1e5, n),
+        "Sessions": rng.integers(0, 9, n),
+        "Handset Type": pd.Series(rng.choice(["Apple iPhone 6", "Huawei B528S-23A", "undefined"], n), dtype=object),
+        "Start": pd.Timestamp("2019-04-01") + pd.to_timedelta(rng.integers(0, 10**6, n), unit="s"),
+    })
+    df.loc[::7, "Dur. (ms)"] = np.nan
+    df.loc[::11, "Handset Type"] = None
+    df.loc[::13, "Start"] = pd.NaT
+    return df
+
+
+@pytest.mark.parametrize("columns", [["Dur. (ms)", "Sessions"], ["Handset Type"], ["Start"]])
+def test_describe_matches_pandas(frame, columns):
+    stats = summarize(frame[columns], chunk_size=64)
+
+    tm.assert_frame_equal(stats.describe(), frame[columns].describe())
+
+
+def test_describe_all_uses_the_fixed_row_order(frame):
+    described = summarize(frame, chunk_size=64).describe(include="all")
+    expected = frame.describe(include="all")
+
+    assert list(described.index) == ["count", "unique", "top", "freq", "mean", "std", "min",
+                                     "25%", "50%", "75%", "max"]
+    # pandas moves std after max when numeric and datetime columns are described together
+    tm.assert_frame_equal(described, expected.reindex(described.index))
+
+
+def test_merged_chunks_equal_one_pass(frame):
+    frame = pd.concat([frame, frame.iloc[:40]], ignore_index=True)
+    merged = summarize(frame.iloc[:300], chunk_size=64).merge(summarize(frame.iloc[300:], chunk_size=64))
+    single = summarize(frame)
+
+    tm.assert_frame_equal(merged.describe(include="all"), single.describe(include="all"))
+    tm.assert_series_equal(merged.null_counts(), frame.isnull().sum())
+    assert merged.duplicate_rows == single.duplicate_rows == frame.duplicated().sum()
@@ -0,0 +1,47 @@
+import struct
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import make_raw_xdr
+from export_data import PGCOPY_HEADER, _binary_copy_buffer, _sql_type
+from xdr_schema import XDR_SCHEMA, apply_xdr_schema
+
+
+def test_schema_reduces_deep_memory():
+    raw = make_raw_xdr(5000)
+    object_strings = raw.astype({column: object for column in raw.select_dtypes(exclude="number").columns})
+    typed = apply_xdr_schema(raw)
+
+    assert dict(typed.dtypes.astype(str)) == {column: str(pd.api.types.pandas_dtype(dtype)) if dtype != "category" else "category"
+                                              for column, dtype in XDR_SCHEMA.items()}
+    before = object_strings.memory_usage(deep=True).sum()
+    after = typed.memory_usage(deep=True).sum()
+    # Exact 64-bit volumes and identifiers cap the reduction well below 3x
+    assert before / after >= 2
+    assert after < raw.memory_usage(deep=True).sum()
+
+
+def test_volume_counters_and_bearer_id_are_exact():
+    raw = pd.DataFrame({
+        "Bearer Id": [13114483460844900352.0, 7277825670196679680.0],
+        "Total DL (Bytes)": [902614953.0, 899999937.0],
+        "Dur. (ms)": [1859336441.0, 86399999.0],
+    })
+    typed = apply_xdr_schema(raw)
+
+    np.testing.assert_array_equal(typed["Total DL (Bytes)"].to_numpy(), raw["Total DL (Bytes)"].to_numpy())
+    np.testing.assert_array_equal(typed["Dur. (ms)"].to_numpy(), raw["Dur. (ms)"].to_numpy())
+    assert typed["Bearer Id"].tolist() == [13114483460844900352, 7277825670196679680]
+
+
+def test_bearer_id_exports_as_binary_numeric():
+    typed = apply_xdr_schema(pd.DataFrame({"Bearer Id": [13114483460844900352.0]}))
+    assert _sql_type(typed["Bearer Id"].dtype) == "NUMERIC(20)"
+
+    data = _binary_copy_buffer(typed).getvalue()[len(PGCOPY_HEADER):]
+    field_count, length = struct.unpack(">hi", data[:6])
+    ndigits, weight, sign, dscale, *digits = struct.unpack(">9h", data[6:6 + length])
+
+    assert (field_count, length, ndigits, weight, sign, dscale) == (1, 18, 5, 4, 0, 0)
+    assert int("".join(f"{digit:04d}" for digit in digits)) == 13114483460844900352